@@ -39,6 +39,7 @@ MAX_API_RETRIES = 2
 
 # Information Quality Ranking (Higher = Better)
 API_QUALITY_RANKING = {
+    'Gemini AI': 10,
     'OpenAI': 10,
     'Wikipedia': 8,
     'Google Search': 7,
@@ -46,6 +47,25 @@ API_QUALITY_RANKING = {
     'Local Database': 6
 }
 
+# Provider Orchestration
+# Providers run concurrently in ranking order; lower-ranked providers start
+# PROVIDER_HEDGE_DELAY seconds apart so fast (cached) answers don't spend quota
+PROVIDER_DEADLINE = 12  # seconds for the whole information step
+PROVIDER_HEDGE_DELAY = 0.5  # seconds
+
+# Circuit Breakers
+# After CIRCUIT_FAILURE_THRESHOLD consecutive failures a provider is skipped for
+# CIRCUIT_RESET_TIMEOUT seconds, then a single probe call decides whether it recovered
+CIRCUIT_FAILURE_THRESHOLD = 3
+CIRCUIT_RESET_TIMEOUT = 30  # seconds
+
+# Adaptive Timeouts
+# HTTP timeouts follow recent latency: percentile * multiplier, clamped to [min, max]
+ADAPTIVE_TIMEOUT_MIN = 1  # seconds
+ADAPTIVE_TIMEOUT_MAX = 10  # seconds
+ADAPTIVE_TIMEOUT_PERCENTILE = 95
+ADAPTIVE_TIMEOUT_MULTIPLIER = 2
+
 # Fallback Strategy
 # If primary API fails, try secondary APIs in order:
 FALLBACK_ORDER = ['Wikipedia', 'Local Database']
@@ -1,6 +1,9 @@
 # Force OpenCV to use headless mode for deployment - MUST BE FIRST
 import os
 import sys
+import time
+
+startup_started = time.perf_counter()  # Startup time is reported in the logs and /api/status
 
 # Set all environment variables before any imports
 os.environ['OPENCV_IO_ENABLE_OPENEXR'] = '0'
@@ -8,20 +11,52 @@ os.environ['QT_QPA_PLATFORM'] = 'offscreen'
 os.environ['DISPLAY'] = ':99'
 os.environ['MPLBACKEND'] = 'Agg'
 
-from flask import Flask, render_template, request, jsonify, send_from_directory
+from flask import Flask, render_template, request, jsonify, send_from_directory, Response, stream_with_context, g
 from werkzeug.utils import secure_filename
 
 # Import all safe modules first
 import os
 import numpy as np
 from PIL import Image
+from concurrent.futures import ThreadPoolExecutor, as_completed
+from contextlib import nullcontext
 import io
 import base64
 import json
 import requests
 import re
 import time
+import gc
 import google.generativeai as genai
+import hashlib
+import secrets
+import tempfile
+import threading
+import uuid
+import mimetypes
+from urllib.parse import urlparse
+from requests.adapters import HTTPAdapter
+from urllib3.util.retry import Retry
+from batch_scheduler import MicroBatchScheduler
+from result_cache import ResultCache, make_result_key
+from info_cache import ProviderCache
+from job_store import JobStore, check_callback_url
+from inference_server import (DEFAULT_SOCKET as INFERENCE_SERVER_DEFAULT_SOCKET, InferenceClient, result_to_array,
+                              serve as serve_inference)
+from tiled_inference import sliced_detections
+from image_decode import InvalidImage, decode_image, sniff_image_type
+from blob_store import BlobStore
+from content_store import ContentStore, extension_for, write_file_atomic
+from live_session import LiveSession, SessionClosed
+import stage_timing
+import metrics
+from stage_timing import bind, stage, timed
+from result_render import RENDER_FORMATS, manifest_bytes, parse_manifest, render, snap_size, variant_suffix
+from provider_runtime import (CircuitBreaker, ProviderUnavailable, call_with_timeout, cancellable_sleep,
+                              first_good_result, observe_latency, provider_timeout)
+from api_config import (API_QUALITY_RANKING, MAX_API_RETRIES, PROVIDER_DEADLINE, PROVIDER_HEDGE_DELAY, CIRCUIT_FAILURE_THRESHOLD,
+                        CIRCUIT_RESET_TIMEOUT, ADAPTIVE_TIMEOUT_MIN, ADAPTIVE_TIMEOUT_MAX,
+                        ADAPTIVE_TIMEOUT_PERCENTILE, ADAPTIVE_TIMEOUT_MULTIPLIER)
 
 # Delay OpenCV and YOLO imports until needed
 cv2 = None
@@ -76,12 +111,163 @@ PLANTNET_API_KEY = ENV_VARS.get('PLANTNET_API_KEY', '')
 app = Flask(__name__, static_folder='static', static_url_path='/static')
 app.config['UPLOAD_FOLDER'] = 'uploads'
 app.config['RESULTS_FOLDER'] = 'results'
-app.config['MAX_CONTENT_LENGTH'] = 16 * 1024 * 1024  # 16MB max file size
+app.config['MAX_CONTENT_LENGTH'] = int(os.getenv('MAX_UPLOAD_MB', '16')) * 1024 * 1024  # 16MB max request size by default
 
 # API Configuration
 USE_EXTERNAL_APIs = True  # Set to False to use only local database
 API_TIMEOUT = 5  # seconds
 
+# Provider endpoints - overridable to go through a proxy or to local stub servers (benchmark_pipeline.py)
+WIKIPEDIA_API_URL = os.getenv('WIKIPEDIA_API_URL', 'https://en.wikipedia.org/api/rest_v1/page/summary/')
+GOOGLE_SEARCH_API_URL = os.getenv('GOOGLE_SEARCH_API_URL', 'https://www.googleapis.com/customsearch/v1')
+PLANTNET_API_URL = os.getenv('PLANTNET_API_URL', 'https://my-api.plantnet.org/v2/identify/weurope')
+
+# Shared pool for concurrent provider calls (losing providers may finish in the background)
+provider_pool = ThreadPoolExecutor(max_workers=int(os.getenv('PROVIDER_POOL_SIZE', '16')), thread_name_prefix='provider')
+
+# Keep-alive HTTP connections per provider host (created lazily in each worker process)
+HTTP_POOL_SIZE = int(os.getenv('HTTP_POOL_SIZE', '16'))  # Connections kept open per host
+http_sessions = {}
+http_sessions_pid = None
+http_sessions_lock = threading.Lock()
+
+# Gemini client, created once per worker process
+GEMINI_MODEL_NAME = 'gemini-1.5-flash'
+gemini_model = None
+gemini_model_pid = None
+# The Gemini SDK call takes no timeout - it runs here and is abandoned after the adaptive timeout,
+# so a hanging Gemini holds at most these threads instead of the shared provider pool
+gemini_pool = ThreadPoolExecutor(max_workers=int(os.getenv('GEMINI_POOL_SIZE', '4')), thread_name_prefix='gemini')
+
+# One circuit breaker per provider - failing services are skipped until they recover
+provider_breakers = {
+    name: CircuitBreaker(name,
+                         failure_threshold=CIRCUIT_FAILURE_THRESHOLD,
+                         reset_timeout=CIRCUIT_RESET_TIMEOUT,
+                         min_timeout=ADAPTIVE_TIMEOUT_MIN,
+                         max_timeout=ADAPTIVE_TIMEOUT_MAX,
+                         percentile=ADAPTIVE_TIMEOUT_PERCENTILE,
+                         multiplier=ADAPTIVE_TIMEOUT_MULTIPLIER)
+    for name in ['gemini', 'google_search', 'wikipedia', 'plantnet']
+}
+
+# Inference Configuration
+CONFIDENCE_THRESHOLD = 0.1  # Lower confidence to 10%
+INFERENCE_BATCH_SIZE = int(os.getenv('INFERENCE_BATCH_SIZE', '8'))  # Images per YOLO forward pass
+MAX_BATCH_FILES = int(os.getenv('MAX_BATCH_FILES', '64'))  # Max images accepted by /upload/batch
+DECODE_WORKERS = int(os.getenv('DECODE_WORKERS', '4'))  # Threads used to decode batch uploads
+ENRICHMENT_WORKERS = int(os.getenv('ENRICHMENT_WORKERS', '4'))  # Distinct classes enriched in parallel
+
+# Inference backend - 'pytorch' (ultralytics), or 'onnxruntime' / 'openvino' using an ONNX export
+# of the weights that is created once and cached next to them (model/best.onnx)
+INFERENCE_BACKEND = os.getenv('INFERENCE_BACKEND', 'pytorch').lower()
+INFERENCE_IMGSZ = int(os.getenv('INFERENCE_IMGSZ', '640'))  # Input size of the exported ONNX model
+INFERENCE_THREADS = int(os.getenv('INFERENCE_THREADS', '0'))  # CPU threads for ONNX backends (0 = runtime default)
+
+# INT8 model produced by quantize_model.py - only used while its accuracy report clears these thresholds
+INFERENCE_PRECISION = os.getenv('INFERENCE_PRECISION', 'fp32').lower()  # 'fp32' or 'int8'
+QUANT_MIN_MAP = float(os.getenv('QUANT_MIN_MAP', '0.9'))  # mAP@0.5 of INT8 against FP32 detections
+QUANT_MIN_AGREEMENT = float(os.getenv('QUANT_MIN_AGREEMENT', '0.95'))  # Images with the same top class
+
+# Warm-up - load OpenCV and the model and run dummy inferences at import time, i.e. in the gunicorn
+# master with --preload, so workers forked after every --max-requests recycle start warm
+WARMUP_ENABLED = os.getenv('WARMUP', 'false').lower() == 'true'
+WARMUP_SIZES = [int(size) for size in os.getenv('WARMUP_SIZES', '640').split(',') if size.strip()]  # Dummy image sizes
+
+# Sliced inference - images above TILE_MIN_PIXELS are also run as overlapping tiles so small lesions
+# survive the downscale to the model input size; each tile costs one more image in the forward batch
+TILED_INFERENCE = os.getenv('TILED_INFERENCE', 'false').lower() == 'true'
+TILE_MIN_PIXELS = int(os.getenv('TILE_MIN_PIXELS', '8000000'))  # ~8 MP, e.g. 3264x2448 and larger
+TILE_SIZE = int(os.getenv('TILE_SIZE', '1280'))  # Tile edge in source pixels
+TILE_OVERLAP = float(os.getenv('TILE_OVERLAP', '0.2'))  # Fraction of a tile shared with its neighbour
+TILE_MATCH_THRESHOLD = float(os.getenv('TILE_MATCH_THRESHOLD', '0.5'))  # Intersection-over-smaller to merge boxes
+
+# Fast decode - uploads are validated by magic bytes before anything is written, and JPEGs decode
+# straight to about twice the model input size (DCT-domain downscaling in libjpeg). Boxes are mapped
+# back to original image coordinates
+FAST_DECODE = os.getenv('FAST_DECODE', 'true').lower() == 'true'
+DECODE_MAX_SIDE = int(os.getenv('DECODE_MAX_SIDE', str(2 * INFERENCE_IMGSZ)))  # Shorter side kept at or above this
+
+# Upload/result storage - 'disk' writes uploads/ and results/ on the request thread, 'memory' keeps
+# them in a size-bounded in-memory store served from RAM, optionally persisted by a background writer
+STORAGE_MODE = os.getenv('STORAGE_MODE', 'disk').lower()
+MEMORY_STORE_MB = int(os.getenv('MEMORY_STORE_MB', '256'))
+MEMORY_STORE_PERSIST = os.getenv('MEMORY_STORE_PERSIST', 'false').lower() == 'true'
+
+# Content-addressed storage - uploads and annotated images are named by content hash and sharded
+# (uploads/3f/a9/<sha256>.jpg); a background collector applies these limits to each folder (0 disables)
+STORAGE_MAX_AGE_HOURS = float(os.getenv('STORAGE_MAX_AGE_HOURS', '72'))
+STORAGE_MAX_MB = int(os.getenv('STORAGE_MAX_MB', '2048'))
+STORAGE_GC_INTERVAL = float(os.getenv('STORAGE_GC_INTERVAL', '600'))  # Seconds between collections (0 disables)
+
+# Annotated images - drawn when /results/<key>.jpg (or .webp/.png) is first requested, never for JSON-only
+# clients. ?size= picks the longer side, snapped up to one of RENDER_SIZES (default: the largest)
+RENDER_SIZES = [int(size) for size in os.getenv('RENDER_SIZES', '160,320,640,1280').split(',') if size.strip()]
+RENDER_QUALITY = int(os.getenv('RENDER_QUALITY', '85'))
+RESULT_IMAGE_MAX_AGE = int(os.getenv('RESULT_IMAGE_MAX_AGE', '86400'))  # Browser cache lifetime in seconds
+
+# Stage timing - decode, save, inference, post-processing, render, provider and serialization times of each
+# request are sent as a Server-Timing header (browser devtools, load balancer logs); ?timings=true also adds
+# them to the JSON response. Off, the instrumentation is a context variable lookup per stage
+STAGE_TIMING = os.getenv('STAGE_TIMING', 'false').lower() == 'true'
+
+# Prometheus metrics at /metrics (needs prometheus_client) - with PROMETHEUS_MULTIPROC_DIR set, samples of all
+# gunicorn workers are merged, including workers already recycled by --max-requests
+METRICS_ENABLED = os.getenv('METRICS_ENABLED', 'true').lower() == 'true'
+
+# Inference server - a separate process owns the model and web workers send it images through shared
+# memory, so --workers can grow without multiplying model RAM. 'spawn' forks the server from the gunicorn
+# master (--preload), 'connect' uses servers started with `python inference_server.py`. Spawned servers get
+# a random key and a private socket directory unless configured; 'connect' needs INFERENCE_SERVER_AUTHKEY
+INFERENCE_SERVER = os.getenv('INFERENCE_SERVER', '').lower()
+INFERENCE_SOCKETS = [path.strip() for path in os.getenv('INFERENCE_SOCKETS', '').split(',') if path.strip()]
+INFERENCE_SERVER_AUTHKEY = os.getenv('INFERENCE_SERVER_AUTHKEY', '').encode()
+if INFERENCE_SERVER == 'spawn':
+    INFERENCE_SOCKETS = INFERENCE_SOCKETS or [os.path.join(tempfile.mkdtemp(prefix='leafiq-inference-'), 'server.sock')]
+    INFERENCE_SERVER_AUTHKEY = INFERENCE_SERVER_AUTHKEY or secrets.token_bytes(32)  # Inherited by forked workers
+elif INFERENCE_SERVER == 'connect':
+    INFERENCE_SOCKETS = INFERENCE_SOCKETS or [INFERENCE_SERVER_DEFAULT_SOCKET]
+    if not INFERENCE_SERVER_AUTHKEY:
+        raise RuntimeError("INFERENCE_SERVER=connect needs INFERENCE_SERVER_AUTHKEY (the key the servers were started with)")
+INFERENCE_SERVER_TIMEOUT = float(os.getenv('INFERENCE_SERVER_TIMEOUT', '120'))  # Includes the server's model load
+
+# Micro-batching scheduler - coalesces concurrent requests into one forward pass
+# (useful with threaded workers, e.g. --worker-class gthread --threads 8)
+BATCH_SCHEDULER_ENABLED = os.getenv('BATCH_SCHEDULER', 'false').lower() == 'true'
+BATCH_MAX_SIZE = int(os.getenv('BATCH_MAX_SIZE', str(INFERENCE_BATCH_SIZE)))  # Max images per scheduled batch
+BATCH_MAX_WAIT_MS = float(os.getenv('BATCH_MAX_WAIT_MS', '10'))  # Max time a request waits for others to join
+
+# Result cache - identical uploads skip inference and enrichment
+RESULT_CACHE_SIZE = int(os.getenv('RESULT_CACHE_SIZE', '256'))  # Max cached responses (0 disables)
+RESULT_CACHE_DIR = os.getenv('RESULT_CACHE_DIR', '')  # e.g. cache/results to survive worker restarts
+
+# Provider response cache - Gemini/Google/Wikipedia answers only depend on the disease name
+INFO_CACHE_PATH = os.getenv('INFO_CACHE_PATH', 'cache/disease_info.sqlite3')  # Empty disables the cache
+INFO_CACHE_TTL_HOURS = float(os.getenv('INFO_CACHE_TTL_HOURS', '168'))  # Fresh for a week
+INFO_CACHE_STALE_HOURS = float(os.getenv('INFO_CACHE_STALE_HOURS', '720'))  # Then served while refreshing in background
+INFO_CACHE_MAX_ENTRIES = int(os.getenv('INFO_CACHE_MAX_ENTRIES', '1000'))
+
+# Asynchronous jobs - /api/v1/jobs returns at once, detection and enrichment run in a background pool
+JOB_DB_PATH = os.getenv('JOB_DB_PATH', 'cache/jobs.sqlite3')
+JOB_WORKERS = int(os.getenv('JOB_WORKERS', '2'))  # Background jobs processed concurrently per worker process
+JOB_RETENTION_HOURS = float(os.getenv('JOB_RETENTION_HOURS', '24'))  # Finished jobs are purged after this
+# Callback hosts accepted without the public-address check (comma-separated) - when set, only these are accepted
+JOB_CALLBACK_ALLOWED_HOSTS = {host.strip().lower() for host in os.getenv('JOB_CALLBACK_ALLOWED_HOSTS', '').split(',') if host.strip()}
+
+# Live camera scanning - frames are posted to a session that only keeps the newest one, detection runs as
+# fast as the server allows and the class shown is the majority over the last LIVE_SMOOTHING_WINDOW frames.
+# Sessions live in the worker process that created them (run one worker, or route clients stickily)
+LIVE_MAX_SESSIONS = int(os.getenv('LIVE_MAX_SESSIONS', '4'))  # Concurrent sessions per worker process
+LIVE_SMOOTHING_WINDOW = int(os.getenv('LIVE_SMOOTHING_WINDOW', '5'))
+LIVE_IDLE_SECONDS = float(os.getenv('LIVE_IDLE_SECONDS', '30'))  # Sessions without frames are closed after this
+
+# Bump a provider's version when its prompt or queries change so cached answers are regenerated
+PROVIDER_VERSIONS = {
+    'gemini': 'gemini-1.5-flash/v1',  # Keep in sync with GEMINI_MODEL_NAME
+    'google_search': 'v1',
+    'wikipedia': 'v1'
+}
+
 # Create upload and results directories if they don't exist
 os.makedirs(app.config['UPLOAD_FOLDER'], exist_ok=True)
 os.makedirs(app.config['RESULTS_FOLDER'], exist_ok=True)
@@ -89,6 +275,61 @@ os.makedirs(app.config['RESULTS_FOLDER'], exist_ok=True)
 # Model will be loaded lazily when needed
 MODEL_PATH = 'model/best.pt'
 model = None
+model_version = None
+model_precision = None
+
+# The in-process model is shared by request threads, job workers and live sessions, but the ultralytics
+# predictor keeps per-call state on the model - forward passes take model_lock, one at a time. Calls to
+# the inference server are not locked (it batches requests itself)
+model_lock = threading.Lock()
+model_load_lock = threading.Lock()
+
+result_cache = ResultCache(max_entries=RESULT_CACHE_SIZE, persist_dir=RESULT_CACHE_DIR)
+
+provider_cache = None
+if INFO_CACHE_PATH:
+    try:
+        provider_cache = ProviderCache(INFO_CACHE_PATH,
+                                       ttl_seconds=INFO_CACHE_TTL_HOURS * 3600,
+                                       stale_seconds=INFO_CACHE_STALE_HOURS * 3600,
+                                       max_entries=INFO_CACHE_MAX_ENTRIES)
+        print(f"✅ Provider cache ready: {INFO_CACHE_PATH}")
+    except Exception as e:
+        print(f"⚠️ Provider cache disabled: {e}")
+
+render_stats = {'rendered': 0, 'cached': 0, 'not_modified': 0, 'render_ms': 0.0}
+
+metrics_enabled = METRICS_ENABLED and metrics.setup()
+if METRICS_ENABLED and not metrics_enabled:
+    print("⚠️ /metrics disabled: prometheus_client is not installed")
+
+startup_stats = {
+    'warmup': 'Disabled',
+    'startup_seconds': None,
+    'first_request': None
+}
+
+blob_store = None
+if STORAGE_MODE == 'memory':
+    blob_store = BlobStore(MEMORY_STORE_MB * 1024 * 1024, persist=MEMORY_STORE_PERSIST)
+    print(f"✅ In-memory blob store ready ({MEMORY_STORE_MB}MB, persistence {'on' if MEMORY_STORE_PERSIST else 'off'})")
+
+upload_store = ContentStore(app.config['UPLOAD_FOLDER'], max_age_seconds=STORAGE_MAX_AGE_HOURS * 3600,
+                            max_bytes=STORAGE_MAX_MB * 1024 * 1024)
+result_store = ContentStore(app.config['RESULTS_FOLDER'], max_age_seconds=STORAGE_MAX_AGE_HOURS * 3600,
+                            max_bytes=STORAGE_MAX_MB * 1024 * 1024)
+
+inference_client = None
+if INFERENCE_SERVER in ('spawn', 'connect'):
+    inference_client = InferenceClient(INFERENCE_SOCKETS, INFERENCE_SERVER_AUTHKEY, timeout=INFERENCE_SERVER_TIMEOUT)
+
+job_db = JobStore(JOB_DB_PATH)
+upload_store.pinned = job_db.active_image_paths  # Queued jobs may wait past the GC grace period
+live_sessions = {}
+live_sessions_lock = threading.Lock()
+job_pool = None
+job_pool_pid = None
+job_pool_lock = threading.Lock()
 
 def get_cv2():
     """Lazy load OpenCV"""
@@ -100,22 +341,92 @@ def get_cv2():
     return cv2
 
 def get_yolo_model():
-    """Lazy load YOLO model"""
-    global model, YOLO
+    """Lazy load YOLO model - once, even when several threads ask for it at the same time"""
+    global model, model_version
     if model is None:
+        with model_load_lock:
+            if model is None:
+                started = time.perf_counter()
+                loaded = load_yolo_model()
+                if loaded is not None:
+                    metrics.set_model_load(time.perf_counter() - started, INFERENCE_BACKEND, model_precision)
+                    model = loaded
+                    model_version = None  # Precision is only known now - recompute the cache key suffix
+    return model
+
+def load_yolo_model():
+    """Load the YOLO model for INFERENCE_BACKEND / INFERENCE_PRECISION - None if it cannot be loaded"""
+    global YOLO, model_precision
+    if INFERENCE_PRECISION == 'int8':
+        try:
+            from quantize_model import load_quantized_model
+            # The INT8 model is ONNX-only; the PyTorch backend falls back to onnxruntime for it
+            runtime = INFERENCE_BACKEND if INFERENCE_BACKEND != 'pytorch' else 'onnxruntime'
+            loaded = load_quantized_model(MODEL_PATH, runtime=runtime, threads=INFERENCE_THREADS or None,
+                                          min_map=QUANT_MIN_MAP, min_agreement=QUANT_MIN_AGREEMENT)
+            model_precision = 'int8'
+            print(f"✅ INT8 model loaded successfully ({runtime})! Model has {len(loaded.names)} classes")
+            return loaded
+        except Exception as e:
+            print(f"⚠️ INT8 model not used, falling back to FP32: {e}")
+    model_precision = 'fp32'
+    try:
+        if INFERENCE_BACKEND != 'pytorch':
+            from onnx_backend import load_onnx_model
+            print(f"🔄 Loading {INFERENCE_BACKEND} model for {MODEL_PATH}...")
+            loaded = load_onnx_model(MODEL_PATH, runtime=INFERENCE_BACKEND, imgsz=INFERENCE_IMGSZ,
+                                     threads=INFERENCE_THREADS or None)
+            print(f"✅ {INFERENCE_BACKEND} model loaded successfully! Model has {len(loaded.names)} classes")
+            return loaded
+        if YOLO is None:
+            print("🔄 Importing ultralytics...")
+            from ultralytics import YOLO
+            print("✅ Ultralytics imported successfully")
+        print(f"🔄 Loading YOLO model from {MODEL_PATH}...")
+        loaded = YOLO(MODEL_PATH)
+        print(f"✅ YOLO model loaded successfully! Model has {len(loaded.names)} classes")
+        print(f"📋 Available classes: {list(loaded.names.values())[:10]}...")  # Show first 10 classes
+        return loaded
+    except Exception as e:
+        print(f"❌ Error loading YOLO model: {e}")
+        return None
+
+def resolve_model_precision():
+    """Precision the model really runs at - None while unknown (model not loaded, server unreachable)"""
+    if INFERENCE_PRECISION != 'int8':
+        return 'fp32'
+    if inference_client is not None:
         try:
-            if YOLO is None:
-                print("🔄 Importing ultralytics...")
-                from ultralytics import YOLO
-                print("✅ Ultralytics imported successfully")
-            print(f"🔄 Loading YOLO model from {MODEL_PATH}...")
-            model = YOLO(MODEL_PATH)
-            print(f"✅ YOLO model loaded successfully! Model has {len(model.names)} classes")
-            print(f"📋 Available classes: {list(model.names.values())[:10]}...")  # Show first 10 classes
+            return inference_client.info().get('precision')
         except Exception as e:
-            print(f"❌ Error loading YOLO model: {e}")
+            print(f"⚠️ Could not ask the inference server for its precision: {e}")
             return None
-    return model
+    get_yolo_model()
+    return model_precision
+
+def get_model_version():
+    """Short content hash of the model weights, used to invalidate cached results"""
+    global model_version
+    if model_version is None:
+        try:
+            with open(MODEL_PATH, 'rb') as f:
+                version = hashlib.sha256(f.read()).hexdigest()[:16]
+        except OSError:
+            version = 'unknown'
+        if INFERENCE_BACKEND != 'pytorch':
+            # Backends agree closely but not bit-for-bit, so they get separate cache entries
+            version = f"{version}-{INFERENCE_BACKEND}"
+        precision = resolve_model_precision()
+        if precision == 'int8':  # Not when the INT8 model was refused and FP32 serves instead
+            version = f"{version}-int8"
+        if TILED_INFERENCE:
+            version = f"{version}-tiled{TILE_SIZE}"
+        if FAST_DECODE:
+            version = f"{version}-decode{DECODE_MAX_SIDE}"
+        if precision is None:
+            return version  # Not kept - asked again once the model is available
+        model_version = version
+    return model_version
 
 # Disease information database
 DISEASE_INFO = {
@@ -830,24 +1141,90 @@ DISEASE_INFO = {
     }
 }
 
+def get_http_session(url):
+    """Shared keep-alive session for the URL's host, so provider calls skip the TCP+TLS handshake"""
+    global http_sessions, http_sessions_pid
+    host = urlparse(url).netloc
+    with http_sessions_lock:
+        # Sockets must not be shared with the gunicorn master or sibling workers
+        if http_sessions_pid != os.getpid():
+            http_sessions = {}
+            http_sessions_pid = os.getpid()
+        
+        session = http_sessions.get(host)
+        if session is None:
+            # Retry idempotent requests on connection errors and gateway failures only;
+            # rate limits and slow reads are left to the circuit breaker
+            retry = Retry(total=MAX_API_RETRIES, read=0, backoff_factor=0.2,
+                          status_forcelist=(502, 503, 504), allowed_methods=frozenset(['GET']),
+                          raise_on_status=False)
+            adapter = HTTPAdapter(pool_connections=1, pool_maxsize=HTTP_POOL_SIZE, max_retries=retry)
+            session = requests.Session()
+            session.mount('https://', adapter)
+            session.mount('http://', adapter)
+            http_sessions[host] = session
+            print(f"✅ HTTP session created for {host}")
+        return session
+
+def get_gemini_model():
+    """Lazy load the Gemini model handle (once per worker process)"""
+    global gemini_model, gemini_model_pid
+    if gemini_model is None or gemini_model_pid != os.getpid():
+        genai.configure(api_key=GEMINI_API_KEY)
+        gemini_model = genai.GenerativeModel(GEMINI_MODEL_NAME)
+        gemini_model_pid = os.getpid()
+        print(f"✅ Gemini model {GEMINI_MODEL_NAME} ready")
+    return gemini_model
+
+def provider_request(method, url, default_timeout, **kwargs):
+    """HTTP call for a knowledge provider with an adaptive timeout - raises ProviderUnavailable when the service fails"""
+    start = time.monotonic()
+    try:
+        response = get_http_session(url).request(method, url, timeout=provider_timeout(default_timeout), **kwargs)
+    except requests.RequestException as e:
+        raise ProviderUnavailable(str(e)) from e
+    if response.status_code == 429:
+        raise ProviderUnavailable('rate limit reached (HTTP 429)')
+    if response.status_code >= 500:
+        raise ProviderUnavailable(f"HTTP {response.status_code}")
+    observe_latency(time.monotonic() - start)
+    return response
+
+def cached_provider_call(provider, disease_name, fetch):
+    """Call a knowledge provider through the persistent provider cache and its circuit breaker"""
+    fetched_by = []
+    def call():
+        fetched_by.append(threading.get_ident())
+        return provider_breakers[provider].call(metrics.observe_provider(provider, fetch), disease_name)
+    with stage(provider):
+        if provider_cache is None:
+            return call()
+        info = provider_cache.fetch(provider, disease_name, PROVIDER_VERSIONS[provider], call)
+        # Stale answers are refreshed on another thread - like fresh ones, they count as hits
+        metrics.count_cache('provider', threading.get_ident() not in fetched_by)
+        return info
+
 def get_disease_info_from_api(disease_name):
     """Get disease information from online APIs - prioritizing AI and research sources"""
     try:
-        # Try Gemini AI first for comprehensive analysis
+        providers = []
+        
+        # Gemini AI for comprehensive analysis
         if GEMINI_API_KEY:
-            info = get_gemini_disease_info(disease_name)
-            if info:
-                return info
+            providers.append(('Gemini AI', bind(lambda: cached_provider_call('gemini', disease_name, get_gemini_disease_info))))
         
-        # Try Google Custom Search as secondary source (university research)
+        # Google Custom Search (university research)
         if GOOGLE_API_KEY and GOOGLE_SEARCH_ENGINE_ID:
-            info = search_agricultural_info(disease_name)
-            if info:
-                return info
+            providers.append(('Google Search', bind(lambda: cached_provider_call('google_search', disease_name, search_agricultural_info))))
+        
+        # Wikipedia API (basic scientific info)
+        providers.append(('Wikipedia', bind(lambda: cached_provider_call('wikipedia', disease_name, get_wikipedia_disease_info))))
         
-        # Try Wikipedia API as tertiary source (basic scientific info)
-        info = get_wikipedia_disease_info(disease_name)
+        # Run providers concurrently - the best-ranked answer wins, the rest are cancelled
+        providers.sort(key=lambda provider: API_QUALITY_RANKING.get(provider[0], 0), reverse=True)
+        source, info = first_good_result(providers, PROVIDER_DEADLINE, provider_pool, stagger=PROVIDER_HEDGE_DELAY)
         if info:
+            print(f"✅ Using {source} info for: {disease_name}")
             return info
             
     except Exception as e:
@@ -917,8 +1294,7 @@ def get_wikipedia_disease_info(disease_name):
         for term in search_terms:
             try:
                 # Search Wikipedia with proper headers
-                search_url = "https://en.wikipedia.org/api/rest_v1/page/summary/"
-                response = requests.get(f"{search_url}{term}", headers=headers, timeout=5)
+                response = provider_request('GET', f"{WIKIPEDIA_API_URL}{term}", API_TIMEOUT, headers=headers)
                 
                 if response.status_code == 200:
                     data = response.json()
@@ -936,13 +1312,18 @@ def get_wikipedia_disease_info(disease_name):
                             'source': f'Wikipedia API ({data.get("title", term)})',
                             'is_structured': False  # Wikipedia provides unstructured data
                         }
+            except ProviderUnavailable:
+                raise
             except Exception as e:
                 print(f"Wikipedia search failed for {term}: {str(e)}")
                 continue
                 
-            # Be respectful to Wikipedia servers
-            time.sleep(0.5)
+            # Be respectful to Wikipedia servers (stop early if another provider already answered)
+            if cancellable_sleep(0.5):
+                break
                 
+    except ProviderUnavailable:
+        raise
     except Exception as e:
         print(f"Wikipedia API error: {str(e)}")
     
@@ -955,7 +1336,7 @@ def search_agricultural_info(disease_name):
     
     try:
         # Google Custom Search API
-        search_url = "https://www.googleapis.com/customsearch/v1"
+        search_url = GOOGLE_SEARCH_API_URL
         
         # Create targeted search queries
         search_queries = [
@@ -975,7 +1356,7 @@ def search_agricultural_info(disease_name):
                 }
                 
                 print(f"🔍 Searching Google for: {query}")
-                response = requests.get(search_url, params=params, timeout=10)
+                response = provider_request('GET', search_url, 10, params=params)
                 
                 if response.status_code == 200:
                     data = response.json()
@@ -1007,19 +1388,21 @@ def search_agricultural_info(disease_name):
                                 'is_structured': False  # Google provides unstructured snippets
                             }
                 
-                elif response.status_code == 429:
-                    print("⏰ Google API rate limit reached")
-                    break
                 else:
                     print(f"❌ Google API error: {response.status_code}")
                 
-                # Respect rate limits
-                time.sleep(1)
+                # Respect rate limits (stop early if another provider already answered)
+                if cancellable_sleep(1):
+                    break
                 
+            except ProviderUnavailable:
+                raise
             except Exception as e:
                 print(f"Google search error for '{query}': {str(e)}")
                 continue
         
+    except ProviderUnavailable:
+        raise
     except Exception as e:
         print(f"Google search error: {str(e)}")
     
@@ -1031,9 +1414,8 @@ def get_gemini_disease_info(disease_name):
         if not GEMINI_API_KEY:
             return None
             
-        # Configure Gemini API
-        genai.configure(api_key=GEMINI_API_KEY)
-        model = genai.GenerativeModel('gemini-1.5-flash')
+        # Reuse the process-wide Gemini client
+        model = get_gemini_model()
         
         # Check if it's a healthy plant
         is_healthy = ('leaf' in disease_name.lower() and 
@@ -1088,8 +1470,13 @@ PREVENTION: List preventive measures:
 
 Provide complete, detailed information in each section. Do not truncate any section."""
 
-        # Generate response
-        response = model.generate_content(prompt)
+        # Generate response (failures and timeouts here mean the service itself is unavailable)
+        try:
+            response = call_with_timeout(gemini_pool, API_TIMEOUT, model.generate_content, prompt)
+        except ProviderUnavailable:
+            raise
+        except Exception as e:
+            raise ProviderUnavailable(f"Gemini API error: {e}") from e
         
         if response.text and len(response.text) > 100:
             print(f"✅ Found Gemini AI info for: {disease_name}")
@@ -1107,6 +1494,8 @@ Provide complete, detailed information in each section. Do not truncate any sect
                 'is_structured': True  # Flag to indicate this is clean API data
             }
     
+    except ProviderUnavailable:
+        raise
     except Exception as e:
         print(f"Gemini API error: {str(e)}")
     
@@ -1278,19 +1667,19 @@ def get_plantnet_disease_info(disease_name, image_path=None):
             return None
         
         # PlantNet API endpoint
-        url = "https://my-api.plantnet.org/v2/identify/weurope"
+        url = PLANTNET_API_URL
         
-        if image_path and os.path.exists(image_path):
+        if image_path and blob_exists(image_path):
             # Prepare the image for PlantNet
             files = [
-                ('images', (os.path.basename(image_path), open(image_path, 'rb'), 'image/jpeg')),
+                ('images', (os.path.basename(image_path), read_blob(image_path), 'image/jpeg')),
                 ('modifiers', (None, "crops")),
                 ('modifiers', (None, "similar_images")),
                 ('api-key', (None, PLANTNET_API_KEY))
             ]
             
             # Send request to PlantNet
-            response = requests.post(url, files=files, timeout=10)
+            response = provider_request('POST', url, 10, files=files)
             
             if response.status_code == 200:
                 data = response.json()
@@ -1325,6 +1714,8 @@ def get_plantnet_disease_info(disease_name, image_path=None):
             else:
                 print(f"PlantNet API error: {response.status_code}")
                 
+    except ProviderUnavailable:
+        raise
     except Exception as e:
         print(f"PlantNet API error: {str(e)}")
     
@@ -1482,79 +1873,428 @@ def get_disease_info(disease_name, use_api=True):
     
     return local_info
 
-def process_image(image_path):
-    """Process image with YOLO model and return results"""
+def is_healthy_class(disease_name):
+    """Check if a class is a healthy plant (contains "leaf" without disease terms)"""
+    return ('leaf' in disease_name.lower() and
+            not any(disease_term in disease_name.lower()
+                    for disease_term in ['blight', 'rust', 'spot', 'rot', 'scab', 'mosaic', 'virus', 'bacterial']))
+
+def decode_image_bytes(data):
+    """Decode raw image bytes into a full-resolution BGR numpy array that YOLO accepts directly"""
+    return decode_image(data).image
+
+def scale_detections(detections, scale):
+    """Map bboxes from a downscaled decode back onto the original image"""
+    scale_x, scale_y = scale
+    for detection in detections:
+        x1, y1, x2, y2 = detection['bbox']
+        detection['bbox'] = [x1 * scale_x, y1 * scale_y, x2 * scale_x, y2 * scale_y]
+    return detections
+
+def run_yolo_batch(images):
+    """Run YOLO on a list of images (paths or arrays), INFERENCE_BATCH_SIZE images per forward pass"""
+    if inference_client is not None:
+        # The inference server batches requests from all workers itself
+        started = time.perf_counter()
+        results = inference_client(images, conf=CONFIDENCE_THRESHOLD)
+        metrics.observe_inference(len(images), time.perf_counter() - started)
+        return results
+
+    model = get_yolo_model()
+    if model is None:
+        raise Exception("YOLO model not loaded properly")
+    
+    results = []
+    for start in range(0, len(images), INFERENCE_BATCH_SIZE):
+        batch = images[start:start + INFERENCE_BATCH_SIZE]
+        print(f"🔄 Running YOLO inference on a batch of {len(batch)} image(s)...")
+        with model_lock:
+            started = time.perf_counter()
+            results.extend(model(batch, conf=CONFIDENCE_THRESHOLD))
+            metrics.observe_inference(len(batch), time.perf_counter() - started)
+    if BATCH_SCHEDULER_ENABLED:
+        metrics.set_queue_depth('inference', inference_scheduler.stats()['queue_depth'])
+    return results
+
+# The scheduler thread is the only caller of the model when it is enabled
+inference_scheduler = MicroBatchScheduler(run_yolo_batch, max_batch_size=BATCH_MAX_SIZE, max_wait_ms=BATCH_MAX_WAIT_MS)
+
+def load_server_model():
+    """Model loader run inside a spawned inference server"""
+    global inference_client
+    inference_client = None  # Forked from a web process - this process owns the model itself
+    if WARMUP_ENABLED:
+        startup_stats['warmup'] = warm_up()
+    return get_yolo_model()
+
+def start_inference_servers():
+    """Fork one inference server per socket; each loads its own copy of the model"""
+    import multiprocessing
+    context = multiprocessing.get_context('fork')
+    for address in INFERENCE_SOCKETS:
+        process = context.Process(target=serve_inference, name='inference-server', daemon=True,
+                                  args=(address, load_server_model, INFERENCE_SERVER_AUTHKEY),
+                                  kwargs={'max_batch_size': BATCH_MAX_SIZE, 'max_wait_ms': BATCH_MAX_WAIT_MS,
+                                          'precision': lambda: model_precision})
+        process.start()
+        print(f"🔄 Started inference server process {process.pid} on {address}")
+
+def warm_up():
+    """Load OpenCV and the model and run a dummy inference per size and batch size"""
+    start = time.perf_counter()
+    get_cv2()
+    model = get_yolo_model()
+    get_model_version()
+    load_seconds = time.perf_counter() - start
+    if model is None:
+        print("⚠️ Warm-up incomplete - YOLO model failed to load")
+        return {'status': 'model_failed', 'load_seconds': round(load_seconds, 2)}
+
+    inference_ms = {}
+    for size in WARMUP_SIZES:
+        image = np.full((size, size, 3), 114, dtype=np.uint8)
+        for batch_size in sorted({1, INFERENCE_BATCH_SIZE}):
+            batch_start = time.perf_counter()
+            with model_lock:
+                model([image] * batch_size, conf=CONFIDENCE_THRESHOLD)
+            inference_ms[f"{size}px_batch{batch_size}"] = round((time.perf_counter() - batch_start) * 1000, 1)
+
+    # Everything allocated so far is shared with forked workers - keep the collector from
+    # touching (and so copying) those pages
+    gc.collect()
+    gc.freeze()
+    print(f"🔥 Warm-up done: model loaded in {load_seconds:.2f}s, dummy inference {inference_ms} ms, "
+          f"{gc.get_freeze_count()} objects frozen")
+    return {
+        'status': 'done',
+        'load_seconds': round(load_seconds, 2),
+        'inference_ms': inference_ms,
+        'frozen_objects': gc.get_freeze_count()
+    }
+
+def infer(images):
+    """Run YOLO on images, through the micro-batching scheduler when it is enabled"""
+    if BATCH_SCHEDULER_ENABLED:
+        return inference_scheduler.map(images)
+    return run_yolo_batch(images)
+
+def extract_detections(result):
+    """Convert a single YOLO result into a list of detection dicts"""
+    detections = []
+    
+    # Get class names
+    names = result.names
+    
+    # Process detections
+    if result.boxes is not None:
+        boxes = result.boxes
+        print(f"🔍 Found {len(boxes)} detection boxes")
+        for i, box in enumerate(boxes):
+            # Get class ID and confidence
+            class_id = int(box.cls[0])
+            confidence = float(box.conf[0])
+            
+            print(f"📊 Detection {i+1}: Class {class_id}, Confidence {confidence:.3f}")
+            
+            # Get class name
+            class_name = names.get(class_id, f"Unknown_{class_id}")
+            print(f"🏷️ Class name: {class_name}")
+            
+            # Get bounding box coordinates
+            coords = box.xyxy[0].tolist()
+            
+            detections.append({
+                'class_name': class_name,
+                'class_id': class_id,
+                'confidence': confidence,
+                'bbox': coords
+            })
+    else:
+        print("❌ No detection boxes found")
+    
+    return detections
+
+def write_blob(path, data):
+    """Store an upload or annotated image - in the blob store when enabled, otherwise on disk"""
+    if blob_store is not None:
+        blob_store.put(path, data)
+        return
+    write_file_atomic(path, data)
+
+def read_blob(path):
+    """Bytes of a stored upload or annotated image (raises OSError if it is gone)"""
+    if blob_store is not None:
+        data = blob_store.get(path)
+        if data is not None:
+            return data
+    with open(path, 'rb') as f:
+        return f.read()
+
+def blob_exists(path):
+    return (blob_store is not None and blob_store.exists(path)) or os.path.exists(path)
+
+def send_blob(store, filename):
+    """Serve a stored file by its public name, from memory if possible, else from disk"""
+    path = store.path(filename)
+    if path is None:
+        # Flat names from before content-addressed storage
+        return send_from_directory(store.root, filename)
+    if blob_store is not None:
+        data = blob_store.get(path)
+        if data is not None:
+            return Response(data, mimetype=mimetypes.guess_type(filename)[0] or 'application/octet-stream')
+    return send_from_directory(os.path.dirname(path), filename)
+
+@timed('save')
+def save_upload(data, durable=False):
+    """Store an upload under its content hash - identical uploads share one file
+
+    durable uploads always go to disk, even with the in-memory blob store.
+    """
+    file_path = upload_store.path_for(hashlib.sha256(data).hexdigest(), extension_for(sniff_image_type(data)))
+    if os.path.exists(file_path) if durable else blob_exists(file_path):
+        upload_store.touch(file_path)
+    elif durable:
+        write_file_atomic(file_path, data)
+    else:
+        write_blob(file_path, data)
+    return file_path
+
+@timed('render_manifest')
+def save_render_manifest(result_key, image_path, detections):
+    """Record what the annotated image needs - it is only drawn when /results/<key>.jpg is requested"""
+    try:
+        write_blob(result_store.path_for(result_key, '.json'), manifest_bytes(image_path, detections))
+        return result_key
+    except Exception as e:
+        print(f"⚠️ Could not save render manifest: {e}")
+        # Continue without an annotated image - detection still works
+        return None
+
+def load_render_manifest(result_key):
+    """The result's render manifest if it and its upload are still stored, else None"""
+    manifest_path = result_store.path_for(result_key, '.json')
+    try:
+        manifest = parse_manifest(read_blob(manifest_path))
+    except (OSError, ValueError):
+        return None
+    if not blob_exists(manifest['image']):
+        return None
+    # Still in use - keep both through size-based collection
+    result_store.touch(manifest_path)
+    upload_store.touch(manifest['image'])
+    return manifest
+
+def result_image_url(result_key):
+    return f'/results/{result_key}.jpg' if result_key else None
+
+def detect_tiled(data, tiling=None):
+    """Sliced inference for images above TILE_MIN_PIXELS - None for smaller images"""
+    with Image.open(io.BytesIO(data)) as image:
+        width, height = image.size  # Reads the header only
+    if width * height < TILE_MIN_PIXELS:
+        return None
+    
+    from onnx_backend import DetectionResult
+    image = decode_image_bytes(data)
+    
+    names = {}
+    def run_batch(crops):
+        # All tiles of the image go through the model together
+        results = infer(crops)
+        names.update(results[0].names)
+        return [result_to_array(result) for result in results]
+    
+    detections, stats = sliced_detections(image, run_batch, tile_size=TILE_SIZE, overlap=TILE_OVERLAP,
+                                          match_threshold=TILE_MATCH_THRESHOLD)
+    print(f"🧩 Tiled inference on {width}x{height}: {stats['tiles']} tiles, {stats['raw_detections']} boxes merged "
+          f"into {stats['merged_detections']} ({stats['inference_ms']:.0f}ms inference, {stats['merge_ms']:.1f}ms merge)")
+    if tiling is not None:
+        tiling.update(stats)
+    return DetectionResult(image, detections, names)
+
+def process_image(image_path, tiling=None, data=None, result_key=None):
+    """Process image with YOLO model and return (detections, result key of the annotated image)
+
+    tiling, if given, receives sliced-inference stats. data is the upload already in memory; it is
+    read from image_path when not given. result_key is the result cache key, computed when not given.
+    """
     try:
         print(f"🔄 Starting image processing for: {image_path}")
         
         # Check if model loaded successfully
-        # Get YOLO model (lazy loading)
-        model = get_yolo_model()
+        # Get YOLO model (lazy loading) - or the inference server client, which this worker uses instead
+        model = inference_client or get_yolo_model()
         if model is None:
             raise Exception("YOLO model not loaded properly")
             
         print(f"🔄 Running YOLO inference on {image_path}...")
         
         # Run inference with lower confidence threshold
-        results = model(image_path, conf=0.1)  # Lower confidence to 10%
+        if data is None:
+            data = read_blob(image_path)
+        with stage('inference'):
+            tiled_result = detect_tiled(data, tiling) if TILED_INFERENCE else None
+        if tiled_result is None:
+            with stage('decode'):
+                decoded = decode_image(data, max_side=DECODE_MAX_SIDE if FAST_DECODE else None)
+            source, scale = decoded.image, decoded.scale
         
-        print(f"🔍 YOLO results: {len(results)} result(s)")
+        with stage('inference'):
+            if tiled_result is not None:
+                results = [tiled_result]
+            elif BATCH_SCHEDULER_ENABLED and inference_client is None:
+                results = [inference_scheduler.submit(source)]
+            else:
+                with model_lock if inference_client is None else nullcontext():
+                    started = time.perf_counter()
+                    results = model(source, conf=CONFIDENCE_THRESHOLD)
+                    metrics.observe_inference(1, time.perf_counter() - started)
         
-        # Extract detection information
-        detections = []
+        print(f"🔍 YOLO results: {len(results)} result(s)")
         
         if len(results) > 0:
             result = results[0]
             
-            # Get class names
-            names = result.names
-            
-            # Process detections
-            if result.boxes is not None:
-                boxes = result.boxes
-                print(f"🔍 Found {len(boxes)} detection boxes")
-                for i, box in enumerate(boxes):
-                    # Get class ID and confidence
-                    class_id = int(box.cls[0])
-                    confidence = float(box.conf[0])
-                    
-                    print(f"📊 Detection {i+1}: Class {class_id}, Confidence {confidence:.3f}")
-                    
-                    # Get class name
-                    class_name = names.get(class_id, f"Unknown_{class_id}")
-                    print(f"🏷️ Class name: {class_name}")
-                    
-                    # Get bounding box coordinates
-                    coords = box.xyxy[0].tolist()
-                    
-                    detections.append({
-                        'class_name': class_name,
-                        'confidence': confidence,
-                        'bbox': coords
-                    })
-            else:
-                print("❌ No detection boxes found")
-            
-            # Save annotated image (optional - don't fail if cv2 has issues)
-            result_path = None
-            try:
-                annotated_image = result.plot()
-                result_path = os.path.join(app.config['RESULTS_FOLDER'], 'annotated_' + os.path.basename(image_path))
-                cv2_module = get_cv2()
-                cv2_module.imwrite(result_path, annotated_image)
-                print(f"✅ Saved annotated image: {result_path}")
-            except Exception as cv2_error:
-                print(f"⚠️ Could not save annotated image (cv2 error): {cv2_error}")
-                # Continue without saving the image - detection still works
+            # Extract detection information
+            with stage('postprocess'):
+                detections = extract_detections(result)
+                if tiled_result is None:
+                    scale_detections(detections, scale)
+            result_key = result_key or make_result_key(data, get_model_version(), CONFIDENCE_THRESHOLD)
+            result_key = save_render_manifest(result_key, image_path, detections)
             
             print(f"✅ Total detections found: {len(detections)}")
             
-            return detections, result_path
+            return detections, result_key
     
     except Exception as e:
         print(f"Error processing image: {str(e)}")
         return [], None
 
+def process_image_batch(images, image_paths, result_keys, scales=None):
+    """Process decoded images with batched YOLO inference and return per-image (detections, result key)"""
+    with stage('inference'):
+        results = infer(images)
+    
+    outputs = []
+    for index, (result, image_path, result_key) in enumerate(zip(results, image_paths, result_keys)):
+        with stage('postprocess'):
+            detections = extract_detections(result)
+            if scales is not None:
+                scale_detections(detections, scales[index])
+        outputs.append((detections, save_render_manifest(result_key, image_path, detections)))
+    return outputs
+
+def resolve_disease_info(disease_name, image_path=None):
+    """Get disease information for one detected class"""
+    if is_healthy_class(disease_name) and PLANTNET_API_KEY:
+        # For healthy plants, try PlantNet identification first
+        with stage('plantnet'):
+            plantnet_info = provider_breakers['plantnet'].call(metrics.observe_provider('plantnet', get_plantnet_disease_info),
+                                                               disease_name, image_path)
+        if plantnet_info:
+            return plantnet_info
+    return get_disease_info(disease_name, use_api=USE_EXTERNAL_APIs)
+
+def iter_disease_info(detections, image_path=None):
+    """Resolve disease information once per distinct class (in parallel), yielding (class_name, info) as each arrives"""
+    classes = list(dict.fromkeys(detection['class_name'] for detection in detections))
+    if not classes:
+        return
+    if len(classes) == 1:
+        yield classes[0], resolve_disease_info(classes[0], image_path)
+        return
+    
+    print(f"🔄 Fetching disease info for {len(classes)} distinct classes ({len(detections)} detections)")
+    with ThreadPoolExecutor(max_workers=min(ENRICHMENT_WORKERS, len(classes))) as pool:
+        futures = {pool.submit(bind(resolve_disease_info), disease_name, image_path): disease_name
+                   for disease_name in classes}
+        for future in as_completed(futures):
+            yield futures[future], future.result()
+
+def enrich_detections(detections, image_path=None):
+    """Resolve disease information once per distinct class - returns {class_name: info}"""
+    return dict(iter_disease_info(detections, image_path))
+
+def summarize_detections(detections):
+    """Per-class summary with count, max confidence and the union of all boxes"""
+    summary = {}
+    for detection in detections:
+        disease_name = detection['class_name']
+        x1, y1, x2, y2 = detection['bbox']
+        entry = summary.get(disease_name)
+        if entry is None:
+            summary[disease_name] = {
+                'disease': disease_name,
+                'count': 1,
+                'max_confidence': detection['confidence'],
+                'bbox': [x1, y1, x2, y2],
+                'is_healthy': is_healthy_class(disease_name)
+            }
+        else:
+            entry['count'] += 1
+            entry['max_confidence'] = max(entry['max_confidence'], detection['confidence'])
+            box = entry['bbox']
+            entry['bbox'] = [min(box[0], x1), min(box[1], y1), max(box[2], x2), max(box[3], y2)]
+    return sorted(summary.values(), key=lambda entry: entry['max_confidence'], reverse=True)
+
+def build_detection_response(detections, result_key, tiling=None):
+    """/upload response skeleton - detections and per-class summary, disease info still to come"""
+    response_data = {
+        'detections': [],
+        'summary': summarize_detections(detections),
+        'result_image': result_image_url(result_key)
+    }
+    if tiling:
+        response_data['tiling'] = tiling
+    
+    for detection in detections:
+        response_data['detections'].append({
+            'disease': detection['class_name'],
+            'confidence': detection['confidence'],
+            'bbox': detection['bbox'],
+            'is_healthy': is_healthy_class(detection['class_name'])
+        })
+    return response_data
+
+def attach_disease_info(response_data, class_info):
+    """Share each class's disease information across all of its detections"""
+    for detection in response_data['detections']:
+        detection['info'] = class_info[detection['disease']]
+    return response_data
+
+def analyze_image(file_path, data=None, result_key=None):
+    """Run detection and enrichment on a saved upload and build the /upload response"""
+    # Process image
+    tiling = {}
+    detections, result_key = process_image(file_path, tiling, data, result_key)
+    print(f"✅ Image processed successfully")
+    
+    # Resolve disease information once per distinct class, then share it across boxes
+    response_data = build_detection_response(detections, result_key, tiling)
+    with stage('enrichment'):
+        class_info = enrich_detections(detections, file_path)
+    return attach_disease_info(response_data, class_info)
+
+def with_timings(response_data):
+    """response_data with a 'timings' block (ms per stage so far) if timing is on and ?timings=true was asked for"""
+    timings = stage_timing.current()
+    if timings is None or request.args.get('timings', '').lower() not in ('1', 'true'):
+        return response_data
+    return dict(response_data, timings=timings.as_dict())
+
+def get_cached_result(cache_key):
+    """Return a cached /upload response if its annotated image can still be rendered"""
+    cached = result_cache.get(cache_key)
+    result_image = cached.get('result_image') if cached is not None else None
+    if result_image and load_render_manifest(os.path.splitext(os.path.basename(result_image))[0]) is None:
+        result_cache.discard(cache_key)
+        cached = None
+    if result_cache.enabled:
+        metrics.count_cache('result', cached is not None)
+    return cached
+
 @app.route('/')
 def index():
     return render_template('index.html')
@@ -1570,61 +2310,448 @@ def upload_file():
             return jsonify({'error': 'No file selected'}), 400
         
         if file:
-            # Save uploaded file
-            filename = secure_filename(file.filename)
-            file_path = os.path.join(app.config['UPLOAD_FOLDER'], filename)
-            file.save(file_path)
+            filename = secure_filename(file.filename)  # Only for logs - storage is named by content
+            data = file.read()
             
-            print(f"🔄 Processing image: {filename}")
+            # Reject anything that isn't an image before it is written or processed
+            if sniff_image_type(data) is None:
+                return jsonify({'error': 'Invalid or unsupported image file'}), 400
             
-            # Process image
-            detections, result_path = process_image(file_path)
-            print(f"✅ Image processed successfully")
+            # Identical uploads return the cached response without inference or API calls
+            cache_key = make_result_key(data, get_model_version(), CONFIDENCE_THRESHOLD)
+            cached = get_cached_result(cache_key)
+            if cached is not None:
+                print(f"⚡ Cache hit for {filename}")
+                return jsonify(with_timings(dict(cached, cached=True)))
             
-            # Prepare response
-            response_data = {
-                'detections': [],
-            'result_image': None
-        }
+            # Save uploaded file
+            file_path = save_upload(data)
+            
+            print(f"🔄 Processing image: {filename}")
+            response_data = analyze_image(file_path, data, cache_key)
         
-        if result_path and os.path.exists(result_path):
-            response_data['result_image'] = f'/results/{os.path.basename(result_path)}'
+        # Only cache successful inference (the annotated image exists)
+        if response_data['result_image']:
+            result_cache.put(cache_key, response_data)
         
-        # Add disease information for each detection
-        for detection in detections:
-            disease_name = detection['class_name']
+        with stage('serialize'):
+            response = jsonify(with_timings(response_data))
+        return response
+        
+    except Exception as e:
+        print(f"❌ Error processing image: {str(e)}")
+        return jsonify({'error': 'An error occurred while processing your image. Please try again.'}), 500
+
+@app.route('/upload/stream', methods=['POST'])
+def upload_stream():
+    """Like /upload, but streams NDJSON: detections as soon as inference is done, then each class's info as it arrives"""
+    if 'file' not in request.files:
+        return jsonify({'error': 'No file provided'}), 400
+    
+    file = request.files['file']
+    if file.filename == '':
+        return jsonify({'error': 'No file selected'}), 400
+    
+    filename = secure_filename(file.filename)
+    data = file.read()
+    if sniff_image_type(data) is None:
+        return jsonify({'error': 'Invalid or unsupported image file'}), 400
+    cache_key = make_result_key(data, get_model_version(), CONFIDENCE_THRESHOLD)
+    
+    def event(event_type, **payload):
+        return json.dumps(dict(payload, type=event_type)) + '\n'
+    
+    def generate():
+        try:
+            cached = get_cached_result(cache_key)
+            if cached is not None:
+                print(f"⚡ Cache hit for {filename}")
+                yield event('detections', **dict(cached, cached=True))
+                yield event('done')
+                return
             
-            # Check if it's a healthy plant (contains "leaf" without disease terms)
-            is_healthy = ('leaf' in disease_name.lower() and 
-                         not any(disease_term in disease_name.lower() 
-                               for disease_term in ['blight', 'rust', 'spot', 'rot', 'scab', 'mosaic', 'virus', 'bacterial']))
+            file_path = save_upload(data)
             
-            if is_healthy:
-                # For healthy plants, try PlantNet identification first
-                if PLANTNET_API_KEY:
-                    plantnet_info = get_plantnet_disease_info(disease_name, file_path)
-                    if plantnet_info:
-                        disease_info = plantnet_info
-                    else:
-                        disease_info = get_disease_info(disease_name, use_api=USE_EXTERNAL_APIs)
-                else:
-                    disease_info = get_disease_info(disease_name, use_api=USE_EXTERNAL_APIs)
-            else:
-                # For diseased plants, use the normal API flow
-                disease_info = get_disease_info(disease_name, use_api=USE_EXTERNAL_APIs)
+            print(f"🔄 Streaming results for: {filename}")
+            tiling = {}
+            detections, result_key = process_image(file_path, tiling, data, cache_key)
+            response_data = build_detection_response(detections, result_key, tiling)
+            yield event('detections', **response_data)
             
-            response_data['detections'].append({
-                'disease': disease_name,
-                'confidence': detection['confidence'],
-                'info': disease_info,
-                'is_healthy': is_healthy
-            })
+            class_info = {}
+            for disease_name, info in iter_disease_info(detections, file_path):
+                class_info[disease_name] = info
+                yield event('info', disease=disease_name, info=info)
+            
+            attach_disease_info(response_data, class_info)
+            if response_data['result_image']:
+                result_cache.put(cache_key, response_data)
+            yield event('done')
+            
+        except Exception as e:
+            print(f"❌ Error streaming results: {str(e)}")
+            yield event('error', error='An error occurred while processing your image. Please try again.')
+    
+    return Response(stream_with_context(generate()), mimetype='application/x-ndjson',
+                    headers={'Cache-Control': 'no-cache', 'X-Accel-Buffering': 'no'})
+
+@app.route('/upload/batch', methods=['POST'])
+def upload_batch():
+    """Run detection on many images in one request using batched YOLO inference"""
+    try:
+        files = [f for f in request.files.getlist('files') if f and f.filename]
+        if not files:
+            return jsonify({'error': 'No files provided'}), 400
+        if len(files) > MAX_BATCH_FILES:
+            return jsonify({'error': f'Too many files - at most {MAX_BATCH_FILES} images per batch'}), 400
+        
+        start_time = time.time()
+        payloads = [f.read() for f in files]
+        model_version = get_model_version()
+        result_keys = [make_result_key(data, model_version, CONFIDENCE_THRESHOLD) for data in payloads]
+        
+        # Decode in parallel - Pillow releases the GIL while decoding
+        def safe_decode(data):
+            try:
+                return decode_image(data, max_side=DECODE_MAX_SIDE if FAST_DECODE else None)
+            except InvalidImage:
+                print("⚠️ Skipping upload that is not an image")
+                return None
+            except Exception as e:
+                print(f"⚠️ Could not decode image: {e}")
+                return None
+        
+        with stage('decode'), ThreadPoolExecutor(max_workers=DECODE_WORKERS) as pool:
+            decoded = list(pool.map(safe_decode, payloads))
         
-        return jsonify(response_data)
+        valid = [i for i, image in enumerate(decoded) if image is not None]
+        print(f"🔄 Processing batch of {len(valid)} image(s) ({len(files) - len(valid)} undecodable)")
+        
+        # Uploads are kept so their annotated images can be rendered on request
+        outputs = process_image_batch([decoded[i].image for i in valid], [save_upload(payloads[i]) for i in valid],
+                                      [result_keys[i] for i in valid], scales=[decoded[i].scale for i in valid])
+        processed = dict(zip(valid, outputs))
+        
+        images = []
+        for index, f in enumerate(files):
+            entry = {'filename': f.filename, 'detections': [], 'result_image': None}
+            if index not in processed:
+                entry['error'] = 'Invalid or unsupported image file'
+            else:
+                detections, result_key = processed[index]
+                entry['result_image'] = result_image_url(result_key)
+                for detection in detections:
+                    entry['detections'].append({
+                        'disease': detection['class_name'],
+                        'confidence': detection['confidence'],
+                        'bbox': detection['bbox'],
+                        'is_healthy': is_healthy_class(detection['class_name'])
+                    })
+                entry['summary'] = summarize_detections(detections)
+            images.append(entry)
+        
+        elapsed = time.time() - start_time
+        print(f"✅ Batch processed: {len(valid)} image(s) in {elapsed:.2f}s")
+        
+        with stage('serialize'):
+            response = jsonify(with_timings({
+                'images': images,
+                'count': len(images),
+                'batch_size': INFERENCE_BATCH_SIZE,
+                'processing_time': round(elapsed, 3),
+                'images_per_second': round(len(valid) / elapsed, 2) if elapsed > 0 else None
+            }))
+        return response
         
     except Exception as e:
-        print(f"❌ Error processing image: {str(e)}")
-        return jsonify({'error': 'An error occurred while processing your image. Please try again.'}), 500
+        print(f"❌ Error processing batch: {str(e)}")
+        return jsonify({'error': 'An error occurred while processing your images. Please try again.'}), 500
+
+def is_process_alive(pid):
+    """Check whether a (worker) process still exists"""
+    if not pid:
+        return False
+    try:
+        os.kill(pid, 0)
+    except ProcessLookupError:
+        return False
+    except PermissionError:
+        return True
+    return True
+
+def release_job_upload(image_path):
+    """Delete a purged job's upload - unless it was uploaded or viewed again since, then GC decides"""
+    try:
+        if os.path.getmtime(image_path) < time.time() - JOB_RETENTION_HOURS * 3600:
+            os.remove(image_path)
+    except OSError:
+        pass
+
+def get_job_pool():
+    """Lazy start the background job pool (once per worker process), resuming orphaned jobs"""
+    global job_pool, job_pool_pid
+    if job_pool is not None and job_pool_pid == os.getpid():
+        return job_pool
+    with job_pool_lock:
+        if job_pool is None or job_pool_pid != os.getpid():
+            job_pool = ThreadPoolExecutor(max_workers=JOB_WORKERS, thread_name_prefix='job')
+            job_pool_pid = os.getpid()
+            try:
+                purged = job_db.purge(JOB_RETENTION_HOURS * 3600, release=release_job_upload)
+                pending = job_db.recover(is_process_alive)
+                for job_id in pending:
+                    job_pool.submit(run_job, job_id)
+                print(f"✅ Job workers started ({JOB_WORKERS} threads, {len(pending)} pending job(s) resumed, {purged} purged)")
+            except Exception as e:
+                print(f"⚠️ Could not resume pending jobs: {e}")
+    return job_pool
+
+@app.before_request
+def resume_background_jobs():
+    # Pending jobs from a recycled worker are picked up by the next worker's first request
+    get_job_pool()
+
+@app.before_request
+def start_storage_collectors():
+    # Started per worker process on its first request - a no-op afterwards
+    upload_store.start_collector(STORAGE_GC_INTERVAL)
+    result_store.start_collector(STORAGE_GC_INTERVAL)
+
+# Requests that run inference - the first one per worker shows whether warm-up paid off
+DETECTION_ENDPOINTS = {'upload_file', 'upload_stream', 'upload_batch', 'create_job'}
+
+@app.before_request
+def start_request_timer():
+    g.request_started = time.perf_counter()
+    if STAGE_TIMING:
+        stage_timing.start()
+
+@app.after_request
+def add_server_timing(response):
+    timings = stage_timing.current()
+    if timings is not None:
+        started = g.get('request_started')
+        response.headers['Server-Timing'] = timings.header((time.perf_counter() - started) * 1000 if started else None)
+    return response
+
+@app.after_request
+def record_request_metrics(response):
+    started = g.get('request_started')
+    if metrics_enabled and started is not None:
+        route = request.url_rule.rule if request.url_rule is not None else 'unmatched'
+        metrics.observe_request(route, request.method, response.status_code, time.perf_counter() - started)
+    return response
+
+@app.teardown_request
+def stop_stage_timing(exception=None):
+    stage_timing.stop()
+
+@app.after_request
+def record_first_request(response):
+    started = g.get('request_started')
+    if startup_stats['first_request'] is None and started is not None and request.endpoint in DETECTION_ENDPOINTS:
+        elapsed_ms = (time.perf_counter() - started) * 1000
+        warm = isinstance(startup_stats['warmup'], dict) and startup_stats['warmup']['status'] == 'done'
+        startup_stats['first_request'] = {
+            'endpoint': request.endpoint,
+            'latency_ms': round(elapsed_ms, 1),
+            'worker_pid': os.getpid(),
+            'warm': warm
+        }
+        print(f"⏱️ First detection request in worker {os.getpid()} took {elapsed_ms:.0f}ms "
+              f"({'warm' if warm else 'cold'} start)")
+    return response
+
+def run_job(job_id):
+    """Process one queued job in the background"""
+    if not job_db.claim(job_id):
+        return
+    job = job_db.get(job_id)
+    print(f"🔄 Running job {job_id} ({job['filename']})")
+    try:
+        response_data = analyze_image(job['image_path'])
+        if response_data['result_image']:
+            with open(job['image_path'], 'rb') as f:
+                result_cache.put(make_result_key(f.read(), get_model_version(), CONFIDENCE_THRESHOLD), response_data)
+        job_db.complete(job_id, response_data)
+        print(f"✅ Job {job_id} done")
+    except Exception as e:
+        print(f"❌ Job {job_id} failed: {e}")
+        job_db.fail(job_id, 'An error occurred while processing your image. Please try again.')
+    notify_job_callback(job_id)
+
+def notify_job_callback(job_id):
+    """POST the finished job to its callback URL, if one was given"""
+    job = job_db.get(job_id)
+    if not job or not job['callback_url']:
+        return
+    # Checked again at send time - the host may resolve differently than when the job was created
+    problem = check_callback_url(job['callback_url'], JOB_CALLBACK_ALLOWED_HOSTS)
+    if problem:
+        print(f"⚠️ Job {job_id} callback not sent: {problem}")
+        return
+    try:
+        response = requests.post(job['callback_url'], json=job_response(job), timeout=API_TIMEOUT,
+                                 allow_redirects=False)
+        print(f"📨 Job {job_id} callback: HTTP {response.status_code}")
+    except Exception as e:
+        print(f"⚠️ Job {job_id} callback failed: {e}")
+
+def job_response(job):
+    """Public view of a job record"""
+    data = {
+        'job_id': job['id'],
+        'status': job['status'],
+        'filename': job['filename'],
+        'created_at': job['created_at'],
+        'updated_at': job['updated_at'],
+        'status_url': f"/api/v1/jobs/{job['id']}"
+    }
+    if job['result'] is not None:
+        data['result'] = job['result']
+    if job['error']:
+        data['error'] = job['error']
+    return data
+
+@app.route('/api/v1/jobs', methods=['POST'])
+def create_job():
+    """Accept an image and return a job id immediately - processing happens in the background"""
+    try:
+        if 'file' not in request.files:
+            return jsonify({'error': 'No file provided'}), 400
+        
+        file = request.files['file']
+        if file.filename == '':
+            return jsonify({'error': 'No file selected'}), 400
+        
+        callback_url = request.form.get('callback_url') or None
+        problem = check_callback_url(callback_url, JOB_CALLBACK_ALLOWED_HOSTS) if callback_url else None
+        if problem:
+            return jsonify({'error': problem}), 400
+        
+        filename = secure_filename(file.filename)
+        data = file.read()
+        if sniff_image_type(data) is None:
+            return jsonify({'error': 'Invalid or unsupported image file'}), 400
+        
+        # Cache hits are finished jobs straight away
+        cached = get_cached_result(make_result_key(data, get_model_version(), CONFIDENCE_THRESHOLD))
+        if cached is not None:
+            job_id = job_db.create(filename, None, callback_url=callback_url, result=dict(cached, cached=True))
+            if callback_url:
+                get_job_pool().submit(notify_job_callback, job_id)
+            return jsonify(job_response(job_db.get(job_id))), 202
+        
+        # Job uploads always go to disk: a job may be resumed by another worker process
+        job_id = uuid.uuid4().hex
+        file_path = save_upload(data, durable=True)
+        job_db.create(filename, file_path, callback_url=callback_url, job_id=job_id)
+        
+        get_job_pool().submit(run_job, job_id)
+        print(f"📥 Queued job {job_id} for {filename}")
+        return jsonify(job_response(job_db.get(job_id))), 202
+        
+    except Exception as e:
+        print(f"❌ Error creating job: {str(e)}")
+        return jsonify({'error': 'An error occurred while queuing your image. Please try again.'}), 500
+
+@app.route('/api/v1/jobs/<job_id>')
+def get_job(job_id):
+    """Poll a background job"""
+    job = job_db.get(job_id)
+    if job is None:
+        return jsonify({'error': 'Job not found'}), 404
+    return jsonify(job_response(job))
+
+def detect_frame(data):
+    """Detections for one live camera frame - decoded in memory, nothing stored or rendered"""
+    decoded = decode_image(data, max_side=DECODE_MAX_SIDE if FAST_DECODE else None)
+    detections = extract_detections(infer([decoded.image])[0])
+    scale_detections(detections, decoded.scale)
+    return detections
+
+def get_live_session(session_id):
+    session = live_sessions.get(session_id)
+    return session if session is not None and not session.closed else None
+
+@app.route('/api/v1/live', methods=['POST'])
+def create_live_session():
+    """Start a live camera session - then POST frames to /api/v1/live/<id>/frames"""
+    with live_sessions_lock:
+        for session_id in [session_id for session_id, session in live_sessions.items() if session.closed]:
+            del live_sessions[session_id]
+        if len(live_sessions) >= LIVE_MAX_SESSIONS:
+            return jsonify({'error': 'Too many live sessions - please try again later'}), 503
+        session = LiveSession(detect_frame, resolve_disease_info, window=LIVE_SMOOTHING_WINDOW,
+                              idle_timeout=LIVE_IDLE_SECONDS)
+        live_sessions[session.id] = session
+    print(f"🎥 Live session {session.id} started")
+    return jsonify(dict(session.snapshot(),
+                        frames_url=f'/api/v1/live/{session.id}/frames',
+                        events_url=f'/api/v1/live/{session.id}/events')), 201
+
+@app.route('/api/v1/live/<session_id>/frames', methods=['POST'])
+def post_live_frame(session_id):
+    """Hand a frame to the session (raw image body or a 'frame' file field) - returns the latest state at once"""
+    session = get_live_session(session_id)
+    if session is None:
+        return jsonify({'error': 'Live session not found or closed'}), 404
+    
+    frame = request.files.get('frame')
+    data = frame.read() if frame else request.get_data()
+    if sniff_image_type(data) is None:
+        return jsonify({'error': 'Invalid or unsupported image file'}), 400
+    try:
+        session.submit(data)
+    except SessionClosed:
+        return jsonify({'error': 'Live session not found or closed'}), 404
+    # Results lag by the frames still in flight; they are the newest the server has
+    return jsonify(session.snapshot()), 202
+
+@app.route('/api/v1/live/<session_id>/events')
+def live_session_events(session_id):
+    """Server-sent events with the session state after every processed frame (needs a threaded worker)"""
+    session = get_live_session(session_id)
+    if session is None:
+        return jsonify({'error': 'Live session not found or closed'}), 404
+    
+    def generate():
+        version = -1
+        while True:
+            state = session.wait(version, timeout=15)
+            if state['version'] == version:
+                yield ': keep-alive\n\n'
+                continue
+            version = state['version']
+            yield f"data: {json.dumps(state)}\n\n"
+            if state['closed']:
+                return
+    
+    return Response(stream_with_context(generate()), mimetype='text/event-stream',
+                    headers={'Cache-Control': 'no-cache', 'X-Accel-Buffering': 'no'})
+
+@app.route('/api/v1/live/<session_id>', methods=['GET', 'DELETE'])
+def live_session_state(session_id):
+    """Poll the session state, or end the session"""
+    session = live_sessions.get(session_id)
+    if session is None:
+        return jsonify({'error': 'Live session not found'}), 404
+    if request.method == 'DELETE':
+        session.close()
+        print(f"🎥 Live session {session_id} closed ({session.processed} processed, {session.dropped} dropped)")
+    return jsonify(session.snapshot())
+
+@app.route('/metrics')
+def prometheus_metrics():
+    """Prometheus text format - merged over all gunicorn workers when PROMETHEUS_MULTIPROC_DIR is set"""
+    if not metrics_enabled:
+        return jsonify({'error': 'Metrics are disabled (METRICS_ENABLED=false or prometheus_client not installed)'}), 404
+    # Queue depths are sampled at scrape time (the scheduler also reports after every batch)
+    if BATCH_SCHEDULER_ENABLED:
+        metrics.set_queue_depth('inference', inference_scheduler.stats()['queue_depth'])
+    metrics.set_jobs_queued(job_db.counts().get('queued', 0))
+    body, content_type = metrics.render()
+    return Response(body, content_type=content_type)
 
 @app.route('/api/status')
 def api_status():
@@ -1632,13 +2759,28 @@ def api_status():
     import os
     status = {
         'external_apis_enabled': USE_EXTERNAL_APIs,
-        'yolo_model': 'Loaded' if model is not None else 'Failed to load',
+        'yolo_model': 'Loaded' if model is not None else ('Inference server' if inference_client is not None else 'Failed to load'),
+        'inference_backend': INFERENCE_BACKEND,
+        'inference_precision': model_precision or INFERENCE_PRECISION,
         'wikipedia_api': 'Available',
         'google_custom_search': 'Configured' if os.getenv('GOOGLE_API_KEY') else 'Not configured - Add GOOGLE_API_KEY env var',
         'gemini_ai': 'Configured' if os.getenv('GEMINI_API_KEY') else 'Not configured - Add GEMINI_API_KEY env var',
         'plantnet_api': 'Configured' if os.getenv('PLANTNET_API_KEY') else 'Not configured - Add PLANTNET_API_KEY env var',
         'local_database': 'Available',
         'total_diseases_in_db': len(DISEASE_INFO),
+        'inference_scheduler': inference_scheduler.stats() if BATCH_SCHEDULER_ENABLED else 'Disabled',
+        'tiled_inference': {'min_pixels': TILE_MIN_PIXELS, 'tile_size': TILE_SIZE, 'overlap': TILE_OVERLAP} if TILED_INFERENCE else 'Disabled',
+        'result_cache': result_cache.stats(),
+        'blob_store': blob_store.stats() if blob_store is not None else 'Disabled',
+        'storage': {'uploads': upload_store.stats(), 'results': result_store.stats()},
+        'result_rendering': render_stats,
+        'stage_timing': 'Enabled' if STAGE_TIMING else 'Disabled',
+        'metrics': ('Enabled (multiprocess)' if metrics.multiprocess_dir() else 'Enabled') if metrics_enabled else 'Disabled',
+        'provider_cache': provider_cache.stats() if provider_cache is not None else 'Disabled',
+        'circuit_breakers': {name: breaker.stats() for name, breaker in provider_breakers.items()},
+        'jobs': job_db.counts(),
+        'live_sessions': sum(1 for session in list(live_sessions.values()) if not session.closed),
+        'startup': startup_stats,
         'environment_check': {
             'GEMINI_API_KEY': 'Set' if os.getenv('GEMINI_API_KEY') else 'Missing',
             'GOOGLE_API_KEY': 'Set' if os.getenv('GOOGLE_API_KEY') else 'Missing',
@@ -1647,9 +2789,17 @@ def api_status():
         }
     }
     
+    if inference_client is not None:
+        try:
+            server_info = inference_client.info()
+            server_info.pop('names', None)
+            status['inference_server'] = server_info
+        except Exception as e:
+            status['inference_server'] = f"Unavailable: {e}"
+    
     # Test Wikipedia API
     try:
-        response = requests.get('https://en.wikipedia.org/api/rest_v1/page/summary/Plant_disease', timeout=3)
+        response = requests.get(f"{WIKIPEDIA_API_URL}Plant_disease", timeout=3)
         status['wikipedia_api'] = 'Available' if response.status_code == 200 else 'Unavailable'
     except:
         status['wikipedia_api'] = 'Unavailable'
@@ -1670,11 +2820,58 @@ def api_status():
 
 @app.route('/results/<filename>')
 def uploaded_file(filename):
-    return send_from_directory(app.config['RESULTS_FOLDER'], filename)
+    """Annotated image, rendered on first request of each size/format and cached from then on"""
+    result_key, extension = os.path.splitext(filename)
+    if extension not in RENDER_FORMATS or result_store.path(result_key + '.json') is None:
+        # Flat names from before content-addressed storage
+        return send_blob(result_store, filename)
+    
+    size = snap_size(request.args.get('size', type=int), RENDER_SIZES)
+    etag = f'{result_key}{variant_suffix(size, extension)}'
+    if request.if_none_match.contains(etag):
+        render_stats['not_modified'] += 1
+        response = Response(status=304)
+    else:
+        variant_path = result_store.path_for(result_key, variant_suffix(size, extension))
+        try:
+            data = read_blob(variant_path)
+            render_stats['cached'] += 1
+            metrics.count_cache('render', True)
+        except OSError:
+            manifest = load_render_manifest(result_key)
+            if manifest is None:
+                return jsonify({'error': 'Result image not found'}), 404
+            started = time.perf_counter()
+            try:
+                with stage('render'):
+                    data = render(read_blob(manifest['image']), manifest, size, extension, RENDER_QUALITY)
+            except Exception as e:
+                print(f"❌ Could not render {filename}: {e}")
+                return jsonify({'error': 'Could not render the result image'}), 500
+            elapsed_ms = (time.perf_counter() - started) * 1000
+            render_stats['rendered'] += 1
+            metrics.count_cache('render', False)
+            render_stats['render_ms'] = round(render_stats['render_ms'] + elapsed_ms, 1)
+            print(f"🎨 Rendered {filename} at {size}px in {elapsed_ms:.0f}ms")
+            write_blob(variant_path, data)
+        response = Response(data, mimetype=RENDER_FORMATS[extension][0])
+    
+    response.set_etag(etag)
+    response.cache_control.public = True
+    response.cache_control.max_age = RESULT_IMAGE_MAX_AGE
+    return response
 
 @app.route('/uploads/<filename>')
 def uploaded_original(filename):
-    return send_from_directory(app.config['UPLOAD_FOLDER'], filename)
+    return send_blob(upload_store, filename)
+
+if INFERENCE_SERVER == 'spawn':
+    # Forked before any threads exist; workers then fork from a master that never loads the model
+    start_inference_servers()
+elif WARMUP_ENABLED and inference_client is None:
+    startup_stats['warmup'] = warm_up()
+startup_stats['startup_seconds'] = round(time.perf_counter() - startup_started, 2)
+print(f"🚀 App ready in {startup_stats['startup_seconds']:.2f}s (pid {os.getpid()}, warm-up {'on' if WARMUP_ENABLED else 'off'})")
 
 if __name__ == '__main__':
     import os
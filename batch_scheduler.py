@@ -0,0 +1,118 @@
+# Dynamic micro-batching scheduler for YOLO inference
+# ===================================================
+#
+# Concurrent requests submit single images; a background thread collects them
+# for up to max_wait_ms (or until max_batch_size images are pending), runs one
+# batched forward pass and hands every caller its own result.
+
+import os
+import queue
+import threading
+import time
+from concurrent.futures import Future
+
+
+class MicroBatchScheduler:
+    """Collect pending inference requests and run them as one batch"""
+
+    def __init__(self, run_batch, max_batch_size=8, max_wait_ms=10):
+        self.run_batch = run_batch
+        self.max_batch_size = max(1, int(max_batch_size))
+        self.max_wait = max(0.0, float(max_wait_ms)) / 1000.0
+        self._lock = threading.Lock()
+        self._pid = None
+        self._queue = None
+        self._thread = None
+        self._reset_stats()
+
+    def _reset_stats(self):
+        self.batches_run = 0
+        self.items_processed = 0
+        self.max_queue_depth = 0
+        self.batch_size_histogram = {}
+        self.queue_depth_histogram = {}
+
+    def _ensure_started(self):
+        """Start the worker thread lazily, once per process (threads don't survive fork)"""
+        if self._pid == os.getpid() and self._thread is not None:
+            return
+        with self._lock:
+            if self._pid == os.getpid() and self._thread is not None:
+                return
+            self._pid = os.getpid()
+            self._queue = queue.Queue()
+            self._reset_stats()
+            self._thread = threading.Thread(target=self._worker, name='inference-scheduler', daemon=True)
+            self._thread.start()
+            print(f"✅ Inference scheduler started (max batch {self.max_batch_size}, max wait {self.max_wait * 1000:.0f}ms)")
+
+    def submit_async(self, item):
+        """Queue one item and return a Future for its result"""
+        self._ensure_started()
+        future = Future()
+        self._queue.put((item, future))
+        depth = self._queue.qsize()
+        if depth > self.max_queue_depth:
+            self.max_queue_depth = depth
+        return future
+
+    def submit(self, item, timeout=None):
+        """Queue one item and block until its result is ready"""
+        return self.submit_async(item).result(timeout=timeout)
+
+    def map(self, items, timeout=None):
+        """Queue several items and return their results in order"""
+        futures = [self.submit_async(item) for item in items]
+        return [future.result(timeout=timeout) for future in futures]
+
+    def _collect(self):
+        """Block for the first item, then gather more until the batch is full or the wait expires"""
+        batch = [self._queue.get()]
+        deadline = time.monotonic() + self.max_wait
+        while len(batch) < self.max_batch_size:
+            remaining = deadline - time.monotonic()
+            if remaining <= 0:
+                break
+            try:
+                batch.append(self._queue.get(timeout=remaining))
+            except queue.Empty:
+                break
+        return batch
+
+    def _worker(self):
+        while True:
+            batch = self._collect()
+            depth = self._queue.qsize()
+            items = [item for item, _ in batch]
+            futures = [future for _, future in batch]
+
+            try:
+                results = self.run_batch(items)
+                if len(results) != len(items):
+                    raise RuntimeError(f"Batch returned {len(results)} results for {len(items)} items")
+                for future, result in zip(futures, results):
+                    future.set_result(result)
+            except Exception as e:
+                print(f"❌ Batched inference failed: {e}")
+                for future in futures:
+                    future.set_exception(e)
+
+            self.batches_run += 1
+            self.items_processed += len(batch)
+            self.batch_size_histogram[len(batch)] = self.batch_size_histogram.get(len(batch), 0) + 1
+            self.queue_depth_histogram[depth] = self.queue_depth_histogram.get(depth, 0) + 1
+
+    def stats(self):
+        """Queue depth and batch-size histograms for /api/status"""
+        return {
+            'running': self._thread is not None and self._pid == os.getpid(),
+            'max_batch_size': self.max_batch_size,
+            'max_wait_ms': self.max_wait * 1000,
+            'queue_depth': self._queue.qsize() if self._queue is not None else 0,
+            'max_queue_depth': self.max_queue_depth,
+            'batches_run': self.batches_run,
+            'items_processed': self.items_processed,
+            'average_batch_size': round(self.items_processed / self.batches_run, 2) if self.batches_run else 0,
+            'batch_size_histogram': dict(sorted(self.batch_size_histogram.items())),
+            'queue_depth_histogram': dict(sorted(self.queue_depth_histogram.items()))
+        }
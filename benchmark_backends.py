@@ -0,0 +1,97 @@
+#!/usr/bin/env python3
+"""
+Compare inference backends: PyTorch (ultralytics) vs ONNX Runtime vs OpenVINO
+
+Each backend runs in its own subprocess so load time, per-image latency and
+peak RSS are measured independently. Images from test/ are used by default.
+"""
+import argparse
+import glob
+import json
+import resource
+import statistics
+import subprocess
+import sys
+import time
+
+MODEL_PATH = 'model/best.pt'
+BACKENDS = ['pytorch', 'onnxruntime', 'openvino']
+
+
+def load_backend(backend, imgsz, threads):
+    if backend == 'pytorch':
+        from ultralytics import YOLO
+        return YOLO(MODEL_PATH)
+    from onnx_backend import load_onnx_model
+    return load_onnx_model(MODEL_PATH, runtime=backend, imgsz=imgsz, threads=threads)
+
+
+def run_worker(args):
+    """Measure one backend and print its numbers as a JSON line"""
+    import cv2
+    images = [cv2.imread(path) for path in sorted(glob.glob(args.images))]
+
+    start = time.perf_counter()
+    model = load_backend(args.worker, args.imgsz, args.threads or None)
+    load_seconds = time.perf_counter() - start
+
+    kwargs = {'verbose': False} if args.worker == 'pytorch' else {}
+    for image in images[:args.warmup]:
+        model(image, conf=0.1, **kwargs)
+
+    latencies = []
+    detections = 0
+    for _ in range(args.rounds):
+        for image in images:
+            start = time.perf_counter()
+            results = model(image, conf=0.1, **kwargs)
+            latencies.append((time.perf_counter() - start) * 1000)
+            detections += len(results[0].boxes)
+
+    latencies.sort()
+    print(json.dumps({
+        'backend': args.worker,
+        'images': len(latencies),
+        'load_seconds': round(load_seconds, 2),
+        'mean_ms': round(statistics.mean(latencies), 1),
+        'p95_ms': round(latencies[min(len(latencies) - 1, int(len(latencies) * 0.95))], 1),
+        'detections': detections,
+        'peak_rss_mb': round(resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024, 1)
+    }))
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--backends', nargs='+', default=BACKENDS, choices=BACKENDS)
+    parser.add_argument('--images', default='test/*.JPG', help='Glob of images to run')
+    parser.add_argument('--rounds', type=int, default=3, help='Passes over the image set')
+    parser.add_argument('--warmup', type=int, default=2, help='Untimed warm-up images')
+    parser.add_argument('--imgsz', type=int, default=640)
+    parser.add_argument('--threads', type=int, default=0, help='CPU threads for ONNX backends (0 = default)')
+    parser.add_argument('--worker', choices=BACKENDS, help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    if args.worker:
+        run_worker(args)
+        return
+
+    print(f"📊 {args.rounds} round(s) over {args.images}")
+    print("=" * 78)
+    print(f"{'Backend':<13}{'Load s':>8}{'Mean ms':>10}{'p95 ms':>10}{'Detections':>12}{'Peak RSS MB':>14}")
+    for backend in args.backends:
+        command = [sys.executable, __file__, '--worker', backend, '--images', args.images,
+                   '--rounds', str(args.rounds), '--warmup', str(args.warmup),
+                   '--imgsz', str(args.imgsz), '--threads', str(args.threads)]
+        completed = subprocess.run(command, capture_output=True, text=True)
+        lines = [line for line in completed.stdout.splitlines() if line.startswith('{')]
+        if completed.returncode != 0 or not lines:
+            error = (completed.stderr.strip().splitlines() or ['unknown error'])[-1]
+            print(f"{backend:<13}❌ {error}")
+            continue
+        stats = json.loads(lines[-1])
+        print(f"{backend:<13}{stats['load_seconds']:>8}{stats['mean_ms']:>10}{stats['p95_ms']:>10}"
+              f"{stats['detections']:>12}{stats['peak_rss_mb']:>14}")
+
+
+if __name__ == "__main__":
+    main()
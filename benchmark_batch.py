@@ -0,0 +1,73 @@
+#!/usr/bin/env python3
+"""
+Benchmark batched YOLO inference against the single-image /upload path
+
+Both paths get the same arrays, decoded before timing starts, so the speedup
+is inference only.
+"""
+import argparse
+import glob
+import time
+
+import app
+
+
+def run_single(images):
+    """Mirror process_image(): one forward pass per decoded image"""
+    model = app.get_yolo_model()
+    for image in images:
+        model(image, conf=app.CONFIDENCE_THRESHOLD)
+
+
+def run_batched(images, batch_size):
+    """Mirror /upload/batch: decoded arrays, batch_size images per forward pass"""
+    app.INFERENCE_BATCH_SIZE = batch_size
+    app.run_yolo_batch(images)
+
+
+def measure(fn, count, repeat):
+    """Return the best images/sec over several runs"""
+    best = 0.0
+    for _ in range(repeat):
+        start = time.perf_counter()
+        fn()
+        elapsed = time.perf_counter() - start
+        best = max(best, count / elapsed)
+    return best
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument('--images', default='test/*.JPG', help='Glob of images to benchmark')
+    parser.add_argument('--batch-sizes', default='1,4,8,16', help='Comma-separated batch sizes')
+    parser.add_argument('--repeat', type=int, default=3, help='Runs per configuration (best is reported)')
+    args = parser.parse_args()
+
+    paths = sorted(glob.glob(args.images))
+    if not paths:
+        print(f"❌ No images match {args.images}")
+        return
+    if app.get_yolo_model() is None:
+        print("❌ YOLO model could not be loaded")
+        return
+
+    images = []
+    for path in paths:
+        with open(path, 'rb') as f:
+            images.append(app.decode_image_bytes(f.read()))
+
+    # Warm up so the first configuration doesn't pay graph setup
+    run_single(images[:1])
+
+    print(f"📊 Benchmarking {len(paths)} images, best of {args.repeat} runs")
+    print("=" * 60)
+    baseline = measure(lambda: run_single(images), len(images), args.repeat)
+    print(f"Single-image path:        {baseline:7.2f} images/sec")
+
+    for batch_size in [int(b) for b in args.batch_sizes.split(',')]:
+        throughput = measure(lambda: run_batched(images, batch_size), len(images), args.repeat)
+        print(f"Batched (batch size {batch_size:>3}): {throughput:7.2f} images/sec  ({throughput / baseline:.2f}x)")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,130 @@
+#!/usr/bin/env python3
+"""
+Benchmark image decoding: full-resolution decodes vs the JPEG draft-mode fast path
+
+Methods:
+  cv2        cv2.imdecode at native resolution (what ultralytics does with a file path)
+  pillow     Pillow full decode + EXIF orientation (the previous upload decode)
+  fast       image_decode.decode_image with draft-mode downscaling to --max-side
+
+Runs over test/ plus synthetic 12-MP and 24-MP JPEGs. Every method runs in its
+own subprocess so its peak RSS growth while decoding is measured independently.
+"""
+import argparse
+import glob
+import io
+import json
+import os
+import resource
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+
+import numpy as np
+from PIL import Image
+
+METHODS = ['cv2', 'pillow', 'fast']
+SYNTHETIC_SIZES = {'12mp': (4032, 3024), '24mp': (6000, 4000)}
+
+
+def synthetic_jpeg(width, height, seed=0):
+    """A photo-like JPEG: smooth gradients plus texture, so it compresses like a real photo"""
+    rng = np.random.default_rng(seed)
+    y, x = np.mgrid[0:height, 0:width].astype(np.float32)
+    base = np.stack([x / width * 180, y / height * 200, (x + y) / (width + height) * 160], axis=-1)
+    texture = rng.normal(0, 12, (height // 8, width // 8, 3)).repeat(8, axis=0).repeat(8, axis=1)
+    pixels = np.clip(base + texture[:height, :width], 0, 255).astype(np.uint8)
+    buffer = io.BytesIO()
+    Image.fromarray(pixels).save(buffer, 'JPEG', quality=90)
+    return buffer.getvalue()
+
+
+def decoder(method, max_side):
+    if method == 'cv2':
+        import cv2
+        return lambda data: cv2.imdecode(np.frombuffer(data, np.uint8), cv2.IMREAD_COLOR)
+    from image_decode import decode_image
+    if method == 'pillow':
+        return lambda data: decode_image(data).image
+    return lambda data: decode_image(data, max_side=max_side).image
+
+
+def peak_rss_mb():
+    """Peak RSS of this process - VmHWM resets on exec, unlike ru_maxrss which is inherited"""
+    try:
+        with open('/proc/self/status') as f:
+            for line in f:
+                if line.startswith('VmHWM:'):
+                    return int(line.split()[1]) / 1024
+    except OSError:
+        pass
+    return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024
+
+
+def run_worker(args):
+    """Decode every file with one method and print timings as a JSON line"""
+    decode = decoder(args.worker, args.max_side)
+    stats = {'method': args.worker}
+    sets = []
+    for label, pattern in [('test', args.images)] + [(name, os.path.join(args.synthetic_dir, f'{name}.jpg'))
+                                                     for name in SYNTHETIC_SIZES]:
+        payloads = [open(path, 'rb').read() for path in sorted(glob.glob(pattern))]
+        if payloads:
+            sets.append((label, payloads))
+
+    baseline = peak_rss_mb()
+    for label, payloads in sets:
+        decode(payloads[0])  # Warm-up
+        timings = []
+        for _ in range(args.rounds):
+            for data in payloads:
+                start = time.perf_counter()
+                image = decode(data)
+                timings.append((time.perf_counter() - start) * 1000)
+        stats[label] = {'mean_ms': round(statistics.mean(timings), 2), 'shape': list(image.shape[:2])}
+    stats['decode_rss_mb'] = round(peak_rss_mb() - baseline, 1)
+    print(json.dumps(stats))
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--images', default='test/*.JPG', help='Glob of real images')
+    parser.add_argument('--rounds', type=int, default=5, help='Passes over each image set')
+    parser.add_argument('--max-side', type=int, default=1280, help='Fast-path target (2x the model input)')
+    parser.add_argument('--worker', choices=METHODS, help=argparse.SUPPRESS)
+    parser.add_argument('--synthetic-dir', help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    if args.worker:
+        run_worker(args)
+        return
+
+    with tempfile.TemporaryDirectory() as synthetic_dir:
+        for name, (width, height) in SYNTHETIC_SIZES.items():
+            with open(os.path.join(synthetic_dir, f'{name}.jpg'), 'wb') as f:
+                f.write(synthetic_jpeg(width, height))
+
+        print(f"📊 {args.rounds} round(s), fast path decodes to a shorter side >= {args.max_side}px")
+        print("=" * 78)
+        print(f"{'Method':<8}{'test/ ms':>10}{'12 MP ms':>10}{'24 MP ms':>10}{'24 MP decoded':>16}{'Decode RSS MB':>15}")
+        for method in METHODS:
+            command = [sys.executable, __file__, '--worker', method, '--images', args.images,
+                       '--rounds', str(args.rounds), '--max-side', str(args.max_side),
+                       '--synthetic-dir', synthetic_dir]
+            completed = subprocess.run(command, capture_output=True, text=True)
+            lines = [line for line in completed.stdout.splitlines() if line.startswith('{')]
+            if completed.returncode != 0 or not lines:
+                error = (completed.stderr.strip().splitlines() or ['unknown error'])[-1]
+                print(f"{method:<8}❌ {error}")
+                continue
+            stats = json.loads(lines[-1])
+            test_ms = stats.get('test', {}).get('mean_ms', '-')
+            shape = 'x'.join(str(side) for side in reversed(stats['24mp']['shape']))
+            print(f"{method:<8}{test_ms:>10}{stats['12mp']['mean_ms']:>10}{stats['24mp']['mean_ms']:>10}"
+                  f"{shape:>16}{stats['decode_rss_mb']:>15}")
+
+
+if __name__ == "__main__":
+    main()
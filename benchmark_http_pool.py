@@ -0,0 +1,86 @@
+#!/usr/bin/env python3
+"""
+Benchmark pooled provider sessions against bare per-call requests
+
+A local stub HTTP server stands in for Wikipedia / Google / PlantNet. Each new
+TCP connection pays --handshake-ms of simulated connection setup (the cost of a
+real TCP+TLS handshake), so the savings of keep-alive sessions are visible
+without touching the network. Gemini client construction is timed too.
+"""
+import argparse
+import json
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+import requests
+
+import app
+
+
+class StubHandler(BaseHTTPRequestHandler):
+    protocol_version = 'HTTP/1.1'  # Keep-alive
+    disable_nagle_algorithm = True  # Headers and body are written separately
+    handshake_seconds = 0.0
+
+    def setup(self):
+        # Runs once per TCP connection - simulate the handshake cost
+        time.sleep(self.handshake_seconds)
+        super().setup()
+
+    def do_GET(self):
+        body = json.dumps({'title': 'Plant disease', 'extract': 'x' * 200}).encode()
+        self.send_response(200)
+        self.send_header('Content-Type', 'application/json')
+        self.send_header('Content-Length', str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, format, *args):
+        pass
+
+
+def time_calls(fn, calls):
+    start = time.perf_counter()
+    for _ in range(calls):
+        fn()
+    return (time.perf_counter() - start) / calls * 1000
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--calls', type=int, default=200, help='Requests per configuration')
+    parser.add_argument('--handshake-ms', type=float, default=20, help='Simulated connection setup cost')
+    args = parser.parse_args()
+
+    StubHandler.handshake_seconds = args.handshake_ms / 1000
+    server = ThreadingHTTPServer(('127.0.0.1', 0), StubHandler)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    url = f"http://127.0.0.1:{server.server_port}/api/rest_v1/page/summary/Plant_disease"
+
+    print(f"📊 {args.calls} calls per configuration, {args.handshake_ms:.0f}ms simulated handshake")
+    print("=" * 60)
+
+    bare = time_calls(lambda: requests.get(url, timeout=5).json(), args.calls)
+    print(f"Bare requests.get:      {bare:8.2f} ms/call")
+
+    app.get_http_session(url).get(url, timeout=5)  # Open the pooled connection
+    pooled = time_calls(lambda: app.get_http_session(url).get(url, timeout=5).json(), args.calls)
+    print(f"Pooled session:         {pooled:8.2f} ms/call  ({bare - pooled:.2f} ms saved per call)")
+
+    def new_gemini_model():
+        app.genai.configure(api_key=app.GEMINI_API_KEY or 'benchmark-key')
+        return app.genai.GenerativeModel(app.GEMINI_MODEL_NAME)
+
+    per_call = time_calls(new_gemini_model, args.calls)
+    app.GEMINI_API_KEY = app.GEMINI_API_KEY or 'benchmark-key'
+    app.get_gemini_model()
+    reused = time_calls(app.get_gemini_model, args.calls)
+    print(f"Gemini client per call: {per_call:8.3f} ms/call")
+    print(f"Gemini client reused:   {reused:8.3f} ms/call")
+
+    server.shutdown()
+
+
+if __name__ == "__main__":
+    main()
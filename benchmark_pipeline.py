@@ -0,0 +1,370 @@
+#!/usr/bin/env python3
+"""
+Benchmark every stage of an /upload request, and the request end to end
+
+Stages (each timed on its own over the --images set):
+  multipart      parse the multipart body into request.files
+  sniff_key      image type sniffing + result cache key
+  save           save_upload of a new upload
+  decode         decode_image, with the fast path when FAST_DECODE is on
+  inference      one forward pass per image
+  postprocess    extract_detections + scale_detections
+  manifest       render manifest write (all that is drawn at upload time)
+  render         annotated 1280px JPEG, drawn on its first GET
+  wikipedia, google_search, gemini, plantnet
+                 one call per provider
+  enrichment     get_disease_info with every provider racing
+  serialize      jsonify of a full /upload response
+End to end through Flask's test client, with the result cache off:
+  upload         POST /upload
+  upload_render  POST /upload, then GET of its annotated image
+
+Wikipedia, Google Search and PlantNet are served by a local stub HTTP server
+that answers after --provider-latency-ms. The Gemini SDK has no plain-HTTP
+endpoint to redirect, so its model handle is replaced by a stub with the same
+latency. Nothing touches the network and the provider cache is off.
+
+Results (mean/p50/p95 per stage, machine, commit and configuration) go to
+--output as JSON. --compare prints the change against an earlier run - only
+compare runs from the same machine. Run from the repository root so
+model/best.pt is found; inference stages are skipped without a model.
+"""
+import argparse
+import contextlib
+import glob
+import io
+import itertools
+import json
+import os
+import platform
+import statistics
+import subprocess
+import sys
+import tempfile
+import threading
+import time
+from datetime import datetime, timezone
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+from evaluate_model import percentile
+
+STAGES = ['multipart', 'sniff_key', 'save', 'decode', 'inference', 'postprocess', 'manifest', 'render',
+          'wikipedia', 'google_search', 'gemini', 'plantnet', 'enrichment', 'serialize',
+          'upload', 'upload_render']
+DISEASE_NAMES = ['Tomato leaf late blight', 'Apple Scab Leaf', 'Corn rust leaf', 'Tomato leaf']
+
+STUB_RESPONSES = {
+    'wikipedia': {'title': 'Late blight', 'extract': 'Late blight is a plant disease. ' * 10},
+    'google_search': {'items': [{'title': f'Extension fact sheet {i}', 'snippet': 'Symptoms and management. ' * 4,
+                                 'link': f'https://example.edu/{i}'} for i in range(3)]},
+    'plantnet': {'results': [{'score': 0.91, 'species': {'scientificNameWithoutAuthor': 'Solanum lycopersicum',
+                                                       'commonNames': [{'value': 'Tomato'}]}}]}
+}
+GEMINI_TEXT = """DESCRIPTION: A stub description of the disease, long enough to be accepted as a real answer by the parser.
+
+CAUSES:
+- A fungal pathogen
+- Warm, humid weather
+
+EFFECTS:
+- Brown lesions on leaves
+- Reduced yield
+
+TREATMENT:
+- Copper-based fungicide
+- Remove infected leaves
+
+PREVENTION:
+- Crop rotation
+- Resistant varieties"""
+
+
+class StubProviderHandler(BaseHTTPRequestHandler):
+    """Answers as Wikipedia, Google Search or PlantNet depending on the path prefix"""
+    protocol_version = 'HTTP/1.1'  # Keep-alive, like the real providers
+    disable_nagle_algorithm = True
+    latency_seconds = 0.0
+
+    def respond(self):
+        time.sleep(self.latency_seconds)
+        provider = self.path.strip('/').split('/')[0].split('?')[0]
+        body = json.dumps(STUB_RESPONSES.get(provider, {})).encode()
+        self.send_response(200 if provider in STUB_RESPONSES else 404)
+        self.send_header('Content-Type', 'application/json')
+        self.send_header('Content-Length', str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def do_GET(self):
+        self.respond()
+
+    def do_POST(self):
+        self.rfile.read(int(self.headers.get('Content-Length', 0)))
+        self.respond()
+
+    def log_message(self, format, *args):
+        pass
+
+
+class StubGeminiModel:
+    """Stands in for genai.GenerativeModel - same latency as the HTTP stubs"""
+    def __init__(self, latency_seconds):
+        self.latency_seconds = latency_seconds
+
+    def generate_content(self, prompt, **kwargs):
+        time.sleep(self.latency_seconds)
+        return type('StubResponse', (), {'text': GEMINI_TEXT})()
+
+
+def start_stub_server(latency_ms):
+    """Serve the provider stubs on a free local port and point the provider URLs at it"""
+    StubProviderHandler.latency_seconds = latency_ms / 1000
+    server = ThreadingHTTPServer(('127.0.0.1', 0), StubProviderHandler)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    base = f"http://127.0.0.1:{server.server_port}"
+    os.environ.update({
+        'WIKIPEDIA_API_URL': f"{base}/wikipedia/",
+        'GOOGLE_SEARCH_API_URL': f"{base}/google_search",
+        'PLANTNET_API_URL': f"{base}/plantnet"
+    })
+    return server
+
+
+def summarize(timings):
+    return {
+        'runs': len(timings),
+        'mean_ms': round(statistics.mean(timings), 3),
+        'p50_ms': round(percentile(timings, 50), 3),
+        'p95_ms': round(percentile(timings, 95), 3),
+        'min_ms': round(min(timings), 3)
+    }
+
+
+def time_stage(fn, inputs, rounds, prepare=None):
+    """Time fn over every input, rounds times, after one warm-up call - prepare runs outside the timer"""
+    prepare = prepare or (lambda item: item)
+    with open(os.devnull, 'w') as devnull, contextlib.redirect_stdout(devnull):  # app logs every step
+        fn(prepare(inputs[0]))
+        timings = []
+        for _ in range(rounds):
+            for item in inputs:
+                argument = prepare(item)
+                start = time.perf_counter()
+                fn(argument)
+                timings.append((time.perf_counter() - start) * 1000)
+    return summarize(timings)
+
+
+def git_commit():
+    """Commit of the benchmarked tree, marked -dirty with uncommitted changes"""
+    root = os.path.dirname(os.path.abspath(__file__))
+    try:
+        commit = subprocess.run(['git', 'rev-parse', '--short', 'HEAD'], cwd=root, capture_output=True,
+                                text=True, check=True).stdout.strip()
+        dirty = subprocess.run(['git', 'status', '--porcelain', '--untracked-files=no'], cwd=root,
+                               capture_output=True, text=True).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+    return commit + ('-dirty' if dirty else '')
+
+
+def run_benchmarks(args, payloads, log):
+    from werkzeug.test import EnvironBuilder
+
+    import app
+    from content_store import ContentStore
+    from result_cache import ResultCache
+    from result_render import manifest_bytes, parse_manifest, render
+
+    storage = tempfile.TemporaryDirectory(prefix='benchmark-pipeline-')
+    app.upload_store = ContentStore(os.path.join(storage.name, 'uploads'), 0, 0)
+    app.result_store = ContentStore(os.path.join(storage.name, 'results'), 0, 0)
+    app.result_cache = ResultCache(max_entries=0)
+    app.provider_cache = None
+    app.GEMINI_API_KEY = app.GOOGLE_API_KEY = app.GOOGLE_SEARCH_ENGINE_ID = app.PLANTNET_API_KEY = 'benchmark'
+    gemini = StubGeminiModel(args.provider_latency_ms / 1000)
+    app.get_gemini_model = lambda: gemini
+
+    # Every call gets distinct bytes (appended after the image data) so content-addressed storage never dedups
+    counter = itertools.count()
+    def unique(data):
+        return data + next(counter).to_bytes(8, 'big')
+
+    wanted = set(args.stages.split(',')) if args.stages else set(STAGES)
+    results = {}
+    def run(stage, fn, inputs, prepare=None):
+        if stage not in wanted:
+            return
+        results[stage] = time_stage(fn, inputs, args.rounds, prepare)
+        log(f"{stage:<14}{results[stage]['mean_ms']:>10.2f}{results[stage]['p50_ms']:>10.2f}"
+            f"{results[stage]['p95_ms']:>10.2f}")
+
+    def skip(stages, reason):
+        for stage in [stage for stage in stages if stage in wanted]:
+            results[stage] = {'skipped': reason}
+            log(f"{stage:<14}   skipped: {reason}")
+
+    log(f"{'Stage':<14}{'mean ms':>10}{'p50 ms':>10}{'p95 ms':>10}")
+    log("-" * 44)
+    flask_app = app.app
+    version = app.get_model_version()
+
+    def multipart(data):
+        return flask_app.request_class(EnvironBuilder(method='POST', data={
+            'file': (io.BytesIO(data), 'leaf.jpg')}).get_environ())
+    run('multipart', lambda request: request.files['file'].read(), payloads, prepare=multipart)
+    run('sniff_key', lambda data: (app.sniff_image_type(data),
+                                   app.make_result_key(data, version, app.CONFIDENCE_THRESHOLD)), payloads)
+    run('save', app.save_upload, payloads, prepare=unique)
+
+    max_side = app.DECODE_MAX_SIDE if app.FAST_DECODE else None
+    run('decode', lambda data: app.decode_image(data, max_side=max_side), payloads)
+
+    load_start = time.perf_counter()
+    with open(os.devnull, 'w') as devnull, contextlib.redirect_stdout(devnull):
+        model = app.get_yolo_model()
+    if model is None:
+        skip(['inference', 'postprocess', 'manifest', 'render', 'upload', 'upload_render'], 'model not available')
+        detections = {index: [] for index in range(len(payloads))}
+    else:
+        results['model_load_s'] = round(time.perf_counter() - load_start, 3)
+        decoded = [app.decode_image(data, max_side=max_side) for data in payloads]
+        run('inference', lambda image: app.infer([image]), [item.image for item in decoded])
+
+        with open(os.devnull, 'w') as devnull, contextlib.redirect_stdout(devnull):
+            outputs = [(app.infer([item.image])[0], item.scale) for item in decoded]
+            detections = {index: app.scale_detections(app.extract_detections(result), scale)
+                          for index, (result, scale) in enumerate(outputs)}
+        run('postprocess', lambda output: app.scale_detections(app.extract_detections(output[0]), output[1]),
+            outputs)
+
+        stored = [(app.make_result_key(data, version, app.CONFIDENCE_THRESHOLD), app.save_upload(data), index)
+                  for index, data in enumerate(payloads)]
+        run('manifest', lambda item: app.save_render_manifest(item[0], item[1], detections[item[2]]), stored)
+        manifests = [(data, parse_manifest(manifest_bytes(path, detections[index])))
+                     for data, (_, path, index) in zip(payloads, stored)]
+        run('render', lambda item: render(item[0], item[1], 1280, '.jpg', app.RENDER_QUALITY), manifests)
+
+    image_path = app.save_upload(payloads[0])
+    run('wikipedia', app.get_wikipedia_disease_info, DISEASE_NAMES)
+    run('google_search', app.search_agricultural_info, DISEASE_NAMES)
+    run('gemini', app.get_gemini_disease_info, DISEASE_NAMES)
+    run('plantnet', lambda name: app.get_plantnet_disease_info(name, image_path), DISEASE_NAMES)
+    run('enrichment', app.get_disease_info, DISEASE_NAMES)
+
+    # A full /upload response: every test image's detections with local disease info attached
+    local_info = {name: app.get_disease_info(name, use_api=False) for name in DISEASE_NAMES}
+    responses = []
+    for index in detections:
+        boxes = [dict(detection, class_name=DISEASE_NAMES[n % len(DISEASE_NAMES)])
+                 for n, detection in enumerate(detections[index])]
+        response = app.build_detection_response(boxes, 'f' * 64)
+        responses.append(app.attach_disease_info(response, local_info))
+    with flask_app.app_context():
+        run('serialize', lambda response: app.jsonify(response).get_data(), responses)
+
+    if model is not None:
+        client = flask_app.test_client()
+        def upload(data):
+            response = client.post('/upload', data={'file': (io.BytesIO(data), 'leaf.jpg')},
+                                   content_type='multipart/form-data')
+            if response.status_code != 200:
+                raise RuntimeError(f"/upload returned HTTP {response.status_code}")
+            return response.get_json()
+        def upload_render(data):
+            result_image = upload(data)['result_image']
+            if result_image and client.get(result_image).status_code != 200:
+                raise RuntimeError(f"{result_image} could not be rendered")
+        run('upload', upload, payloads, prepare=unique)
+        run('upload_render', upload_render, payloads, prepare=unique)
+
+    storage.cleanup()
+    config = {
+        'rounds': args.rounds,
+        'images': len(payloads),
+        'provider_latency_ms': args.provider_latency_ms,
+        'backend': app.INFERENCE_BACKEND,
+        'precision': app.model_precision,
+        'imgsz': app.INFERENCE_IMGSZ,
+        'batch_scheduler': app.BATCH_SCHEDULER_ENABLED,
+        'fast_decode': app.FAST_DECODE,
+        'decode_max_side': app.DECODE_MAX_SIDE,
+        'tiled_inference': app.TILED_INFERENCE,
+        'storage_mode': app.STORAGE_MODE,
+        'model_version': version
+    }
+    return config, results
+
+
+def print_comparison(baseline, current, log):
+    """Mean latency per stage against an earlier run"""
+    log(f"\nCompared with {baseline.get('commit') or 'unknown commit'} ({baseline.get('created', '?')})")
+    if baseline.get('machine') != current['machine']:
+        log("⚠️ Different machine - the numbers are not comparable")
+    changed = sorted(key for key in set(baseline.get('config', {})) | set(current['config'])
+                     if baseline.get('config', {}).get(key) != current['config'].get(key))
+    if changed:
+        log(f"⚠️ Configuration differs: {', '.join(changed)}")
+    log(f"{'Stage':<14}{'before ms':>11}{'after ms':>11}{'change':>10}")
+    for stage in STAGES:
+        before = baseline.get('stages', {}).get(stage, {}).get('mean_ms')
+        after = current['stages'].get(stage, {}).get('mean_ms')
+        if before is None or after is None:
+            continue
+        change = f"{(after - before) / before * 100:+.1f}%" if before else '-'
+        log(f"{stage:<14}{before:>11.2f}{after:>11.2f}{change:>10}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--images', default='test/*.JPG', help='Glob of upload images')
+    parser.add_argument('--rounds', type=int, default=3, help='Passes over the images per stage')
+    parser.add_argument('--provider-latency-ms', type=float, default=50, help='Stub provider response time')
+    parser.add_argument('--stages', help=f"Comma-separated subset of: {','.join(STAGES)}")
+    parser.add_argument('--output', help='Write the results as JSON to this file')
+    parser.add_argument('--compare', help='Earlier --output file to compare against')
+    args = parser.parse_args()
+
+    unknown = set(args.stages.split(',')) - set(STAGES) if args.stages else set()
+    if unknown:
+        parser.error(f"unknown stage(s): {', '.join(sorted(unknown))}")
+    paths = sorted(glob.glob(args.images))
+    if not paths:
+        parser.error(f"no images match {args.images}")
+    payloads = [open(path, 'rb').read() for path in paths]
+
+    out = sys.stdout
+    def log(message):
+        print(message, file=out, flush=True)
+
+    server = start_stub_server(args.provider_latency_ms)
+    log(f"📊 {len(payloads)} image(s) x {args.rounds} round(s), stub providers answer in "
+        f"{args.provider_latency_ms:.0f}ms")
+    try:
+        config, stages = run_benchmarks(args, payloads, log)
+    finally:
+        server.shutdown()
+
+    report = {
+        'created': datetime.now(timezone.utc).isoformat(timespec='seconds'),
+        'commit': git_commit(),
+        'machine': {
+            'platform': platform.platform(),
+            'processor': platform.processor() or platform.machine(),
+            'cpus': os.cpu_count(),
+            'python': platform.python_version()
+        },
+        'config': config,
+        'stages': stages
+    }
+    if args.output:
+        with open(args.output, 'w') as f:
+            json.dump(report, f, indent=2)
+        log(f"💾 Results written to {args.output}")
+    if args.compare:
+        with open(args.compare) as f:
+            print_comparison(json.load(f), report, log)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,138 @@
+# In-memory blob store for uploads and annotated images
+# ====================================================
+#
+# With STORAGE_MODE=memory, uploads and annotated images are kept in a
+# size-bounded LRU keyed by their path (e.g. results/annotated_leaf.jpg) and
+# served straight from RAM by /uploads and /results - no synchronous disk I/O
+# on the request path. With persistence enabled a background thread writes each
+# blob to that path as well, so evicted blobs can still be served from disk.
+
+import atexit
+import os
+import queue
+import threading
+from collections import OrderedDict
+
+
+class BlobStore:
+    """Size-bounded LRU of file contents with an optional background writer"""
+
+    def __init__(self, max_bytes, persist=False, queue_size=64):
+        self.max_bytes = max_bytes
+        self.persist = persist
+        self.queue_size = queue_size
+        self.bytes = 0
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self.writes = 0
+        self.sync_writes = 0
+        self.write_errors = 0
+        self._blobs = OrderedDict()
+        self._lock = threading.Lock()
+        self._writer_pid = None
+        self._queue = None
+
+    def put(self, path, data):
+        """Keep data in memory (evicting least recently used blobs) and queue it for disk"""
+        if len(data) <= self.max_bytes:
+            with self._lock:
+                if path in self._blobs:
+                    self.bytes -= len(self._blobs.pop(path))
+                self._blobs[path] = data
+                self.bytes += len(data)
+                while self.bytes > self.max_bytes:
+                    _, evicted = self._blobs.popitem(last=False)
+                    self.bytes -= len(evicted)
+                    self.evictions += 1
+        elif not self.persist:
+            print(f"⚠️ {path} ({len(data)} bytes) is larger than the whole blob store - not kept")
+
+        if self.persist:
+            self._enqueue(path, data)
+
+    def get(self, path):
+        """Return the blob's bytes, or None if it isn't in memory"""
+        with self._lock:
+            data = self._blobs.get(path)
+            if data is None:
+                self.misses += 1
+                return None
+            self._blobs.move_to_end(path)
+            self.hits += 1
+            return data
+
+    def exists(self, path):
+        with self._lock:
+            return path in self._blobs
+
+    def discard(self, path):
+        with self._lock:
+            data = self._blobs.pop(path, None)
+            if data is not None:
+                self.bytes -= len(data)
+
+    def _ensure_writer(self):
+        """Start the writer thread lazily, once per process (threads don't survive fork)"""
+        if self._writer_pid == os.getpid():
+            return
+        with self._lock:
+            if self._writer_pid == os.getpid():
+                return
+            self._queue = queue.Queue(maxsize=self.queue_size)
+            threading.Thread(target=self._writer, name='blob-writer', daemon=True).start()
+            atexit.register(self.flush)
+            self._writer_pid = os.getpid()
+
+    def _enqueue(self, path, data):
+        self._ensure_writer()
+        try:
+            self._queue.put_nowait((path, data))
+        except queue.Full:
+            # Disk can't keep up - write on the request thread rather than drop the blob
+            self.sync_writes += 1
+            self._write(path, data)
+
+    def _write(self, path, data):
+        try:
+            directory = os.path.dirname(path)
+            if directory:
+                os.makedirs(directory, exist_ok=True)
+            tmp_path = f"{path}.{os.getpid()}.{threading.get_ident()}.tmp"
+            with open(tmp_path, 'wb') as f:
+                f.write(data)
+            os.replace(tmp_path, path)
+            self.writes += 1
+        except OSError as e:
+            self.write_errors += 1
+            print(f"⚠️ Could not persist {path}: {e}")
+
+    def _writer(self):
+        while True:
+            path, data = self._queue.get()
+            try:
+                self._write(path, data)
+            finally:
+                self._queue.task_done()
+
+    def flush(self):
+        """Block until every queued blob has been written"""
+        if self._writer_pid == os.getpid():
+            self._queue.join()
+
+    def stats(self):
+        with self._lock:
+            count = len(self._blobs)
+        return {
+            'blobs': count,
+            'bytes': self.bytes,
+            'max_bytes': self.max_bytes,
+            'hits': self.hits,
+            'misses': self.misses,
+            'evictions': self.evictions,
+            'persist': self.persist,
+            'pending_writes': self._queue.qsize() if self._writer_pid == os.getpid() else 0,
+            'writes': self.writes,
+            'sync_writes': self.sync_writes,
+            'write_errors': self.write_errors
+        }
@@ -0,0 +1,337 @@
+#!/usr/bin/env python3
+"""
+Bulk diagnosis - run the detector over whole image directories without the web server
+
+  python bulk_diagnose.py test/ --output diagnoses.jsonl
+  python bulk_diagnose.py 'scouting/2024-06-*/*.jpg' --output nightly.csv --workers 8 --batch-size 16
+  python bulk_diagnose.py scouting/ --output nightly.parquet --resume      (Parquet needs pyarrow)
+
+Images are decoded in a process pool (draft-mode decode, see image_decode.py)
+and go through the app's own inference path in batches - so INFERENCE_BACKEND,
+INFERENCE_PRECISION and INFERENCE_SERVER apply as they do for the app. Each
+image becomes one output row, written as soon as its batch is done. Disease
+information is looked up once per class and written to <output>.diseases.json.
+
+Finished images are appended to <output>.checkpoint; --resume skips them and
+appends to the existing output. An image whose batch was in flight when the
+run stopped may appear twice.
+"""
+import argparse
+import contextlib
+import csv
+import glob
+import json
+import os
+import sys
+import time
+from collections import deque
+from concurrent.futures import ProcessPoolExecutor
+from multiprocessing import get_context
+
+from image_decode import decode_image
+
+IMAGE_EXTENSIONS = {'.jpg', '.jpeg', '.png', '.bmp', '.gif', '.tif', '.tiff', '.webp'}
+CSV_COLUMNS = ['path', 'status', 'error', 'width', 'height', 'count', 'top_disease', 'top_confidence',
+               'healthy', 'classes', 'detections']
+STAGES = ['decode_wait', 'inference', 'postprocess', 'disease_info', 'write']
+
+
+def log(message):
+    print(message, file=sys.stderr, flush=True)
+
+
+def find_images(inputs):
+    """Image files under the given directories, files and glob patterns - sorted and de-duplicated"""
+    paths = []
+    for item in inputs:
+        if os.path.isdir(item):
+            for directory, _, filenames in os.walk(item):
+                paths.extend(os.path.join(directory, filename) for filename in filenames
+                             if os.path.splitext(filename)[1].lower() in IMAGE_EXTENSIONS)
+        elif os.path.isfile(item):
+            paths.append(item)
+        else:
+            paths.extend(path for path in glob.glob(item, recursive=True)
+                         if os.path.isfile(path) and os.path.splitext(path)[1].lower() in IMAGE_EXTENSIONS)
+    return sorted(dict.fromkeys(os.path.normpath(path) for path in paths))
+
+
+def load_image(path, max_side):
+    """Read and decode one image (runs in a pool process) - (path, image, scale, error, seconds)"""
+    started = time.perf_counter()
+    try:
+        with open(path, 'rb') as f:
+            decoded = decode_image(f.read(), max_side=max_side)
+        return path, decoded.image, decoded.scale, None, time.perf_counter() - started
+    except Exception as e:
+        return path, None, None, str(e) or type(e).__name__, time.perf_counter() - started
+
+
+def decoded_batches(paths, max_side, batch_size, workers, timings):
+    """Yield lists of load_image() results, decoding ahead in a bounded window of pool tasks"""
+    if workers <= 0:
+        for start in range(0, len(paths), batch_size):
+            yield [load_image(path, max_side) for path in paths[start:start + batch_size]]
+        return
+
+    # spawn: pool processes only import this module and image_decode, never the model
+    with ProcessPoolExecutor(max_workers=workers, mp_context=get_context('spawn')) as pool:
+        remaining = iter(paths)
+        pending = deque()
+        window = batch_size + 2 * workers
+
+        def fill():
+            while len(pending) < window:
+                path = next(remaining, None)
+                if path is None:
+                    return
+                pending.append(pool.submit(load_image, path, max_side))
+
+        fill()
+        while pending:
+            batch = []
+            while pending and len(batch) < batch_size:
+                started = time.perf_counter()
+                batch.append(pending.popleft().result())
+                timings['decode_wait'] += time.perf_counter() - started
+                fill()
+            yield batch
+
+
+def make_row(path, image=None, scale=None, detections=None, error=None, is_healthy=None):
+    """One output row per image"""
+    if error is not None:
+        return {'path': path, 'status': 'error', 'error': error, 'width': None, 'height': None, 'count': 0,
+                'top_disease': None, 'top_confidence': None, 'healthy': None, 'classes': [], 'detections': []}
+    top = max(detections, key=lambda detection: detection['confidence'], default=None)
+    return {
+        'path': path,
+        'status': 'ok',
+        'error': None,
+        'width': round(image.shape[1] * scale[0]),
+        'height': round(image.shape[0] * scale[1]),
+        'count': len(detections),
+        'top_disease': top['class_name'] if top else None,
+        'top_confidence': round(top['confidence'], 4) if top else None,
+        'healthy': is_healthy(top['class_name']) if top else None,
+        'classes': list(dict.fromkeys(detection['class_name'] for detection in detections)),
+        'detections': [{'disease': detection['class_name'],
+                        'confidence': round(detection['confidence'], 4),
+                        'bbox': [round(value, 1) for value in detection['bbox']]} for detection in detections]
+    }
+
+
+class JsonlWriter:
+    def __init__(self, path, append):
+        self.file = open(path, 'a' if append else 'w')
+
+    def write(self, rows):
+        for row in rows:
+            self.file.write(json.dumps(row) + '\n')
+        self.file.flush()
+
+    def close(self):
+        self.file.close()
+
+
+class CsvWriter:
+    """Flat rows - classes joined with ';', detections as a JSON string"""
+
+    def __init__(self, path, append):
+        write_header = not (append and os.path.exists(path) and os.path.getsize(path) > 0)
+        self.file = open(path, 'a' if append else 'w', newline='')
+        self.writer = csv.DictWriter(self.file, fieldnames=CSV_COLUMNS)
+        if write_header:
+            self.writer.writeheader()
+
+    def write(self, rows):
+        for row in rows:
+            self.writer.writerow(dict(row, classes=';'.join(row['classes']), detections=json.dumps(row['detections'])))
+        self.file.flush()
+
+    def close(self):
+        self.file.close()
+
+
+class ParquetWriter:
+    """One row group per batch. Parquet files can't be appended to, so a resumed run copies the
+    existing rows into a new file that replaces the old one on close"""
+
+    def __init__(self, path, append):
+        try:
+            import pyarrow as pa
+            import pyarrow.parquet as pq
+        except ImportError:
+            sys.exit("❌ Parquet output needs pyarrow (pip install pyarrow)")
+        self.pa = pa
+        self.path = path
+        self.tmp_path = f'{path}.{os.getpid()}.tmp'
+        detection = pa.struct([('disease', pa.string()), ('confidence', pa.float64()), ('bbox', pa.list_(pa.float64()))])
+        self.schema = pa.schema([
+            ('path', pa.string()), ('status', pa.string()), ('error', pa.string()),
+            ('width', pa.int64()), ('height', pa.int64()), ('count', pa.int64()),
+            ('top_disease', pa.string()), ('top_confidence', pa.float64()), ('healthy', pa.bool_()),
+            ('classes', pa.list_(pa.string())), ('detections', pa.list_(detection))
+        ])
+        self.writer = pq.ParquetWriter(self.tmp_path, self.schema)
+        if append and os.path.exists(path):
+            self.writer.write_table(pq.read_table(path, schema=self.schema))
+
+    def write(self, rows):
+        if rows:
+            self.writer.write_table(self.pa.Table.from_pylist(rows, schema=self.schema))
+
+    def close(self):
+        self.writer.close()
+        os.replace(self.tmp_path, self.path)
+
+
+WRITERS = {'.jsonl': JsonlWriter, '.csv': CsvWriter, '.parquet': ParquetWriter}
+
+
+def open_writer(path, append):
+    extension = os.path.splitext(path)[1].lower()
+    if extension not in WRITERS:
+        sys.exit(f"❌ Unsupported output format {extension or path} - use .jsonl, .csv or .parquet")
+    return WRITERS[extension](path, append)
+
+
+def read_checkpoint(path):
+    if not os.path.exists(path):
+        return set()
+    with open(path) as f:
+        return {line.rstrip('\n') for line in f if line.strip()}
+
+
+def diagnose(paths, output, batch_size, workers, max_side, with_info=True, use_api=True, resume=False, quiet=False):
+    """Run the bulk diagnosis and return its stats"""
+    # Imported here so pool processes never load the web app (or the model)
+    import app
+
+    checkpoint_path = f'{output}.checkpoint'
+    info_path = f'{os.path.splitext(output)[0]}.diseases.json'
+    done = read_checkpoint(checkpoint_path) if resume else set()
+    todo = [path for path in paths if path not in done]
+    class_info = {}
+    if resume and os.path.exists(info_path):
+        with open(info_path) as f:
+            class_info = json.load(f).get('classes', {})
+
+    stats = {'images': 0, 'failed': 0, 'detections': 0, 'skipped': len(paths) - len(todo),
+             'timings': dict.fromkeys(STAGES, 0.0), 'decode_seconds': 0.0}
+    timings = stats['timings']
+    log(f"🔄 {len(todo)} image(s) to diagnose ({stats['skipped']} already done), batch size {batch_size}, "
+        f"{workers} decode process(es), model {app.get_model_version()}")
+
+    writer = open_writer(output, append=resume)
+    app_output = open(os.devnull, 'w') if quiet else sys.stdout
+    started = time.perf_counter()
+    try:
+        with open(checkpoint_path, 'a' if resume else 'w') as checkpoint:
+            for batch in decoded_batches(todo, max_side, batch_size, workers, timings):
+                stats['decode_seconds'] += sum(item[4] for item in batch)
+                decoded = [item for item in batch if item[1] is not None]
+                rows = {path: make_row(path, error=error) for path, image, _, error, _ in batch if image is None}
+
+                with contextlib.redirect_stdout(app_output):
+                    stage = time.perf_counter()
+                    results = app.infer([image for _, image, _, _, _ in decoded]) if decoded else []
+                    timings['inference'] += time.perf_counter() - stage
+
+                    stage = time.perf_counter()
+                    for (path, image, scale, _, _), result in zip(decoded, results):
+                        detections = app.extract_detections(result)
+                        app.scale_detections(detections, scale)
+                        rows[path] = make_row(path, image, scale, detections, is_healthy=app.is_healthy_class)
+                    timings['postprocess'] += time.perf_counter() - stage
+
+                    # Disease information once per class, not per image
+                    stage = time.perf_counter()
+                    if with_info:
+                        for row in rows.values():
+                            for disease_name in row['classes']:
+                                if disease_name not in class_info:
+                                    class_info[disease_name] = app.get_disease_info(disease_name, use_api=use_api)
+                    timings['disease_info'] += time.perf_counter() - stage
+
+                stage = time.perf_counter()
+                ordered = [rows[item[0]] for item in batch]
+                writer.write(ordered)
+                checkpoint.write(''.join(f'{row["path"]}\n' for row in ordered))
+                checkpoint.flush()
+                timings['write'] += time.perf_counter() - stage
+
+                stats['images'] += len(ordered)
+                stats['failed'] += sum(row['status'] == 'error' for row in ordered)
+                stats['detections'] += sum(row['count'] for row in ordered)
+                elapsed = time.perf_counter() - started
+                log(f"   {stats['images']}/{len(todo)} images, {stats['images'] / elapsed:.1f} images/sec")
+    finally:
+        writer.close()
+        if quiet:
+            app_output.close()
+
+    stats['seconds'] = time.perf_counter() - started
+    stats['images_per_second'] = stats['images'] / stats['seconds'] if stats['seconds'] > 0 else None
+    if with_info:
+        with open(info_path, 'w') as f:
+            json.dump({'model_version': app.get_model_version(), 'classes': class_info}, f, indent=2)
+        stats['info_path'] = info_path
+    return stats
+
+
+def print_summary(stats, workers):
+    images = max(stats['images'], 1)
+    log("=" * 60)
+    rate = f"{stats['images_per_second']:.1f}" if stats['images_per_second'] else '-'
+    log(f"📊 {stats['images']} image(s) in {stats['seconds']:.1f}s - {rate} images/sec "
+        f"({stats['failed']} failed, {stats['detections']} detections, {stats['skipped']} skipped from checkpoint)")
+    log(f"{'Stage':<26}{'Total s':>10}{'ms/image':>10}")
+    log(f"{'decode (in pool)':<26}{stats['decode_seconds']:>10.2f}{stats['decode_seconds'] / images * 1000:>10.1f}")
+    for stage in STAGES:
+        seconds = stats['timings'][stage]
+        log(f"{stage.replace('_', ' '):<26}{seconds:>10.2f}{seconds / images * 1000:>10.1f}")
+    if workers > 0:
+        log("decode runs in parallel with inference - 'decode wait' is the time inference sat idle waiting for it")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('inputs', nargs='+', help='Image directories, files or glob patterns')
+    parser.add_argument('--output', '-o', required=True, help='Output file (.jsonl, .csv or .parquet)')
+    parser.add_argument('--batch-size', type=int, default=int(os.getenv('INFERENCE_BATCH_SIZE', '8')),
+                        help='Images per inference batch')
+    parser.add_argument('--workers', type=int, default=min(os.cpu_count() or 1, 8),
+                        help='Decode processes (0 decodes in the main process)')
+    parser.add_argument('--max-side', type=int, default=None,
+                        help='Decode target, as DECODE_MAX_SIDE for the app (default: 2x the model input)')
+    parser.add_argument('--conf', type=float, default=None, help='Confidence threshold (default: the app\'s)')
+    parser.add_argument('--no-info', action='store_true', help='Skip disease information lookups')
+    parser.add_argument('--local-info', action='store_true', help='Use the local disease database only, no external APIs')
+    parser.add_argument('--resume', action='store_true', help='Skip images recorded in the checkpoint and append')
+    parser.add_argument('--overwrite', action='store_true', help='Replace an existing output file')
+    parser.add_argument('--quiet', '-q', action='store_true', help='Hide the app\'s per-image log lines')
+    args = parser.parse_args()
+
+    if os.path.exists(args.output) and not (args.resume or args.overwrite):
+        sys.exit(f"❌ {args.output} exists - use --resume to continue it or --overwrite to replace it")
+    paths = find_images(args.inputs)
+    if not paths:
+        sys.exit(f"❌ No images found in {' '.join(args.inputs)}")
+
+    # The app's batching follows --batch-size; it reads its configuration at import
+    os.environ['INFERENCE_BATCH_SIZE'] = str(args.batch_size)
+    import app
+    if args.conf is not None:
+        app.CONFIDENCE_THRESHOLD = args.conf
+    max_side = args.max_side or (app.DECODE_MAX_SIDE if app.FAST_DECODE else None)
+
+    stats = diagnose(paths, args.output, args.batch_size, args.workers, max_side,
+                     with_info=not args.no_info, use_api=app.USE_EXTERNAL_APIs and not args.local_info,
+                     resume=args.resume, quiet=args.quiet)
+    print_summary(stats, args.workers)
+    log(f"✅ Results: {args.output}" + (f", disease info: {stats['info_path']}" if 'info_path' in stats else ''))
+
+
+if __name__ == "__main__":
+    main()
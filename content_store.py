@@ -0,0 +1,159 @@
+# Content-addressed upload/result storage
+# =======================================
+#
+# Blobs are named by a SHA-256 hex digest and sharded two directory levels deep
+# (uploads/3f/a9/3fa9...c2.jpg). Two users uploading IMG_0001.jpg never collide,
+# an identical upload is stored once, and no directory grows past 256 entries.
+# Public URLs only carry the name (/uploads/3fa9...c2.jpg), which never changes
+# for the same content. A background collector deletes blobs older than max_age,
+# then the least recently used ones until the folder fits in max_bytes. Blobs
+# still needed by pending work (queued background jobs) can be pinned.
+
+import os
+import re
+import threading
+import time
+
+NAME_PATTERN = re.compile(r'^[0-9a-f]{64}\.[a-z0-9]{1,5}$')
+
+# File extension for each sniffed image format
+EXTENSIONS = {'jpeg': '.jpg', 'tiff': '.tif'}
+
+
+def extension_for(image_format):
+    return EXTENSIONS.get(image_format, f'.{image_format}')
+
+
+def write_file_atomic(path, data):
+    """Write via a temporary file and rename, so readers never see a partial file"""
+    directory = os.path.dirname(path)
+    if directory:
+        os.makedirs(directory, exist_ok=True)
+    tmp_path = f"{path}.{os.getpid()}.{threading.get_ident()}.tmp"
+    with open(tmp_path, 'wb') as f:
+        f.write(data)
+    os.replace(tmp_path, path)
+
+
+class ContentStore:
+    """Sharded, content-addressed folder with age and size based garbage collection
+
+    max_age_seconds / max_bytes of None or 0 disable that limit. Files modified
+    within grace_seconds are never collected, so uploads still being processed survive.
+    pinned, if given, returns the paths that must never be collected whatever their age.
+    """
+
+    def __init__(self, root, max_age_seconds=None, max_bytes=None, grace_seconds=300, shard_levels=2,
+                 pinned=None):
+        self.root = root
+        self.max_age_seconds = max_age_seconds or None
+        self.max_bytes = max_bytes or None
+        self.grace_seconds = grace_seconds
+        self.shard_levels = shard_levels
+        self.pinned = pinned
+        self.collections = 0
+        self.last_collection = None
+        self._collector_pid = None
+        self._lock = threading.Lock()
+
+    def path_for(self, digest, extension):
+        """Storage path of a blob - <root>/<d[0:2]>/<d[2:4]>/<digest><extension>"""
+        shards = [digest[2 * level:2 * level + 2] for level in range(self.shard_levels)]
+        return os.path.join(self.root, *shards, digest + extension)
+
+    def path(self, name):
+        """Storage path for a public name, or None if it isn't a content-addressed name"""
+        if not NAME_PATTERN.match(name):
+            return None
+        digest, extension = os.path.splitext(name)
+        return self.path_for(digest, extension)
+
+    def touch(self, path):
+        """Mark a blob as recently used so size-based collection keeps it longer"""
+        try:
+            os.utime(path)
+        except OSError:
+            pass
+
+    def _files(self):
+        for directory, _, filenames in os.walk(self.root):
+            for filename in filenames:
+                if filename.startswith('.'):
+                    continue  # .gitkeep and the like
+                path = os.path.join(directory, filename)
+                try:
+                    stat = os.stat(path)
+                except OSError:
+                    continue
+                yield stat.st_mtime, stat.st_size, path
+
+    def collect(self, now=None):
+        """Delete expired blobs, then the oldest ones while over max_bytes - returns a summary"""
+        now = now or time.time()
+        started = time.perf_counter()
+        files = sorted(self._files())
+        total_bytes = sum(size for _, size, _ in files)
+        pinned = {os.path.normpath(path) for path in self.pinned()} if self.pinned else set()
+        deleted = freed = 0
+
+        for mtime, size, path in files:
+            if now - mtime < self.grace_seconds:
+                break  # Sorted oldest first - everything after this is newer still
+            expired = self.max_age_seconds is not None and now - mtime > self.max_age_seconds
+            over_budget = self.max_bytes is not None and total_bytes > self.max_bytes
+            if not expired and not over_budget:
+                break
+            if os.path.normpath(path) in pinned:
+                continue  # Still counts towards max_bytes, so older unpinned blobs go instead
+            try:
+                os.remove(path)
+            except FileNotFoundError:
+                pass  # Another worker's collector got there first
+            except OSError as e:
+                print(f"⚠️ Could not delete {path}: {e}")
+                continue
+            deleted += 1
+            freed += size
+            total_bytes -= size
+
+        self.collections += 1
+        self.last_collection = {
+            'at': now,
+            'files': len(files) - deleted,
+            'bytes': total_bytes,
+            'deleted': deleted,
+            'freed_bytes': freed,
+            'seconds': round(time.perf_counter() - started, 3)
+        }
+        return self.last_collection
+
+    def start_collector(self, interval_seconds):
+        """Collect every interval_seconds in a daemon thread - once per process (threads don't survive fork)"""
+        if not interval_seconds or self._collector_pid == os.getpid():
+            return
+        with self._lock:
+            if self._collector_pid == os.getpid():
+                return
+            threading.Thread(target=self._collector, args=(interval_seconds,),
+                             name=f'gc-{os.path.basename(self.root)}', daemon=True).start()
+            self._collector_pid = os.getpid()
+
+    def _collector(self, interval_seconds):
+        while True:
+            try:
+                summary = self.collect()
+                if summary['deleted']:
+                    print(f"🧹 {self.root}: deleted {summary['deleted']} file(s), freed "
+                          f"{summary['freed_bytes'] / 1024 / 1024:.1f}MB ({summary['files']} kept)")
+            except Exception as e:
+                print(f"⚠️ Storage collection failed for {self.root}: {e}")
+            time.sleep(interval_seconds)
+
+    def stats(self):
+        return {
+            'root': self.root,
+            'max_age_seconds': self.max_age_seconds,
+            'max_bytes': self.max_bytes,
+            'collections': self.collections,
+            'last_collection': self.last_collection
+        }
@@ -0,0 +1,321 @@
+#!/usr/bin/env python3
+"""
+Accuracy + throughput evaluation on the labelled images in test/
+
+File names carry the label (AppleCedarRust1.JPG, TomatoHealthy3.JPG, ...). The
+prefix is matched to a model class by its words - plant first, then disease
+words, 'Healthy' meaning the plain '<plant> leaf' class - and unmatched files
+(plant3.jpg) only count towards speed. --map fixes a prefix by hand.
+
+Every configuration runs in its own subprocess through the app's inference
+path (decode, batched inference, detections), so all app settings apply:
+
+  python evaluate_model.py
+  python evaluate_model.py --config backend=pytorch --config backend=onnxruntime,precision=int8
+  python evaluate_model.py --config batch=1 --config batch=8,imgsz=512 --max-accuracy-drop 0.02
+
+Config keys: backend, precision, imgsz, batch, conf, decode (DECODE_MAX_SIDE);
+UPPERCASE keys are passed to the app as environment variables. The first
+configuration is the baseline the others are compared against.
+
+Reported per configuration: top-1 accuracy (highest-confidence detection, no
+detection counts as wrong), per-class accuracy, confusion matrix, p50/p95/p99
+latency per image (decode + inference + post-processing of its batch),
+images/sec and peak RSS.
+"""
+import argparse
+import glob
+import json
+import math
+import os
+import re
+import subprocess
+import sys
+import time
+from collections import Counter
+
+NO_DETECTION = '(none)'
+
+# Short config keys -> app environment variables
+CONFIG_KEYS = {
+    'backend': 'INFERENCE_BACKEND',
+    'precision': 'INFERENCE_PRECISION',
+    'imgsz': 'INFERENCE_IMGSZ',
+    'batch': 'INFERENCE_BATCH_SIZE',
+    'decode': 'DECODE_MAX_SIDE'
+}
+
+# Words that don't tell classes apart
+IGNORED_WORDS = {'leaf', 'leaves', 'plant'}
+
+
+def label_prefix(path):
+    """AppleCedarRust from test/AppleCedarRust1.JPG"""
+    return re.sub(r'[\d_\-\s]+$', '', os.path.splitext(os.path.basename(path))[0])
+
+
+def split_words(text):
+    """Lower-case words of a CamelCase, snake_case or spaced name"""
+    return [word.lower() for word in re.findall(r'[A-Z]?[a-z]+|[A-Z]+(?![a-z])|\d+', text)]
+
+
+def match_class(prefix, names):
+    """Model class for a file-name prefix, or None when no class (or more than one) fits"""
+    words = split_words(prefix)
+    if len(words) < 2:
+        return None
+    plant, disease = words[0], set(words[1:]) - IGNORED_WORDS
+    candidates = []
+    for name in names:
+        class_words = split_words(name)
+        if not class_words or class_words[0] != plant:
+            continue
+        class_disease = set(class_words[1:]) - IGNORED_WORDS - {plant}
+        if disease == {'healthy'}:
+            score = 1.0 if class_disease <= {'healthy'} else 0.0
+        else:
+            score = len(disease & class_disease) / len(disease | class_disease) if class_disease else 0.0
+        if score > 0:
+            candidates.append((score, name))
+    candidates.sort(reverse=True)
+    if not candidates or (len(candidates) > 1 and candidates[0][0] == candidates[1][0]):
+        return None
+    return candidates[0][1]
+
+
+def build_label_map(prefixes, names, overrides=None):
+    overrides = overrides or {}
+    return {prefix: overrides.get(prefix) or match_class(prefix, names) for prefix in sorted(set(prefixes))}
+
+
+def percentile(values, q):
+    """Nearest-rank percentile"""
+    if not values:
+        return None
+    ordered = sorted(values)
+    return ordered[min(len(ordered) - 1, max(0, math.ceil(q / 100 * len(ordered)) - 1))]
+
+
+def score_predictions(predictions, labels):
+    """Top-1 accuracy, per-class accuracy and confusion matrix over the labelled images
+
+    predictions: {path: predicted class or NO_DETECTION}; labels: {path: true class}
+    """
+    confusion = {}
+    for path, truth in labels.items():
+        row = confusion.setdefault(truth, Counter())
+        row[predictions.get(path, NO_DETECTION)] += 1
+    correct = sum(row[truth] for truth, row in confusion.items())
+    total = sum(sum(row.values()) for row in confusion.values())
+    return {
+        'labelled_images': total,
+        'accuracy': correct / total if total else None,
+        'per_class': {truth: {'images': sum(row.values()), 'accuracy': row[truth] / sum(row.values())}
+                      for truth, row in sorted(confusion.items())},
+        'confusion': {truth: dict(row) for truth, row in sorted(confusion.items())}
+    }
+
+
+def parse_config(spec):
+    """'backend=onnxruntime,batch=8' -> (environment, confidence threshold or None)"""
+    environment, conf = {}, None
+    for item in filter(None, (part.strip() for part in spec.split(','))):
+        key, _, value = item.partition('=')
+        if key == 'conf':
+            conf = float(value)
+        elif key in CONFIG_KEYS:
+            environment[CONFIG_KEYS[key]] = value
+        elif key.isupper():
+            environment[key] = value
+        else:
+            raise ValueError(f"Unknown config key '{key}' - use {', '.join(sorted(CONFIG_KEYS))}, conf or ENV_VARS")
+    return environment, conf
+
+
+def run_worker(args):
+    """Evaluate the configuration in this process's environment and print the raw results as a JSON line"""
+    from benchmark_decode import peak_rss_mb
+    from image_decode import decode_image
+
+    paths = sorted(glob.glob(args.images))
+    payloads = [open(path, 'rb').read() for path in paths]
+
+    start = time.perf_counter()
+    import app
+    if args.conf is not None:
+        app.CONFIDENCE_THRESHOLD = args.conf
+    app.get_yolo_model()
+    load_seconds = time.perf_counter() - start
+    max_side = app.DECODE_MAX_SIDE if app.FAST_DECODE else None
+    batch_size = app.INFERENCE_BATCH_SIZE
+
+    def run_batch(batch):
+        decoded = [decode_image(data, max_side=max_side) for data in batch]
+        results = app.infer([item.image for item in decoded])
+        outputs = []
+        for item, result in zip(decoded, results):
+            detections = app.extract_detections(result)
+            app.scale_detections(detections, item.scale)
+            outputs.append(detections)
+        return outputs, results[0].names if results else {}
+
+    for index in range(min(args.warmup, len(payloads))):
+        run_batch(payloads[index:index + 1])
+
+    latencies, predictions, names = [], {}, {}
+    started = time.perf_counter()
+    for round_number in range(args.rounds):
+        for offset in range(0, len(payloads), batch_size):
+            batch_start = time.perf_counter()
+            outputs, batch_names = run_batch(payloads[offset:offset + batch_size])
+            elapsed_ms = (time.perf_counter() - batch_start) * 1000
+            latencies.extend([elapsed_ms] * len(outputs))  # Each image waits for its whole batch
+            names.update(batch_names)
+            if round_number == 0:
+                for path, detections in zip(paths[offset:offset + batch_size], outputs):
+                    top = max(detections, key=lambda detection: detection['confidence'], default=None)
+                    predictions[path] = [top['class_name'], top['confidence']] if top else [NO_DETECTION, 0.0]
+    seconds = time.perf_counter() - started
+
+    print(json.dumps({
+        'model_version': app.get_model_version(),
+        'confidence_threshold': app.CONFIDENCE_THRESHOLD,
+        'batch_size': batch_size,
+        'names': [names[key] for key in sorted(names)],
+        'predictions': predictions,
+        'load_seconds': round(load_seconds, 2),
+        'latencies_ms': [round(latency, 2) for latency in latencies],
+        'images_per_second': round(len(latencies) / seconds, 2) if seconds > 0 else None,
+        'peak_rss_mb': round(peak_rss_mb(), 1)
+    }))
+
+
+def evaluate(spec, args):
+    """Run one configuration in a subprocess and score it"""
+    environment, conf = parse_config(spec)
+    command = [sys.executable, os.path.abspath(__file__), '--worker', '--images', args.images,
+               '--rounds', str(args.rounds), '--warmup', str(args.warmup)]
+    if conf is not None:
+        command += ['--conf', str(conf)]
+    completed = subprocess.run(command, capture_output=True, text=True, env=dict(os.environ, **environment))
+    lines = [line for line in completed.stdout.splitlines() if line.startswith('{')]
+    if completed.returncode != 0 or not lines:
+        error = (completed.stderr.strip().splitlines() or ['unknown error'])[-1]
+        return {'config': spec, 'error': error}
+
+    raw = json.loads(lines[-1])
+    label_map = build_label_map([label_prefix(path) for path in raw['predictions']], raw['names'], args.map)
+    labels = {path: label_map[label_prefix(path)] for path in raw['predictions'] if label_map[label_prefix(path)]}
+    predictions = {path: prediction[0] for path, prediction in raw['predictions'].items()}
+    latencies = raw.pop('latencies_ms')
+    return dict(raw, config=spec or 'default', label_map=label_map,
+                latency_ms={'p50': percentile(latencies, 50), 'p95': percentile(latencies, 95),
+                            'p99': percentile(latencies, 99)},
+                **score_predictions(predictions, labels))
+
+
+def print_report(reports):
+    width = 24
+    valid = [report for report in reports if 'error' not in report]
+    for report in reports:
+        if 'error' in report:
+            print(f"❌ {report['config']}: {report['error']}")
+    if not valid:
+        return
+
+    baseline = valid[0]
+    print("=" * (22 + width * len(valid)))
+    print(f"{'':<22}" + ''.join(f"{report['config'][:width - 2]:>{width}}" for report in valid))
+
+    def row(label, key, fmt, delta=False):
+        cells = []
+        for report in valid:
+            value = key(report)
+            cell = '-' if value is None else format(value, fmt)
+            if delta and report is not baseline and value is not None and key(baseline) is not None:
+                cell += f" ({value - key(baseline):+{fmt}})"
+            cells.append(f"{cell:>{width}}")
+        print(f"{label:<22}" + ''.join(cells))
+
+    row('Top-1 accuracy', lambda report: report['accuracy'], '.3f', delta=True)
+    row('Labelled images', lambda report: report['labelled_images'], 'd')
+    row('p50 latency ms', lambda report: report['latency_ms']['p50'], '.1f', delta=True)
+    row('p95 latency ms', lambda report: report['latency_ms']['p95'], '.1f', delta=True)
+    row('p99 latency ms', lambda report: report['latency_ms']['p99'], '.1f', delta=True)
+    row('Images/sec', lambda report: report['images_per_second'], '.1f', delta=True)
+    row('Peak RSS MB', lambda report: report['peak_rss_mb'], '.0f', delta=True)
+    row('Model load s', lambda report: report['load_seconds'], '.2f')
+    row('Batch size', lambda report: report['batch_size'], 'd')
+    row('Confidence', lambda report: report['confidence_threshold'], '.2f')
+
+    classes = sorted({truth for report in valid for truth in report['per_class']})
+    print("-" * (22 + width * len(valid)))
+    for truth in classes:
+        row(truth[:21], lambda report: report['per_class'].get(truth, {}).get('accuracy'), '.2f')
+
+    for report in valid:
+        print("-" * (22 + width * len(valid)))
+        print(f"Confusion matrix - {report['config']} (rows: true class, columns: predicted)")
+        predicted = sorted({name for counts in report['confusion'].values() for name in counts})
+        print(f"{'':<26}" + ''.join(f"{index:>4}" for index in range(len(predicted))))
+        for truth, counts in report['confusion'].items():
+            print(f"{truth[:25]:<26}" + ''.join(f"{counts.get(name, 0) or '.':>4}" for name in predicted))
+        print('  ' + ', '.join(f"{index}: {name}" for index, name in enumerate(predicted)))
+
+    unmatched = sorted(prefix for prefix, name in baseline['label_map'].items() if name is None)
+    if unmatched:
+        print(f"⚠️ No class for file prefix(es) {', '.join(unmatched)} - speed only (use --map PREFIX=CLASS)")
+
+    changed = [path for path, prediction in baseline['predictions'].items()
+               if any(report['predictions'].get(path, [None])[0] != prediction[0] for report in valid[1:])]
+    if len(valid) > 1:
+        print(f"🔀 {len(changed)} image(s) change their top class between configurations"
+              + (f": {', '.join(os.path.basename(path) for path in changed[:10])}" if changed else ''))
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--images', default='test/*', help='Glob of labelled images')
+    parser.add_argument('--config', action='append', default=None,
+                        help='Configuration to evaluate, e.g. backend=onnxruntime,batch=8 (repeatable)')
+    parser.add_argument('--map', action='append', default=[], metavar='PREFIX=CLASS',
+                        help='Class for a file-name prefix the automatic matching gets wrong (repeatable)')
+    parser.add_argument('--rounds', type=int, default=3, help='Timed passes over the image set')
+    parser.add_argument('--warmup', type=int, default=2, help='Untimed warm-up images')
+    parser.add_argument('--max-accuracy-drop', type=float, default=None,
+                        help='Exit non-zero if a configuration is this much less accurate than the first')
+    parser.add_argument('--output', help='Also write the full reports as JSON')
+    parser.add_argument('--conf', type=float, default=None, help=argparse.SUPPRESS)
+    parser.add_argument('--worker', action='store_true', help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    if args.worker:
+        run_worker(args)
+        return
+
+    args.map = dict(item.split('=', 1) for item in args.map)
+    configs = args.config or ['']
+    for spec in configs:
+        parse_config(spec)  # Fail on typos before running anything
+
+    print(f"📊 Evaluating {len(configs)} configuration(s) on {args.images}, {args.rounds} timed round(s)")
+    reports = [evaluate(spec, args) for spec in configs]
+    print_report(reports)
+
+    if args.output:
+        with open(args.output, 'w') as f:
+            json.dump(reports, f, indent=2)
+        print(f"✅ Reports written to {args.output}")
+
+    valid = [report for report in reports if 'error' not in report]
+    if len(valid) < len(reports):
+        sys.exit(1)
+    if args.max_accuracy_drop is not None and valid[0]['accuracy'] is not None:
+        regressions = [report['config'] for report in valid[1:] if report['accuracy'] is not None
+                       and valid[0]['accuracy'] - report['accuracy'] > args.max_accuracy_drop]
+        if regressions:
+            sys.exit(f"❌ Accuracy regression beyond {args.max_accuracy_drop}: {', '.join(regressions)}")
+
+
+if __name__ == "__main__":
+    main()
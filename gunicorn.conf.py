@@ -0,0 +1,16 @@
+# Gunicorn hooks
+# ==============
+#
+# Picked up automatically from the working directory; bind, workers and the
+# other settings stay on the command line (Dockerfile / railway.toml).
+
+from metrics import clear_multiprocess_dir, mark_process_dead
+
+# Read before --preload imports the app - samples of the previous run must not
+# be merged into /metrics, and the master may record (model load) during preload
+clear_multiprocess_dir()
+
+
+def child_exit(server, worker):
+    # Workers are recycled every --max-requests; drop their live gauges
+    mark_process_dead(worker.pid)
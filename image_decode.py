@@ -0,0 +1,79 @@
+# Fast, validating image decode for uploads
+# ========================================
+#
+# Uploads are sniffed by their magic bytes before anything is written to disk.
+# JPEGs are decoded with Pillow's draft mode, which lets libjpeg downscale in
+# the DCT domain (1/2, 1/4 or 1/8) - a 12-MP photo decodes straight to about
+# twice the model input size, in a fraction of the time and memory of a full
+# decode. Other formats are reduced by an integer factor after decoding. EXIF
+# orientation is applied and the result is a BGR array the model takes as-is,
+# along with the scale that maps its coordinates back onto the original image.
+
+import io
+from collections import namedtuple
+
+import numpy as np
+from PIL import Image, ImageOps
+
+# (offset, signature, format) - checked against the first bytes of the upload
+IMAGE_SIGNATURES = [
+    (0, b'\xff\xd8\xff', 'jpeg'),
+    (0, b'\x89PNG\r\n\x1a\n', 'png'),
+    (0, b'GIF87a', 'gif'),
+    (0, b'GIF89a', 'gif'),
+    (0, b'BM', 'bmp'),
+    (0, b'II*\x00', 'tiff'),
+    (0, b'MM\x00*', 'tiff'),
+    (8, b'WEBP', 'webp')
+]
+
+# EXIF orientations that rotate the image by 90 degrees
+TRANSPOSED_ORIENTATIONS = {5, 6, 7, 8}
+
+DecodedImage = namedtuple('DecodedImage', ['image', 'format', 'original_size', 'scale'])
+
+
+class InvalidImage(ValueError):
+    """The upload is not an image format we can decode"""
+
+
+def sniff_image_type(data):
+    """Image format from magic bytes, or None for anything else"""
+    for offset, signature, image_format in IMAGE_SIGNATURES:
+        if data[offset:offset + len(signature)] == signature:
+            if image_format == 'webp' and data[:4] != b'RIFF':
+                continue
+            return image_format
+    return None
+
+
+def decode_image(data, max_side=None):
+    """Decode upload bytes to an EXIF-oriented BGR array
+
+    With max_side, the image is downscaled while decoding, keeping its shorter side
+    at or above max_side. scale is the (x, y) factor from decoded to original pixels.
+    """
+    image_format = sniff_image_type(data)
+    if image_format is None:
+        raise InvalidImage('Not a supported image file')
+
+    image = Image.open(io.BytesIO(data))
+    width, height = image.size
+    orientation = image.getexif().get(0x0112, 1)
+    if orientation in TRANSPOSED_ORIENTATIONS:
+        width, height = height, width
+
+    if max_side and image_format == 'jpeg':
+        image.draft('RGB', (max_side, max_side))
+    if orientation != 1:
+        image = ImageOps.exif_transpose(image)
+    if max_side and image_format != 'jpeg':
+        factor = min(image.size) // max_side
+        if factor >= 2:
+            image = image.reduce(factor)
+
+    if image.mode != 'RGB':
+        image = image.convert('RGB')
+    scale = (width / image.size[0], height / image.size[1])
+    # YOLO expects OpenCV channel order for numpy inputs
+    return DecodedImage(np.ascontiguousarray(np.asarray(image)[:, :, ::-1]), image_format, (width, height), scale)
@@ -0,0 +1,283 @@
+#!/usr/bin/env python3
+"""
+Local inference server: one process owns the YOLO model, web workers are thin clients
+
+Every gunicorn worker that loads the model adds its full size to RAM. With
+INFERENCE_SERVER set, web workers stay lightweight: they decode the image into
+a shared-memory block, send only the block's name over a Unix socket
+(multiprocessing.connection) and get back an (N, 6) detection array per image.
+The server runs requests from all workers through a MicroBatchScheduler, so
+concurrent uploads share forward passes. Annotated images are drawn client-side.
+
+  INFERENCE_SERVER=spawn    the gunicorn master (--preload) forks one server per socket,
+                            in a fresh private directory with a random key
+  INFERENCE_SERVER=connect  connect to servers started separately, e.g. pinned to cores:
+
+      export INFERENCE_SERVER_AUTHKEY=$(openssl rand -hex 32)  # Same value for servers and app
+      python inference_server.py --socket /tmp/leafiq-inference/0.sock --cpus 0,1
+      python inference_server.py --socket /tmp/leafiq-inference/1.sock --cpus 2,3
+      INFERENCE_SOCKETS=/tmp/leafiq-inference/0.sock,/tmp/leafiq-inference/1.sock
+
+Clients spread over the sockets by process id. Requests are pickled, so only
+this user may reach a socket: it is created 0600 inside a directory that must be
+owned by this user and closed to others, and clients need the shared key.
+"""
+import argparse
+import mmap
+import os
+import sys
+import threading
+import time
+from multiprocessing import shared_memory
+from multiprocessing.connection import Client, Listener
+
+import numpy as np
+
+from batch_scheduler import MicroBatchScheduler
+
+CONNECT_RETRY_INTERVAL = 0.2
+SHM_DIR = '/dev/shm'  # Where POSIX shared memory blocks live on Linux
+DEFAULT_SOCKET = '/tmp/leafiq-inference/server.sock'
+
+
+def prepare_socket_dir(address):
+    """Create the socket's directory private to this user - refuse one other users can reach"""
+    directory = os.path.dirname(os.path.abspath(address))
+    os.makedirs(directory, mode=0o700, exist_ok=True)
+    info = os.stat(directory)
+    if info.st_uid != os.getuid() or info.st_mode & 0o077:
+        raise RuntimeError(f"Socket directory {directory} must belong to this user with mode 0700")
+
+
+def result_to_array(result):
+    """One YOLO result -> (N, 6) float32 array of x1, y1, x2, y2, confidence, class"""
+    rows = [[*box.xyxy[0].tolist(), float(box.conf[0]), float(box.cls[0])] for box in (result.boxes or [])]
+    return np.array(rows, dtype=np.float32).reshape(-1, 6)
+
+
+def attach_block(name):
+    """Map a client's shared-memory block without registering it with a resource tracker
+
+    The client owns and unlinks the block. SharedMemory(name=...) would also register
+    it with this process's tracker (shared with the client when both were forked from
+    the gunicorn master), which then loses track of the client's own registration.
+    """
+    with open(os.path.join(SHM_DIR, name.lstrip('/')), 'r+b') as f:
+        return mmap.mmap(f.fileno(), 0)
+
+
+class InferenceServer:
+    """Serve batched inference over a Unix socket, reading images from shared memory"""
+
+    def __init__(self, model, max_batch_size=8, max_wait_ms=10, precision=None):
+        self.model = model
+        self.precision = precision
+        self.scheduler = MicroBatchScheduler(self._run_batch, max_batch_size=max_batch_size, max_wait_ms=max_wait_ms)
+        self.started_at = time.time()
+        self.requests = 0
+        self.images = 0
+        self.errors = 0
+
+    def _run_batch(self, items):
+        """items are ((block name, shape, dtype), conf) - views only exist inside this call"""
+        blocks = [attach_block(name) for (name, _, _), _ in items]
+        try:
+            images = [np.ndarray(shape, dtype=dtype, buffer=block)
+                      for block, ((_, shape, dtype), _) in zip(blocks, items)]
+            confs = [conf for _, conf in items]
+            results = self.model(images, conf=min(confs))
+            detections = [result_to_array(result) for result in results]
+            del images, results
+            return [rows[rows[:, 4] >= conf] for rows, conf in zip(detections, confs)]
+        finally:
+            for block in blocks:
+                try:
+                    block.close()
+                except BufferError:
+                    # The model still holds a view (e.g. ultralytics keeps its last batch);
+                    # the mapping is released once that reference goes away
+                    pass
+
+    def handle(self, conn):
+        """Serve one client connection until it disconnects"""
+        try:
+            while True:
+                try:
+                    message = conn.recv()
+                except EOFError:
+                    return
+                command = message[0]
+                try:
+                    if command == 'infer':
+                        _, conf, images = message
+                        self.requests += 1
+                        self.images += len(images)
+                        conn.send(('ok', self.scheduler.map([(image, conf) for image in images])))
+                    elif command == 'info':
+                        conn.send(('ok', self.info()))
+                    else:
+                        conn.send(('error', f"Unknown command: {command}"))
+                except Exception as e:
+                    self.errors += 1
+                    print(f"❌ Inference server request failed: {e}")
+                    conn.send(('error', str(e)))
+        finally:
+            conn.close()
+
+    def info(self):
+        return {
+            'pid': os.getpid(),
+            'names': dict(self.model.names),
+            'precision': self.precision,
+            'uptime_seconds': round(time.time() - self.started_at, 1),
+            'requests': self.requests,
+            'images': self.images,
+            'errors': self.errors,
+            'scheduler': self.scheduler.stats()
+        }
+
+
+def serve(address, load_model, authkey, max_batch_size=8, max_wait_ms=10, cpus=None, precision=None):
+    """Load the model and serve clients on a Unix socket until the process is killed
+
+    precision, if given, is called after the load and returns the precision the model runs at.
+    """
+    if not authkey:
+        raise ValueError("Inference server needs an authkey")  # An empty key would skip authentication
+    if cpus:
+        os.sched_setaffinity(0, cpus)
+    prepare_socket_dir(address)
+    model = load_model()
+    if model is None:
+        raise RuntimeError("Inference server could not load the YOLO model")
+    server = InferenceServer(model, max_batch_size=max_batch_size, max_wait_ms=max_wait_ms,
+                             precision=precision() if precision else None)
+
+    if os.path.exists(address):
+        os.unlink(address)
+    umask = os.umask(0o177)  # Socket is 0600 from the moment it exists
+    try:
+        listener = Listener(address, family='AF_UNIX', authkey=authkey)
+    finally:
+        os.umask(umask)
+    print(f"✅ Inference server {os.getpid()} listening on {address} ({len(model.names)} classes)")
+    while True:
+        try:
+            conn = listener.accept()
+        except Exception as e:
+            print(f"⚠️ Inference server rejected a connection: {e}")
+            continue
+        threading.Thread(target=server.handle, args=(conn,), name='inference-client', daemon=True).start()
+
+
+class InferenceClient:
+    """Send images to an inference server through shared memory; thread- and fork-safe"""
+
+    def __init__(self, addresses, authkey, timeout=60):
+        if not authkey:
+            raise ValueError("Inference client needs the servers' authkey")
+        self.addresses = addresses
+        self.authkey = authkey
+        self.timeout = timeout
+        self._local = threading.local()
+        self.names = None
+
+    @property
+    def address(self):
+        return self.addresses[os.getpid() % len(self.addresses)]
+
+    def _connection(self):
+        """One connection per thread and process - connections can't be shared across either"""
+        if getattr(self._local, 'pid', None) == os.getpid() and self._local.conn is not None:
+            return self._local.conn
+        deadline = time.monotonic() + self.timeout
+        while True:
+            try:
+                conn = Client(self.address, family='AF_UNIX', authkey=self.authkey)
+                break
+            except (FileNotFoundError, ConnectionRefusedError):
+                # The server may still be loading the model
+                if time.monotonic() >= deadline:
+                    raise
+                time.sleep(CONNECT_RETRY_INTERVAL)
+        self._local.pid = os.getpid()
+        self._local.conn = conn
+        return conn
+
+    def _drop_connection(self):
+        conn = getattr(self._local, 'conn', None)
+        self._local.conn = None
+        if conn is not None and getattr(self._local, 'pid', None) == os.getpid():
+            conn.close()
+
+    def _request(self, message):
+        conn = self._connection()
+        try:
+            conn.send(message)
+            if not conn.poll(self.timeout):
+                raise TimeoutError(f"Inference server did not answer within {self.timeout}s")
+            status, payload = conn.recv()
+        except (EOFError, OSError, TimeoutError):
+            # A late reply would desynchronize the connection - start over next time
+            self._drop_connection()
+            raise
+        if status != 'ok':
+            raise RuntimeError(f"Inference server error: {payload}")
+        return payload
+
+    def info(self):
+        info = self._request(('info',))
+        self.names = info['names']
+        return info
+
+    def detect(self, images, conf):
+        """Detection arrays for BGR images, one (N, 6) array per image"""
+        blocks = []
+        try:
+            descriptors = []
+            for image in images:
+                block = shared_memory.SharedMemory(create=True, size=max(image.nbytes, 1))
+                blocks.append(block)
+                view = np.ndarray(image.shape, dtype=image.dtype, buffer=block.buf)
+                view[:] = image
+                del view
+                descriptors.append((block.name, image.shape, image.dtype.str))
+            return self._request(('infer', conf, descriptors))
+        finally:
+            for block in blocks:
+                block.close()
+                block.unlink()
+
+    def __call__(self, source, conf=0.25, **kwargs):
+        """Drop-in for the YOLO model call: paths or BGR arrays in, result objects out"""
+        from onnx_backend import DetectionResult
+        import cv2
+
+        sources = source if isinstance(source, (list, tuple)) else [source]
+        images = [cv2.imread(item) if isinstance(item, str) else item for item in sources]
+        for item, image in zip(sources, images):
+            if image is None:
+                raise FileNotFoundError(f"Could not read image: {item}")
+        if self.names is None:
+            self.info()
+        return [DetectionResult(image, rows, self.names) for image, rows in zip(images, self.detect(images, conf))]
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--socket', default=(os.getenv('INFERENCE_SOCKETS') or DEFAULT_SOCKET).split(',')[0])
+    parser.add_argument('--cpus', default='', help='Comma-separated CPU ids to pin this server to')
+    args = parser.parse_args()
+
+    # Load the model exactly like the web app does (backend, precision, warm-up settings)
+    os.environ['INFERENCE_SERVER'] = ''
+    import app
+    if not app.INFERENCE_SERVER_AUTHKEY:
+        sys.exit("❌ Set INFERENCE_SERVER_AUTHKEY (the same secret the app connects with)")
+    serve(args.socket, app.get_yolo_model, app.INFERENCE_SERVER_AUTHKEY,
+          max_batch_size=app.BATCH_MAX_SIZE, max_wait_ms=app.BATCH_MAX_WAIT_MS,
+          cpus=[int(cpu) for cpu in args.cpus.split(',') if cpu.strip()], precision=lambda: app.model_precision)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,152 @@
+# Persistent cache for disease-information provider responses
+# ===========================================================
+#
+# Gemini, Google Search and Wikipedia answers only depend on the disease name
+# (and the prompt/query version), and the model has ~30 classes, so after a
+# warm-up every enrichment can be served from a local SQLite lookup.
+#
+# - Fresh entries (younger than ttl) are returned directly
+# - Stale entries (older than ttl but within the stale window) are returned
+#   immediately while a background thread refreshes them
+# - Misses call the provider synchronously and store non-empty answers
+
+import json
+import os
+import sqlite3
+import threading
+import time
+from contextlib import contextmanager
+
+
+class ProviderCache:
+    """SQLite-backed (provider, disease, version) -> response cache with TTL and stale-while-revalidate"""
+
+    def __init__(self, db_path, ttl_seconds=7 * 24 * 3600, stale_seconds=30 * 24 * 3600, max_entries=1000):
+        self.db_path = db_path
+        self.ttl = ttl_seconds
+        self.stale = stale_seconds
+        self.max_entries = max_entries
+        self._refreshing = set()
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.stale_hits = 0
+        self.misses = 0
+
+        directory = os.path.dirname(db_path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        with self._connect() as conn:
+            conn.execute('PRAGMA journal_mode=WAL')
+            conn.execute("""
+                CREATE TABLE IF NOT EXISTS provider_cache (
+                    key TEXT PRIMARY KEY,
+                    provider TEXT NOT NULL,
+                    disease TEXT NOT NULL,
+                    version TEXT NOT NULL,
+                    value TEXT NOT NULL,
+                    updated_at REAL NOT NULL
+                )
+            """)
+            conn.execute('CREATE INDEX IF NOT EXISTS provider_cache_updated ON provider_cache (updated_at)')
+
+    @contextmanager
+    def _connect(self):
+        # One short-lived connection per operation keeps this safe across threads and worker processes
+        conn = sqlite3.connect(self.db_path, timeout=5)
+        try:
+            with conn:
+                yield conn
+        finally:
+            conn.close()
+
+    @staticmethod
+    def _key(provider, disease_name, version):
+        return f"{provider}|{version}|{disease_name}"
+
+    def get(self, provider, disease_name, version):
+        """Return (value, age_seconds) or (None, None)"""
+        with self._connect() as conn:
+            row = conn.execute('SELECT value, updated_at FROM provider_cache WHERE key = ?',
+                               (self._key(provider, disease_name, version),)).fetchone()
+        if row is None:
+            return None, None
+        return json.loads(row[0]), time.time() - row[1]
+
+    def put(self, provider, disease_name, version, value):
+        with self._connect() as conn:
+            conn.execute('INSERT OR REPLACE INTO provider_cache VALUES (?, ?, ?, ?, ?, ?)',
+                         (self._key(provider, disease_name, version), provider, disease_name, version,
+                          json.dumps(value), time.time()))
+            # Keep the table bounded - drop the oldest entries first
+            conn.execute("""
+                DELETE FROM provider_cache WHERE key IN (
+                    SELECT key FROM provider_cache ORDER BY updated_at DESC LIMIT -1 OFFSET ?
+                )
+            """, (self.max_entries,))
+
+    def fetch(self, provider, disease_name, version, loader):
+        """Return the cached answer for this provider, calling loader() on a miss"""
+        try:
+            value, age = self.get(provider, disease_name, version)
+        except sqlite3.Error as e:
+            print(f"⚠️ Provider cache unavailable: {e}")
+            return loader()
+
+        if value is not None and age < self.ttl:
+            self.hits += 1
+            return value
+
+        if value is not None and age < self.ttl + self.stale:
+            self.stale_hits += 1
+            self._refresh_in_background(provider, disease_name, version, loader)
+            return value
+
+        self.misses += 1
+        value = loader()
+        if value:
+            self._store(provider, disease_name, version, value)
+        return value
+
+    def _store(self, provider, disease_name, version, value):
+        try:
+            self.put(provider, disease_name, version, value)
+        except sqlite3.Error as e:
+            print(f"⚠️ Could not cache {provider} response: {e}")
+
+    def _refresh_in_background(self, provider, disease_name, version, loader):
+        key = self._key(provider, disease_name, version)
+        with self._lock:
+            if key in self._refreshing:
+                return
+            self._refreshing.add(key)
+
+        def refresh():
+            try:
+                value = loader()
+                if value:
+                    self._store(provider, disease_name, version, value)
+                    print(f"🔄 Refreshed cached {provider} info for: {disease_name}")
+            except Exception as e:
+                print(f"⚠️ Background refresh failed for {provider}/{disease_name}: {e}")
+            finally:
+                with self._lock:
+                    self._refreshing.discard(key)
+
+        threading.Thread(target=refresh, name=f'refresh-{provider}', daemon=True).start()
+
+    def stats(self):
+        try:
+            with self._connect() as conn:
+                entries = conn.execute('SELECT COUNT(*) FROM provider_cache').fetchone()[0]
+        except sqlite3.Error:
+            entries = None
+        total = self.hits + self.stale_hits + self.misses
+        return {
+            'entries': entries,
+            'max_entries': self.max_entries,
+            'ttl_hours': round(self.ttl / 3600, 1),
+            'hits': self.hits,
+            'stale_hits': self.stale_hits,
+            'misses': self.misses,
+            'hit_ratio': round((self.hits + self.stale_hits) / total, 3) if total else 0.0
+        }
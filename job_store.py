@@ -0,0 +1,166 @@
+# SQLite job store for asynchronous uploads
+# =========================================
+#
+# /api/v1/jobs returns a job id immediately and runs detection + enrichment in
+# a background worker pool. Job state lives in SQLite so it survives gunicorn
+# worker recycling: jobs left queued (or running in a worker that died) are
+# picked up again by the next worker.
+
+import ipaddress
+import json
+import os
+import socket
+import sqlite3
+import time
+import uuid
+from contextlib import contextmanager
+from urllib.parse import urlparse
+
+QUEUED = 'queued'
+RUNNING = 'running'
+DONE = 'done'
+FAILED = 'failed'
+
+
+def check_callback_url(url, allowed_hosts=None, resolve=socket.getaddrinfo):
+    """Why a job callback may not be sent to url, or None if it may
+
+    With allowed_hosts, exactly those hosts are accepted. Otherwise the host must resolve only to public
+    addresses - loopback, private, link-local (cloud metadata) and reserved ranges are refused, so
+    callbacks cannot reach services inside the deployment.
+    """
+    parsed = urlparse(url)
+    if parsed.scheme not in ('http', 'https') or not parsed.hostname:
+        return 'callback_url must be an http(s) URL'
+    host = parsed.hostname.lower()
+    if allowed_hosts:
+        return None if host in allowed_hosts else f'callback host {host} is not allowed'
+    try:
+        addresses = {info[4][0] for info in resolve(host, parsed.port or (443 if parsed.scheme == 'https' else 80),
+                                                      proto=socket.IPPROTO_TCP)}
+    except (socket.gaierror, UnicodeError, ValueError):
+        return f'callback host {host} could not be resolved'
+    for address in addresses:
+        ip = ipaddress.ip_address(address.split('%')[0])
+        if getattr(ip, 'ipv4_mapped', None):
+            ip = ip.ipv4_mapped
+        if not ip.is_global:
+            return f'callback host {host} resolves to a non-public address'
+    return None
+
+
+class JobStore:
+    """Persistent state for background detection jobs"""
+
+    def __init__(self, db_path):
+        self.db_path = db_path
+        directory = os.path.dirname(db_path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        with self._connect() as conn:
+            conn.execute('PRAGMA journal_mode=WAL')
+            conn.execute("""
+                CREATE TABLE IF NOT EXISTS jobs (
+                    id TEXT PRIMARY KEY,
+                    status TEXT NOT NULL,
+                    filename TEXT,
+                    image_path TEXT,
+                    callback_url TEXT,
+                    result TEXT,
+                    error TEXT,
+                    worker_pid INTEGER,
+                    created_at REAL NOT NULL,
+                    updated_at REAL NOT NULL
+                )
+            """)
+            conn.execute('CREATE INDEX IF NOT EXISTS jobs_status ON jobs (status)')
+
+    @contextmanager
+    def _connect(self):
+        conn = sqlite3.connect(self.db_path, timeout=5)
+        conn.row_factory = sqlite3.Row
+        try:
+            with conn:
+                yield conn
+        finally:
+            conn.close()
+
+    def create(self, filename, image_path, callback_url=None, result=None, job_id=None):
+        """Create a job - already done when a result is given (e.g. a cache hit)"""
+        job_id = job_id or uuid.uuid4().hex
+        now = time.time()
+        status = DONE if result is not None else QUEUED
+        with self._connect() as conn:
+            conn.execute('INSERT INTO jobs (id, status, filename, image_path, callback_url, result, created_at, updated_at) '
+                         'VALUES (?, ?, ?, ?, ?, ?, ?, ?)',
+                         (job_id, status, filename, image_path, callback_url,
+                          json.dumps(result) if result is not None else None, now, now))
+        return job_id
+
+    def claim(self, job_id, pid=None):
+        """Atomically move a queued job to running - False if another worker got it first"""
+        with self._connect() as conn:
+            cursor = conn.execute('UPDATE jobs SET status = ?, worker_pid = ?, updated_at = ? WHERE id = ? AND status = ?',
+                                  (RUNNING, pid or os.getpid(), time.time(), job_id, QUEUED))
+            return cursor.rowcount == 1
+
+    def complete(self, job_id, result):
+        with self._connect() as conn:
+            conn.execute('UPDATE jobs SET status = ?, result = ?, updated_at = ? WHERE id = ?',
+                         (DONE, json.dumps(result), time.time(), job_id))
+
+    def fail(self, job_id, error):
+        with self._connect() as conn:
+            conn.execute('UPDATE jobs SET status = ?, error = ?, updated_at = ? WHERE id = ?',
+                         (FAILED, str(error), time.time(), job_id))
+
+    def get(self, job_id):
+        with self._connect() as conn:
+            row = conn.execute('SELECT * FROM jobs WHERE id = ?', (job_id,)).fetchone()
+        if row is None:
+            return None
+        job = dict(row)
+        job['result'] = json.loads(job['result']) if job['result'] else None
+        return job
+
+    def recover(self, is_alive):
+        """Requeue jobs whose worker died and return every queued job id (oldest first)"""
+        with self._connect() as conn:
+            for row in conn.execute('SELECT id, worker_pid FROM jobs WHERE status = ?', (RUNNING,)).fetchall():
+                if not is_alive(row['worker_pid']):
+                    conn.execute('UPDATE jobs SET status = ?, worker_pid = NULL, updated_at = ? WHERE id = ? AND status = ?',
+                                 (QUEUED, time.time(), row['id'], RUNNING))
+            rows = conn.execute('SELECT id FROM jobs WHERE status = ? ORDER BY created_at', (QUEUED,)).fetchall()
+        return [row['id'] for row in rows]
+
+    def purge(self, max_age_seconds, release=None):
+        """Delete finished jobs older than max_age_seconds - returns how many
+
+        release(image_path) is then called for each of their uploads no remaining job refers to.
+        """
+        cutoff = time.time() - max_age_seconds
+        with self._connect() as conn:
+            paths = {row[0] for row in conn.execute(
+                'SELECT image_path FROM jobs WHERE status IN (?, ?) AND updated_at < ? AND image_path IS NOT NULL',
+                (DONE, FAILED, cutoff))}
+            cursor = conn.execute('DELETE FROM jobs WHERE status IN (?, ?) AND updated_at < ?',
+                                  (DONE, FAILED, cutoff))
+            purged = cursor.rowcount
+            if paths:
+                paths -= {row[0] for row in conn.execute('SELECT DISTINCT image_path FROM jobs')}
+        if release is not None:
+            for path in paths:
+                release(path)
+        return purged
+
+    def active_image_paths(self):
+        """Uploads of queued and running jobs - these must outlive storage collection"""
+        with self._connect() as conn:
+            rows = conn.execute('SELECT DISTINCT image_path FROM jobs WHERE status IN (?, ?) AND image_path IS NOT NULL',
+                                (QUEUED, RUNNING)).fetchall()
+        return {row[0] for row in rows}
+
+    def counts(self):
+        with self._connect() as conn:
+            rows = conn.execute('SELECT status, COUNT(*) FROM jobs GROUP BY status').fetchall()
+        return {row[0]: row[1] for row in rows}
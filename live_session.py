@@ -0,0 +1,184 @@
+# Live camera scanning sessions
+# =============================
+#
+# The camera posts frames at its own pace; each session keeps only the newest
+# unprocessed frame (a single-slot mailbox). A per-session worker thread runs
+# detection on whatever frame is newest when it becomes free, so inference runs
+# at the rate the server sustains and stale frames are dropped instead of
+# queued. Each frame's top class is smoothed over a sliding window, and disease
+# info is looked up only when the stable (majority) class changes.
+
+import threading
+import time
+import uuid
+from collections import Counter, deque
+
+
+class SessionClosed(Exception):
+    """The live session has ended (closed by the client or idle for too long)"""
+
+
+def smooth_predictions(window):
+    """Majority class over the window of (class_name, confidence) - (None, 0, 0) when no class has a majority
+
+    A class_name of None stands for a frame without detections.
+    """
+    if not window:
+        return None, 0.0, 0
+    votes = Counter(class_name for class_name, _ in window)
+    class_name, count = votes.most_common(1)[0]
+    if count * 2 <= len(window):
+        return None, 0.0, 0
+    confidence = sum(score for name, score in window if name == class_name) / count
+    return class_name, confidence, count
+
+
+class LiveSession:
+    """One camera stream: latest-frame slot, background detection, smoothed class and its disease info
+
+    detect(frame_bytes) returns detection dicts; lookup_info(class_name) returns disease info.
+    """
+
+    def __init__(self, detect, lookup_info, window=5, idle_timeout=30):
+        self.id = uuid.uuid4().hex
+        self.detect = detect
+        self.lookup_info = lookup_info
+        self.idle_timeout = idle_timeout
+        self.received = 0
+        self.processed = 0
+        self.dropped = 0
+        self.errors = 0
+        self.version = 0
+        self.closed = False
+        self.last_seen = time.time()
+        self._frame = None
+        self._window = deque(maxlen=window)
+        self._stable = (None, 0.0, 0)
+        self._detections = []
+        self._frame_number = 0
+        self._latency_ms = None
+        self._total_latency_ms = 0.0
+        self._info = {}  # class_name -> disease info, looked up once per session
+        self._cond = threading.Condition()
+        threading.Thread(target=self._worker, name=f'live-{self.id[:8]}', daemon=True).start()
+
+    def submit(self, frame):
+        """Put a frame in the slot, replacing (dropping) one that hasn't been picked up yet"""
+        with self._cond:
+            if self.closed:
+                raise SessionClosed(self.id)
+            if self._frame is not None:
+                self.dropped += 1
+            self.received += 1
+            self._frame = (self.received, frame)
+            self.last_seen = time.time()
+            self._cond.notify_all()
+
+    def close(self):
+        with self._cond:
+            self.closed = True
+            self.version += 1
+            self._cond.notify_all()
+
+    def _next_frame(self):
+        with self._cond:
+            while self._frame is None and not self.closed:
+                idle = time.time() - self.last_seen
+                if idle >= self.idle_timeout:
+                    print(f"💤 Live session {self.id} idle for {idle:.0f}s - closing")
+                    self.closed = True
+                    self.version += 1
+                    self._cond.notify_all()
+                    break
+                self._cond.wait(self.idle_timeout - idle)
+            if self.closed:
+                return None
+            frame, self._frame = self._frame, None
+            return frame
+
+    def _worker(self):
+        while True:
+            frame = self._next_frame()
+            if frame is None:
+                return
+            frame_number, data = frame
+            started = time.perf_counter()
+            try:
+                detections = self.detect(data)
+            except Exception as e:
+                print(f"⚠️ Live frame {frame_number} failed: {e}")
+                with self._cond:
+                    self.errors += 1
+                    self.version += 1
+                    self._cond.notify_all()
+                continue
+            latency_ms = (time.perf_counter() - started) * 1000
+
+            top = max(detections, key=lambda detection: detection['confidence'], default=None)
+            with self._cond:
+                self._window.append((top['class_name'], top['confidence']) if top else (None, 0.0))
+                class_name, confidence, votes = smooth_predictions(self._window)
+                # No majority keeps the previous stable class (hysteresis against flicker)
+                lookup = None
+                if votes:
+                    if class_name != self._stable[0] and class_name is not None and class_name not in self._info:
+                        lookup = class_name
+                        self._info[class_name] = None  # Pending - shown once the lookup returns
+                    self._stable = (class_name, confidence, votes)
+                self._detections = detections
+                self._frame_number = frame_number
+                self._latency_ms = latency_ms
+                self._total_latency_ms += latency_ms
+                self.processed += 1
+                self.version += 1
+                self._cond.notify_all()
+
+            if lookup:
+                # Off the worker thread - enrichment can take seconds and detection keeps going
+                threading.Thread(target=self._lookup, args=(lookup,), daemon=True).start()
+
+    def _lookup(self, class_name):
+        try:
+            info = self.lookup_info(class_name)
+        except Exception as e:
+            print(f"⚠️ Live session disease info for {class_name} failed: {e}")
+            with self._cond:
+                del self._info[class_name]  # Retried when the class becomes stable again
+            return
+        with self._cond:
+            self._info[class_name] = info
+            self.version += 1
+            self._cond.notify_all()
+
+    def snapshot(self):
+        """Current state as sent to the client"""
+        with self._cond:
+            class_name, confidence, votes = self._stable
+            return {
+                'session_id': self.id,
+                'version': self.version,
+                'closed': self.closed,
+                'frame': self._frame_number,
+                'detections': [{'disease': detection['class_name'],
+                                'confidence': detection['confidence'],
+                                'bbox': detection['bbox']} for detection in self._detections],
+                'stable': {
+                    'disease': class_name,
+                    'confidence': round(confidence, 4),
+                    'votes': votes,
+                    'window': len(self._window)
+                },
+                'info': self._info.get(class_name),
+                'latency_ms': round(self._latency_ms, 1) if self._latency_ms is not None else None,
+                'avg_latency_ms': round(self._total_latency_ms / self.processed, 1) if self.processed else None,
+                'received': self.received,
+                'processed': self.processed,
+                'dropped': self.dropped,
+                'errors': self.errors
+            }
+
+    def wait(self, after_version, timeout):
+        """Block until the state moves past after_version (or timeout) and return a snapshot"""
+        with self._cond:
+            self._cond.wait_for(lambda: self.version > after_version, timeout)
+        return self.snapshot()
@@ -0,0 +1,137 @@
+# Prometheus metrics
+# ==================
+#
+# Request, inference and provider latency histograms, provider errors, cache
+# hits/misses, model load time and queue depths, served by /metrics in the
+# Prometheus text format. Cache hit ratios are derived at query time, e.g.
+#   rate(plant_disease_cache_requests_total{result="hit"}[5m])
+#     / rate(plant_disease_cache_requests_total[5m])
+#
+# prometheus_client is optional - without it setup() returns False and every
+# recording function is a no-op. With PROMETHEUS_MULTIPROC_DIR set, each
+# gunicorn worker writes its samples to that directory and /metrics merges all
+# of them, so counters also survive --max-requests worker recycling
+# (gunicorn.conf.py clears the directory on start and retires dead workers).
+
+import os
+import shutil
+import time
+
+try:
+    import prometheus_client
+    from prometheus_client import CONTENT_TYPE_LATEST, CollectorRegistry, Counter, Gauge, Histogram, multiprocess
+except ImportError:
+    prometheus_client = None
+
+PREFIX = 'plant_disease'
+REQUEST_BUCKETS = (0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, 30, 60)
+INFERENCE_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10)
+PROVIDER_BUCKETS = (0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, 30)
+
+_metrics = None
+
+
+def multiprocess_dir():
+    return os.getenv('PROMETHEUS_MULTIPROC_DIR') or os.getenv('prometheus_multiproc_dir')
+
+
+def setup():
+    """Create the metrics once per process - False when prometheus_client is not installed"""
+    global _metrics
+    if prometheus_client is None:
+        return False
+    if _metrics is None:
+        if multiprocess_dir():
+            os.makedirs(multiprocess_dir(), exist_ok=True)
+        _metrics = {
+            'requests': Histogram(f'{PREFIX}_request_duration_seconds', 'HTTP request latency by route',
+                                  ['route', 'method', 'status'], buckets=REQUEST_BUCKETS),
+            'inference': Histogram(f'{PREFIX}_inference_duration_seconds', 'Model forward pass latency by batch size',
+                                   ['batch_size'], buckets=INFERENCE_BUCKETS),
+            'provider_calls': Counter(f'{PREFIX}_provider_calls_total', 'Knowledge provider calls', ['provider']),
+            'provider_errors': Counter(f'{PREFIX}_provider_errors_total', 'Failed knowledge provider calls',
+                                       ['provider', 'error']),
+            'provider_latency': Histogram(f'{PREFIX}_provider_duration_seconds', 'Knowledge provider call latency',
+                                          ['provider'], buckets=PROVIDER_BUCKETS),
+            'cache': Counter(f'{PREFIX}_cache_requests_total', 'Cache lookups by cache and result',
+                             ['cache', 'result']),
+            'model_load': Gauge(f'{PREFIX}_model_load_seconds', 'Time taken by the most recent model load',
+                                ['backend', 'precision'], multiprocess_mode='mostrecent'),
+            'queue_depth': Gauge(f'{PREFIX}_queue_depth', 'Items waiting, summed over live workers', ['queue'],
+                                 multiprocess_mode='livesum'),
+            'jobs_queued': Gauge(f'{PREFIX}_jobs_queued', 'Background jobs waiting to run',
+                                 multiprocess_mode='mostrecent')
+        }
+    return True
+
+
+def observe_request(route, method, status, seconds):
+    if _metrics is not None:
+        _metrics['requests'].labels(route, method, str(status)).observe(seconds)
+
+
+def observe_inference(batch_size, seconds):
+    if _metrics is not None:
+        _metrics['inference'].labels(str(batch_size)).observe(seconds)
+
+
+def count_cache(cache, hit):
+    if _metrics is not None:
+        _metrics['cache'].labels(cache, 'hit' if hit else 'miss').inc()
+
+
+def set_model_load(seconds, backend, precision):
+    if _metrics is not None:
+        _metrics['model_load'].labels(backend, precision).set(seconds)
+
+
+def set_queue_depth(queue, depth):
+    if _metrics is not None:
+        _metrics['queue_depth'].labels(queue).set(depth)
+
+
+def set_jobs_queued(count):
+    if _metrics is not None:
+        _metrics['jobs_queued'].set(count)
+
+
+def observe_provider(provider, fn):
+    """fn, counted and timed as a call to provider - exceptions are counted by type and re-raised"""
+    if _metrics is None:
+        return fn
+
+    def call(*args, **kwargs):
+        _metrics['provider_calls'].labels(provider).inc()
+        started = time.perf_counter()
+        try:
+            return fn(*args, **kwargs)
+        except Exception as e:
+            _metrics['provider_errors'].labels(provider, type(e).__name__).inc()
+            raise
+        finally:
+            _metrics['provider_latency'].labels(provider).observe(time.perf_counter() - started)
+    return call
+
+
+def render():
+    """(body, content type) of every metric - merged across worker processes in multiprocess mode"""
+    if multiprocess_dir():
+        registry = CollectorRegistry()
+        multiprocess.MultiProcessCollector(registry)
+    else:
+        registry = prometheus_client.REGISTRY
+    return prometheus_client.generate_latest(registry), CONTENT_TYPE_LATEST
+
+
+def clear_multiprocess_dir():
+    """Remove samples left by a previous server run (gunicorn master, before workers start)"""
+    directory = multiprocess_dir()
+    if directory:
+        shutil.rmtree(directory, ignore_errors=True)
+        os.makedirs(directory, exist_ok=True)
+
+
+def mark_process_dead(pid):
+    """Drop a retired worker's live gauges (counters and histograms are kept)"""
+    if prometheus_client is not None and multiprocess_dir():
+        multiprocess.mark_process_dead(pid)
@@ -0,0 +1,259 @@
+# ONNX Runtime / OpenVINO inference backend for the YOLO model
+# ============================================================
+#
+# model/best.pt is exported to ONNX once (cached as model/best.onnx next to the
+# weights, with class names in model/best.onnx.json) and run through
+# onnxruntime or OpenVINO on CPU. YOLOv8 pre/post-processing - letterbox,
+# confidence filtering, class-aware NMS and box rescaling - is reimplemented in
+# NumPy to match ultralytics' defaults.
+#
+# OnnxYOLO returns result objects exposing the part of the ultralytics Results
+# API the app uses (names, boxes[i].cls / .conf / .xyxy, plot()), so
+# process_image() builds exactly the same detection dicts for every backend.
+
+import json
+import os
+import shutil
+
+import cv2
+import numpy as np
+
+PAD_VALUE = 114  # Letterbox padding colour used by ultralytics
+MAX_WH = 7680  # Per-class box offset for class-aware NMS
+MAX_NMS = 30000  # Max candidate boxes fed into NMS
+MAX_DET = 300  # Max detections per image
+
+
+def onnx_paths(weights_path):
+    """Where the exported model and its metadata live"""
+    onnx_path = os.path.splitext(weights_path)[0] + '.onnx'
+    return onnx_path, onnx_path + '.json'
+
+
+def export_onnx(weights_path, imgsz=640):
+    """Export the PyTorch weights to ONNX once and reuse the cached artifact afterwards"""
+    onnx_path, meta_path = onnx_paths(weights_path)
+    if os.path.exists(onnx_path) and os.path.exists(meta_path):
+        with open(meta_path, 'r') as f:
+            meta = json.load(f)
+        if meta.get('imgsz') == imgsz and os.path.getmtime(onnx_path) >= os.path.getmtime(weights_path):
+            return onnx_path
+
+    from ultralytics import YOLO
+    print(f"🔄 Exporting {weights_path} to ONNX (imgsz={imgsz})...")
+    model = YOLO(weights_path)
+    exported = model.export(format='onnx', imgsz=imgsz, dynamic=True, simplify=False)
+    if os.path.abspath(str(exported)) != os.path.abspath(onnx_path):
+        shutil.move(str(exported), onnx_path)
+
+    with open(meta_path, 'w') as f:
+        json.dump({'names': {str(k): v for k, v in model.names.items()}, 'imgsz': imgsz}, f)
+    print(f"✅ Exported ONNX model: {onnx_path}")
+    return onnx_path
+
+
+def load_metadata(meta_path):
+    with open(meta_path, 'r') as f:
+        meta = json.load(f)
+    meta['names'] = {int(k): v for k, v in meta['names'].items()}
+    return meta
+
+
+def letterbox(image, imgsz=640):
+    """Resize keeping aspect ratio and pad to imgsz x imgsz (ultralytics LetterBox, auto=False)"""
+    h, w = image.shape[:2]
+    ratio = min(imgsz / h, imgsz / w)
+    new_w, new_h = int(round(w * ratio)), int(round(h * ratio))
+    dw, dh = (imgsz - new_w) / 2, (imgsz - new_h) / 2
+
+    if (w, h) != (new_w, new_h):
+        image = cv2.resize(image, (new_w, new_h), interpolation=cv2.INTER_LINEAR)
+    top, bottom = int(round(dh - 0.1)), int(round(dh + 0.1))
+    left, right = int(round(dw - 0.1)), int(round(dw + 0.1))
+    return cv2.copyMakeBorder(image, top, bottom, left, right, cv2.BORDER_CONSTANT, value=(PAD_VALUE,) * 3)
+
+
+def preprocess(images, imgsz=640):
+    """BGR HWC uint8 images -> RGB NCHW float32 batch in [0, 1]"""
+    batch = np.stack([letterbox(image, imgsz) for image in images])
+    batch = batch[..., ::-1].transpose(0, 3, 1, 2)
+    return np.ascontiguousarray(batch, dtype=np.float32) / 255.0
+
+
+def nms(boxes, scores, iou_threshold):
+    """Greedy non-maximum suppression - returns indices of kept boxes, best first"""
+    x1, y1, x2, y2 = boxes[:, 0], boxes[:, 1], boxes[:, 2], boxes[:, 3]
+    areas = (x2 - x1) * (y2 - y1)
+    order = scores.argsort()[::-1]
+    keep = []
+    while order.size > 0:
+        i = order[0]
+        keep.append(i)
+        rest = order[1:]
+        w = np.clip(np.minimum(x2[i], x2[rest]) - np.maximum(x1[i], x1[rest]), 0, None)
+        h = np.clip(np.minimum(y2[i], y2[rest]) - np.maximum(y1[i], y1[rest]), 0, None)
+        inter = w * h
+        iou = inter / (areas[i] + areas[rest] - inter + 1e-9)
+        order = rest[iou <= iou_threshold]
+    return np.array(keep, dtype=np.int64)
+
+
+def postprocess(prediction, conf=0.25, iou=0.7):
+    """Raw YOLOv8 output (4 + num_classes, N) -> (K, 6) array of x1, y1, x2, y2, score, class"""
+    prediction = prediction.T
+    scores = prediction[:, 4:]
+    class_ids = scores.argmax(axis=1)
+    confidences = scores[np.arange(len(scores)), class_ids]
+
+    mask = confidences > conf
+    boxes, confidences, class_ids = prediction[mask, :4], confidences[mask], class_ids[mask]
+    if len(boxes) == 0:
+        return np.zeros((0, 6), dtype=np.float32)
+
+    if len(boxes) > MAX_NMS:
+        top = confidences.argsort()[::-1][:MAX_NMS]
+        boxes, confidences, class_ids = boxes[top], confidences[top], class_ids[top]
+
+    # Center x, y, width, height -> corners
+    xyxy = np.empty_like(boxes)
+    xyxy[:, 0] = boxes[:, 0] - boxes[:, 2] / 2
+    xyxy[:, 1] = boxes[:, 1] - boxes[:, 3] / 2
+    xyxy[:, 2] = boxes[:, 0] + boxes[:, 2] / 2
+    xyxy[:, 3] = boxes[:, 1] + boxes[:, 3] / 2
+
+    # Offset boxes by class so NMS never suppresses across classes
+    keep = nms(xyxy + class_ids[:, None] * MAX_WH, confidences, iou)[:MAX_DET]
+    return np.concatenate([xyxy[keep], confidences[keep, None], class_ids[keep, None]], axis=1).astype(np.float32)
+
+
+def scale_boxes(boxes, image_shape, imgsz=640):
+    """Map letterboxed xyxy boxes back onto the original image"""
+    h, w = image_shape[:2]
+    gain = min(imgsz / h, imgsz / w)
+    pad_x = round((imgsz - w * gain) / 2 - 0.1)
+    pad_y = round((imgsz - h * gain) / 2 - 0.1)
+    boxes = boxes.copy()
+    boxes[:, [0, 2]] = (boxes[:, [0, 2]] - pad_x) / gain
+    boxes[:, [1, 3]] = (boxes[:, [1, 3]] - pad_y) / gain
+    boxes[:, [0, 2]] = boxes[:, [0, 2]].clip(0, w)
+    boxes[:, [1, 3]] = boxes[:, [1, 3]].clip(0, h)
+    return boxes
+
+
+class DetectionBox:
+    """One detection, shaped like an ultralytics Boxes row"""
+
+    def __init__(self, row):
+        self.xyxy = row[None, :4]
+        self.conf = row[4:5]
+        self.cls = row[5:6]
+
+
+class DetectionResult:
+    """Detections for one image, exposing the ultralytics Results API used by the app"""
+
+    def __init__(self, orig_img, detections, names):
+        self.orig_img = orig_img
+        self.names = names
+        self.data = detections
+        self.boxes = [DetectionBox(row) for row in detections]
+
+    def plot(self):
+        """Draw boxes and labels on a copy of the original image"""
+        image = self.orig_img.copy()
+        thickness = max(round(sum(image.shape[:2]) / 2 * 0.003), 2)
+        for x1, y1, x2, y2, score, class_id in self.data:
+            color = box_color(int(class_id))
+            label = f"{self.names.get(int(class_id), int(class_id))} {score:.2f}"
+            top_left, bottom_right = (int(x1), int(y1)), (int(x2), int(y2))
+            cv2.rectangle(image, top_left, bottom_right, color, thickness, lineType=cv2.LINE_AA)
+            font_scale = thickness / 3
+            (text_w, text_h), _ = cv2.getTextSize(label, 0, font_scale, max(thickness - 1, 1))
+            above = top_left[1] - text_h - 3 >= 0
+            text_corner = (top_left[0] + text_w, top_left[1] - text_h - 3 if above else top_left[1] + text_h + 3)
+            cv2.rectangle(image, top_left, text_corner, color, -1, cv2.LINE_AA)
+            cv2.putText(image, label, (top_left[0], top_left[1] - 2 if above else top_left[1] + text_h + 2),
+                        0, font_scale, (255, 255, 255), max(thickness - 1, 1), lineType=cv2.LINE_AA)
+        return image
+
+
+def box_color(class_id):
+    palette = [(56, 56, 255), (151, 157, 255), (31, 112, 255), (29, 178, 255), (49, 210, 207),
+               (10, 249, 72), (23, 204, 146), (134, 219, 61), (52, 147, 26), (187, 212, 0),
+               (168, 153, 44), (255, 194, 0), (147, 69, 52), (255, 115, 100), (236, 24, 0),
+               (255, 56, 132), (133, 0, 82), (255, 56, 203), (200, 149, 255), (199, 55, 255)]
+    return palette[class_id % len(palette)]
+
+
+class OnnxRuntimeSession:
+    def __init__(self, onnx_path, threads=None):
+        import onnxruntime as ort
+        options = ort.SessionOptions()
+        if threads:
+            options.intra_op_num_threads = threads
+        options.graph_optimization_level = ort.GraphOptimizationLevel.ORT_ENABLE_ALL
+        self.session = ort.InferenceSession(onnx_path, sess_options=options, providers=['CPUExecutionProvider'])
+        self.input_name = self.session.get_inputs()[0].name
+
+    def run(self, batch):
+        return self.session.run(None, {self.input_name: batch})[0]
+
+
+class OpenVinoSession:
+    def __init__(self, onnx_path, threads=None):
+        from openvino.runtime import Core
+        core = Core()
+        config = {'INFERENCE_NUM_THREADS': str(threads)} if threads else {}
+        self.compiled = core.compile_model(core.read_model(onnx_path), 'CPU', config)
+        self.output = self.compiled.output(0)
+
+    def run(self, batch):
+        return self.compiled([batch])[self.output]
+
+
+RUNTIMES = {
+    'onnxruntime': OnnxRuntimeSession,
+    'openvino': OpenVinoSession
+}
+
+
+class OnnxYOLO:
+    """Callable drop-in for ultralytics.YOLO backed by onnxruntime or OpenVINO"""
+
+    def __init__(self, onnx_path, names, runtime='onnxruntime', imgsz=640, threads=None):
+        if runtime not in RUNTIMES:
+            raise ValueError(f"Unknown ONNX runtime '{runtime}' - use one of {list(RUNTIMES)}")
+        self.onnx_path = onnx_path
+        self.names = names
+        self.runtime = runtime
+        self.imgsz = imgsz
+        self.threads = threads
+        self.session = RUNTIMES[runtime](onnx_path, threads)
+        self.pid = os.getpid()
+
+    def __call__(self, source, conf=0.25, iou=0.7, **kwargs):
+        if self.pid != os.getpid():
+            # Runtime thread pools don't survive fork (e.g. a model warmed up in the gunicorn
+            # master) - rebuild the session in this process, the weights are in the page cache
+            self.session = RUNTIMES[self.runtime](self.onnx_path, self.threads)
+            self.pid = os.getpid()
+        sources = source if isinstance(source, (list, tuple)) else [source]
+        images = [cv2.imread(item) if isinstance(item, str) else item for item in sources]
+        for item, image in zip(sources, images):
+            if image is None:
+                raise FileNotFoundError(f"Could not read image: {item}")
+
+        outputs = self.session.run(preprocess(images, self.imgsz))
+        results = []
+        for image, prediction in zip(images, outputs):
+            detections = postprocess(prediction, conf=conf, iou=iou)
+            detections[:, :4] = scale_boxes(detections[:, :4], image.shape, self.imgsz)
+            results.append(DetectionResult(image, detections, self.names))
+        return results
+
+
+def load_onnx_model(weights_path, runtime='onnxruntime', imgsz=640, threads=None):
+    """Export (if needed) and load the ONNX model for weights_path"""
+    onnx_path = export_onnx(weights_path, imgsz)
+    meta = load_metadata(onnx_paths(weights_path)[1])
+    return OnnxYOLO(onnx_path, meta['names'], runtime=runtime, imgsz=imgsz, threads=threads)
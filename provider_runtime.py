@@ -0,0 +1,273 @@
+# Runtime helpers for external knowledge providers
+# ================================================
+#
+# first_good_result() launches providers concurrently (optionally staggered so
+# cheap cached answers don't burn API quota on the lower-ranked providers),
+# keeps their priority order, returns as soon as the best available provider
+# has answered and signals the losers to stop.
+#
+# CircuitBreaker wraps each provider: after repeated failures it opens and
+# calls are skipped instantly (the caller falls back to the local database),
+# after reset_timeout one half-open probe decides whether to close it again.
+# HTTP timeouts are derived from recent latency percentiles. SDK clients that
+# take no timeout run through call_with_timeout() so a hung call still counts as
+# a failure.
+
+import threading
+import time
+from collections import deque
+from concurrent.futures import FIRST_COMPLETED, TimeoutError as FutureTimeoutError, wait
+
+_state = threading.local()
+
+
+class ProviderUnavailable(Exception):
+    """Raised by a provider when the service itself is failing (timeout, rate limit, 5xx)"""
+
+
+def cancellable_sleep(seconds):
+    """Sleep between provider retries; returns True if the orchestrator cancelled this call"""
+    event = getattr(_state, 'cancel_event', None)
+    if event is None:
+        time.sleep(seconds)
+        return False
+    return event.wait(seconds)
+
+
+def is_cancelled():
+    """True when the current provider call lost the race and should stop early"""
+    event = getattr(_state, 'cancel_event', None)
+    return event is not None and event.is_set()
+
+
+def provider_timeout(default):
+    """HTTP timeout for the provider call running on this thread"""
+    breaker = getattr(_state, 'breaker', None)
+    return breaker.timeout(default) if breaker is not None else default
+
+
+def observe_latency(seconds):
+    """Record the latency of one successful provider HTTP request"""
+    breaker = getattr(_state, 'breaker', None)
+    if breaker is not None:
+        breaker.record_latency(seconds)
+
+
+def call_with_timeout(executor, default_timeout, fn, *args, **kwargs):
+    """Run a blocking SDK call on executor, waiting at most the adaptive timeout - ProviderUnavailable if it runs over
+
+    The call itself can't be interrupted and holds its executor thread until it returns, so give
+    SDK clients their own small executor rather than the pool the providers themselves run on.
+    """
+    timeout = provider_timeout(default_timeout)
+    start = time.monotonic()
+    future = executor.submit(fn, *args, **kwargs)
+    try:
+        result = future.result(timeout=timeout)
+    except FutureTimeoutError as e:
+        future.cancel()  # Still queued behind hung calls - don't run it at all
+        raise ProviderUnavailable(f"no answer within {timeout:.1f}s") from e
+    observe_latency(time.monotonic() - start)
+    return result
+
+
+def _run_cancellable(fn, cancel_event):
+    _state.cancel_event = cancel_event
+    try:
+        return fn()
+    finally:
+        _state.cancel_event = None
+
+
+def _good_result(future):
+    try:
+        return future.result()
+    except Exception as e:
+        print(f"⚠️ Provider failed: {e}")
+        return None
+
+
+def first_good_result(providers, timeout, executor, stagger=0.0):
+    """Run (name, fn) providers concurrently and return (name, result) from the highest-ranked success
+
+    providers must be sorted best-first. Provider i is launched i * stagger seconds
+    after the first one unless a result is settled earlier. A lower-ranked answer is
+    only used once every higher-ranked provider has failed - or when the overall
+    timeout expires, in which case the best answer received so far wins.
+    Returns (None, None) if no provider produced a result in time.
+    """
+    if not providers:
+        return None, None
+
+    cancel_event = threading.Event()
+    start = time.monotonic()
+    deadline = start + timeout
+    futures = []
+    outcomes = {}
+
+    def outcome(index):
+        if index not in outcomes:
+            outcomes[index] = _good_result(futures[index])
+        return outcomes[index]
+
+    def launch():
+        fn = providers[len(futures)][1]
+        futures.append(executor.submit(_run_cancellable, fn, cancel_event))
+
+    def finish(index):
+        cancel_event.set()
+        for future in futures:
+            future.cancel()
+        if index is None:
+            return None, None
+        return providers[index][0], outcomes[index]
+
+    launch()
+    while True:
+        now = time.monotonic()
+
+        # Walk providers in priority order until one is still running
+        waiting_on_higher = False
+        for index, future in enumerate(futures):
+            if not future.done():
+                waiting_on_higher = True
+                break
+            if outcome(index):
+                return finish(index)
+
+        if not waiting_on_higher:
+            if len(futures) == len(providers):
+                return finish(None)
+            # Everything launched so far failed - start the next provider right away
+            launch()
+            continue
+
+        # Launch staggered providers that are due
+        while len(futures) < len(providers) and now >= start + len(futures) * stagger:
+            launch()
+
+        if now >= deadline:
+            for index, future in enumerate(futures):
+                if future.done() and outcome(index):
+                    return finish(index)
+            print(f"⏰ Provider deadline of {timeout}s reached")
+            return finish(None)
+
+        wake_at = deadline
+        if len(futures) < len(providers):
+            wake_at = min(wake_at, start + len(futures) * stagger)
+        running = [future for future in futures if not future.done()]
+        wait(running, timeout=max(0.0, wake_at - now), return_when=FIRST_COMPLETED)
+
+
+class CircuitBreaker:
+    """Closed / open / half-open breaker with latency-derived timeouts for one provider"""
+
+    CLOSED = 'closed'
+    OPEN = 'open'
+    HALF_OPEN = 'half_open'
+
+    def __init__(self, name, failure_threshold=3, reset_timeout=30, min_timeout=1.0, max_timeout=10.0,
+                 percentile=95, multiplier=2.0, window=50, min_samples=5):
+        self.name = name
+        self.failure_threshold = failure_threshold
+        self.reset_timeout = reset_timeout
+        self.min_timeout = min_timeout
+        self.max_timeout = max_timeout
+        self.percentile = percentile
+        self.multiplier = multiplier
+        self.min_samples = min_samples
+        self.state = self.CLOSED
+        self.consecutive_failures = 0
+        self.opened_at = None
+        self.calls = 0
+        self.failures = 0
+        self.short_circuited = 0
+        self._latencies = deque(maxlen=window)
+        self._latencies_recorded = 0
+        self._probe_in_flight = False
+        self._lock = threading.Lock()
+
+    def allow(self):
+        """Whether a call may go through right now"""
+        with self._lock:
+            if self.state == self.CLOSED:
+                return True
+            if self.state == self.OPEN and time.monotonic() - self.opened_at >= self.reset_timeout:
+                self.state = self.HALF_OPEN
+                self._probe_in_flight = False
+            if self.state == self.HALF_OPEN and not self._probe_in_flight:
+                # Exactly one probe is let through to test the service
+                self._probe_in_flight = True
+                return True
+            self.short_circuited += 1
+            return False
+
+    def record_latency(self, seconds):
+        with self._lock:
+            self._latencies.append(seconds)
+            self._latencies_recorded += 1
+
+    def record_success(self):
+        with self._lock:
+            if self.state != self.CLOSED:
+                print(f"✅ {self.name} circuit closed - service recovered")
+            self.state = self.CLOSED
+            self.consecutive_failures = 0
+            self._probe_in_flight = False
+
+    def record_failure(self):
+        with self._lock:
+            self.failures += 1
+            self.consecutive_failures += 1
+            if self.state == self.HALF_OPEN or self.consecutive_failures >= self.failure_threshold:
+                if self.state != self.OPEN:
+                    print(f"🔌 {self.name} circuit opened after {self.consecutive_failures} failure(s)")
+                self.state = self.OPEN
+                self.opened_at = time.monotonic()
+            self._probe_in_flight = False
+
+    def timeout(self, default):
+        """Timeout from the recent latency percentile, or default until enough samples exist"""
+        with self._lock:
+            samples = sorted(self._latencies)
+        if len(samples) < self.min_samples:
+            return default
+        index = min(len(samples) - 1, int(len(samples) * self.percentile / 100))
+        return min(self.max_timeout, max(self.min_timeout, samples[index] * self.multiplier))
+
+    def call(self, fn, *args, **kwargs):
+        """Run a provider through the breaker - returns None when skipped or failed"""
+        if not self.allow():
+            return None
+
+        self.calls += 1
+        observed = self._latencies_recorded
+        previous = getattr(_state, 'breaker', None)
+        _state.breaker = self
+        start = time.monotonic()
+        try:
+            result = fn(*args, **kwargs)
+        except Exception as e:
+            print(f"⚠️ {self.name} unavailable: {e}")
+            self.record_failure()
+            return None
+        finally:
+            _state.breaker = previous
+
+        # Providers without instrumented HTTP calls (e.g. SDK clients) are timed as a whole
+        if self._latencies_recorded == observed:
+            self.record_latency(time.monotonic() - start)
+        self.record_success()
+        return result
+
+    def stats(self):
+        return {
+            'state': self.state,
+            'consecutive_failures': self.consecutive_failures,
+            'calls': self.calls,
+            'failures': self.failures,
+            'short_circuited': self.short_circuited,
+            'timeout_seconds': round(self.timeout(self.max_timeout), 2),
+            'latency_samples': len(self._latencies)
+        }
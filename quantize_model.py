@@ -0,0 +1,303 @@
+#!/usr/bin/env python3
+"""
+INT8 post-training quantization of the detection model, with an accuracy guardrail
+
+Exports model/best.pt to ONNX (see onnx_backend.py), calibrates static INT8
+quantization on a folder of images and compares the INT8 model against FP32 on
+an evaluation set the calibration never saw (--eval, or a held-out share of the
+calibration images), at the confidence threshold the app serves with. FP32
+detections are used as ground truth:
+
+  - mAP@0.5 of the INT8 detections
+  - top-class agreement: images whose highest-confidence class is unchanged
+  - per-class agreement: FP32 boxes the INT8 model reproduces (same class, IoU >= 0.5)
+
+The report is written next to the quantized model (model/best.int8.onnx.json).
+get_yolo_model() only serves the INT8 model (INFERENCE_PRECISION=int8) when the
+report belongs to the current weights and clears the configured thresholds.
+
+Usage: python quantize_model.py --calibration 'test/*.JPG' --min-map 0.9 --min-agreement 0.95
+"""
+import argparse
+import glob
+import hashlib
+import json
+import os
+import sys
+import time
+
+import cv2
+import numpy as np
+
+import onnx_backend
+
+IOU_MATCH = 0.5
+DEFAULT_MIN_MAP = 0.9
+DEFAULT_MIN_AGREEMENT = 0.95
+DEFAULT_HOLDOUT = 0.2
+SERVING_CONFIDENCE = 0.1  # app.CONFIDENCE_THRESHOLD - the INT8 model is judged on what it will serve
+
+
+def quantized_paths(weights_path):
+    """Where the INT8 model and its report live"""
+    int8_path = os.path.splitext(weights_path)[0] + '.int8.onnx'
+    return int8_path, int8_path + '.json'
+
+
+def split_holdout(paths, fraction):
+    """(calibration, evaluation) - a stable share of the images, picked by file name hash, is held out"""
+    calibration, evaluation = [], []
+    for path in paths:
+        bucket = int(hashlib.sha256(os.path.basename(path).encode()).hexdigest()[:8], 16) / 0xffffffff
+        (evaluation if bucket < fraction else calibration).append(path)
+    return calibration, evaluation
+
+
+def weights_hash(weights_path):
+    with open(weights_path, 'rb') as f:
+        return hashlib.sha256(f.read()).hexdigest()[:16]
+
+
+class CalibrationImages:
+    """onnxruntime CalibrationDataReader feeding letterboxed images one at a time"""
+
+    def __init__(self, image_paths, input_name, imgsz=640):
+        self.image_paths = image_paths
+        self.input_name = input_name
+        self.imgsz = imgsz
+        self._next = 0
+
+    def get_next(self):
+        while self._next < len(self.image_paths):
+            image = cv2.imread(self.image_paths[self._next])
+            self._next += 1
+            if image is not None:
+                return {self.input_name: onnx_backend.preprocess([image], self.imgsz)}
+        return None
+
+    def rewind(self):
+        self._next = 0
+
+
+def box_iou(box, boxes):
+    """IoU of one xyxy box against an (N, 4) array"""
+    w = np.clip(np.minimum(box[2], boxes[:, 2]) - np.maximum(box[0], boxes[:, 0]), 0, None)
+    h = np.clip(np.minimum(box[3], boxes[:, 3]) - np.maximum(box[1], boxes[:, 1]), 0, None)
+    inter = w * h
+    areas = (boxes[:, 2] - boxes[:, 0]) * (boxes[:, 3] - boxes[:, 1])
+    return inter / ((box[2] - box[0]) * (box[3] - box[1]) + areas - inter + 1e-9)
+
+
+def match_detections(reference, candidate, iou_threshold=IOU_MATCH):
+    """Greedily match candidate rows to same-class reference rows, best score first
+
+    Both are (N, 6) arrays of x1, y1, x2, y2, score, class. Returns a boolean array
+    telling which candidate rows are true positives.
+    """
+    matched = np.zeros(len(reference), dtype=bool)
+    hits = np.zeros(len(candidate), dtype=bool)
+    for i in candidate[:, 4].argsort()[::-1]:
+        same_class = (reference[:, 5] == candidate[i, 5]) & ~matched
+        if not same_class.any():
+            continue
+        indices = np.flatnonzero(same_class)
+        ious = box_iou(candidate[i, :4], reference[indices, :4])
+        best = ious.argmax()
+        if ious[best] >= iou_threshold:
+            matched[indices[best]] = True
+            hits[i] = True
+    return hits
+
+
+def average_precision(scores, hits, num_reference):
+    """All-point interpolated AP from per-detection scores and true-positive flags"""
+    if num_reference == 0:
+        return None
+    if len(scores) == 0:
+        return 0.0
+    order = np.argsort(scores)[::-1]
+    true_positives = np.cumsum(hits[order])
+    recall = true_positives / num_reference
+    precision = true_positives / np.arange(1, len(order) + 1)
+
+    recall = np.concatenate([[0.0], recall, [1.0]])
+    precision = np.concatenate([[1.0], precision, [0.0]])
+    precision = np.maximum.accumulate(precision[::-1])[::-1]
+    steps = np.flatnonzero(recall[1:] != recall[:-1])
+    return float(np.sum((recall[steps + 1] - recall[steps]) * precision[steps + 1]))
+
+
+def top_class(detections):
+    return int(detections[detections[:, 4].argmax(), 5]) if len(detections) else None
+
+
+def compare_detections(reference_sets, candidate_sets, names):
+    """Accuracy of candidate (INT8) detections against reference (FP32) detections, image by image"""
+    per_class = {}
+    agreeing_images = 0
+    for reference, candidate in zip(reference_sets, candidate_sets):
+        agreeing_images += top_class(reference) == top_class(candidate)
+        hits = match_detections(reference, candidate)
+        for class_id in np.union1d(reference[:, 5], candidate[:, 5]).astype(int):
+            stats = per_class.setdefault(class_id, {'reference': 0, 'scores': [], 'hits': []})
+            stats['reference'] += int((reference[:, 5] == class_id).sum())
+            mask = candidate[:, 5] == class_id
+            stats['scores'].extend(candidate[mask, 4].tolist())
+            stats['hits'].extend(hits[mask].tolist())
+
+    classes = {}
+    aps = []
+    for class_id, stats in sorted(per_class.items()):
+        hits = np.array(stats['hits'], dtype=bool)
+        ap = average_precision(np.array(stats['scores']), hits, stats['reference'])
+        if ap is not None:
+            aps.append(ap)
+        classes[names.get(class_id, str(class_id))] = {
+            'fp32_detections': stats['reference'],
+            'int8_detections': len(hits),
+            'matched': int(hits.sum()),
+            'agreement': round(int(hits.sum()) / stats['reference'], 4) if stats['reference'] else None,
+            'ap50': round(ap, 4) if ap is not None else None
+        }
+
+    images = len(reference_sets)
+    return {
+        'images': images,
+        'map50': round(float(np.mean(aps)), 4) if aps else 1.0,
+        'top_class_agreement': round(agreeing_images / images, 4) if images else 1.0,
+        'per_class': classes
+    }
+
+
+def check_report(report, weights_path, min_map=DEFAULT_MIN_MAP, min_agreement=DEFAULT_MIN_AGREEMENT):
+    """Reasons the INT8 model must not be activated - empty when it is safe to use"""
+    problems = []
+    if report.get('weights_hash') != weights_hash(weights_path):
+        problems.append('report was produced for different weights - rerun quantize_model.py')
+    metrics = report.get('metrics', {})
+    if metrics.get('map50', 0) < min_map:
+        problems.append(f"mAP@0.5 {metrics.get('map50')} below {min_map}")
+    if metrics.get('top_class_agreement', 0) < min_agreement:
+        problems.append(f"top-class agreement {metrics.get('top_class_agreement')} below {min_agreement}")
+    return problems
+
+
+def load_quantized_model(weights_path, runtime='onnxruntime', threads=None,
+                         min_map=DEFAULT_MIN_MAP, min_agreement=DEFAULT_MIN_AGREEMENT):
+    """Load the INT8 model if its accuracy report allows it, otherwise raise ValueError"""
+    int8_path, report_path = quantized_paths(weights_path)
+    if not os.path.exists(int8_path) or not os.path.exists(report_path):
+        raise ValueError(f"No quantized model at {int8_path} - run quantize_model.py first")
+    meta = onnx_backend.load_metadata(report_path)
+    problems = check_report(meta, weights_path, min_map, min_agreement)
+    if problems:
+        raise ValueError('INT8 model refused: ' + '; '.join(problems))
+    return onnx_backend.OnnxYOLO(int8_path, meta['names'], runtime=runtime, imgsz=meta['imgsz'], threads=threads)
+
+
+def detect_all(model, image_paths, conf):
+    detections = []
+    start = time.perf_counter()
+    for path in image_paths:
+        detections.append(model(path, conf=conf)[0].data)
+    return detections, (time.perf_counter() - start) / max(len(image_paths), 1) * 1000
+
+
+def quantize(weights_path, calibration_paths, eval_paths, imgsz=640, conf=SERVING_CONFIDENCE, per_channel=True):
+    """Produce the INT8 model and its accuracy report (not yet checked against thresholds)"""
+    from onnxruntime.quantization import CalibrationMethod, QuantFormat, QuantType, quantize_static
+
+    fp32_path = onnx_backend.export_onnx(weights_path, imgsz)
+    names = onnx_backend.load_metadata(onnx_backend.onnx_paths(weights_path)[1])['names']
+    fp32_model = onnx_backend.OnnxYOLO(fp32_path, names, imgsz=imgsz)
+
+    int8_path, report_path = quantized_paths(weights_path)
+    print(f"🔄 Calibrating INT8 quantization on {len(calibration_paths)} image(s)...")
+    quantize_static(fp32_path, int8_path,
+                    CalibrationImages(calibration_paths, fp32_model.session.input_name, imgsz),
+                    quant_format=QuantFormat.QDQ,
+                    per_channel=per_channel,
+                    activation_type=QuantType.QUInt8,
+                    weight_type=QuantType.QInt8,
+                    calibrate_method=CalibrationMethod.MinMax)
+    print(f"✅ Wrote {int8_path}")
+
+    int8_model = onnx_backend.OnnxYOLO(int8_path, names, imgsz=imgsz)
+    reference, fp32_ms = detect_all(fp32_model, eval_paths, conf)
+    candidate, int8_ms = detect_all(int8_model, eval_paths, conf)
+
+    report = {
+        'names': {str(k): v for k, v in names.items()},
+        'imgsz': imgsz,
+        'weights_hash': weights_hash(weights_path),
+        'calibration_images': len(calibration_paths),
+        'evaluation_images': len(eval_paths),
+        'confidence_threshold': conf,
+        'metrics': compare_detections(reference, candidate, names),
+        'latency_ms': {'fp32': round(fp32_ms, 1), 'int8': round(int8_ms, 1)},
+        'size_mb': {'fp32': round(os.path.getsize(fp32_path) / 1e6, 1),
+                    'int8': round(os.path.getsize(int8_path) / 1e6, 1)}
+    }
+    with open(report_path, 'w') as f:
+        json.dump(report, f, indent=2)
+    return report
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--weights', default='model/best.pt')
+    parser.add_argument('--calibration', default='test/*.JPG', help='Glob of calibration images')
+    parser.add_argument('--eval', default=None,
+                        help='Glob of evaluation images (default: hold out --holdout of the calibration images)')
+    parser.add_argument('--holdout', type=float, default=DEFAULT_HOLDOUT,
+                        help='Share of the calibration images kept for evaluation when --eval is not given')
+    parser.add_argument('--imgsz', type=int, default=640)
+    parser.add_argument('--conf', type=float, default=SERVING_CONFIDENCE,
+                        help='Confidence threshold for the comparison (default: the one the app serves with)')
+    parser.add_argument('--min-map', type=float, default=float(os.getenv('QUANT_MIN_MAP', DEFAULT_MIN_MAP)))
+    parser.add_argument('--min-agreement', type=float,
+                        default=float(os.getenv('QUANT_MIN_AGREEMENT', DEFAULT_MIN_AGREEMENT)))
+    parser.add_argument('--per-tensor', action='store_true', help='Per-tensor instead of per-channel weights')
+    args = parser.parse_args()
+
+    calibration_paths = sorted(glob.glob(args.calibration))
+    if args.eval:
+        eval_paths = sorted(glob.glob(args.eval))
+        # Scoring on images the quantization was calibrated on would flatter the INT8 model
+        held_out = set(eval_paths)
+        calibration_paths = [path for path in calibration_paths if path not in held_out]
+    else:
+        calibration_paths, eval_paths = split_holdout(calibration_paths, args.holdout)
+    if not calibration_paths:
+        sys.exit(f"❌ No calibration images match {args.calibration} (outside the evaluation set)")
+    if not eval_paths:
+        sys.exit("❌ No evaluation images - pass --eval or a larger --holdout")
+
+    report = quantize(args.weights, calibration_paths, eval_paths, imgsz=args.imgsz,
+                      conf=args.conf, per_channel=not args.per_tensor)
+    metrics = report['metrics']
+
+    print(f"📊 {metrics['images']} evaluation image(s)")
+    print("=" * 72)
+    print(f"{'Class':<36}{'FP32':>7}{'INT8':>7}{'Matched':>9}{'Agree':>7}{'AP50':>7}")
+    for name, stats in metrics['per_class'].items():
+        agreement = '-' if stats['agreement'] is None else f"{stats['agreement']:.2f}"
+        ap50 = '-' if stats['ap50'] is None else f"{stats['ap50']:.2f}"
+        print(f"{name[:35]:<36}{stats['fp32_detections']:>7}{stats['int8_detections']:>7}"
+              f"{stats['matched']:>9}{agreement:>7}{ap50:>7}")
+    print("=" * 72)
+    print(f"mAP@0.5 vs FP32:      {metrics['map50']:.4f}  (min {args.min_map})")
+    print(f"Top-class agreement:  {metrics['top_class_agreement']:.4f}  (min {args.min_agreement})")
+    print(f"Latency FP32 / INT8:  {report['latency_ms']['fp32']} / {report['latency_ms']['int8']} ms per image")
+    print(f"Size FP32 / INT8:     {report['size_mb']['fp32']} / {report['size_mb']['int8']} MB")
+
+    problems = check_report(report, args.weights, args.min_map, args.min_agreement)
+    if problems:
+        for problem in problems:
+            print(f"❌ {problem}")
+        sys.exit("❌ INT8 model will not be activated")
+    print("✅ INT8 model passed the accuracy guardrail - set INFERENCE_PRECISION=int8 to use it")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,134 @@
+# Content-hash result cache for /upload
+# =====================================
+#
+# Re-uploaded photos (and repeated camera frames) are identified by the SHA-256
+# of their bytes plus the model version and confidence threshold. Entries hold
+# the full /upload response - detections, annotated image URL and enriched
+# disease info - in an in-memory LRU, optionally mirrored to JSON files on disk
+# so they survive gunicorn worker recycling.
+
+import hashlib
+import json
+import os
+import threading
+from collections import OrderedDict
+
+
+def make_result_key(data, model_version, confidence):
+    """Cache key for an upload: content hash + model version + confidence threshold"""
+    digest = hashlib.sha256(data).hexdigest()
+    return hashlib.sha256(f"{digest}:{model_version}:{confidence}".encode()).hexdigest()
+
+
+class ResultCache:
+    """LRU cache of /upload responses with optional on-disk persistence"""
+
+    def __init__(self, max_entries=256, persist_dir=None):
+        self.max_entries = max_entries
+        self.persist_dir = persist_dir or None
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+
+        if self.persist_dir:
+            os.makedirs(self.persist_dir, exist_ok=True)
+
+    @property
+    def enabled(self):
+        return self.max_entries > 0
+
+    def _path(self, key):
+        return os.path.join(self.persist_dir, f"{key}.json")
+
+    def get(self, key):
+        """Return the cached value for key, or None"""
+        if not self.enabled:
+            return None
+
+        with self._lock:
+            if key in self._entries:
+                self._entries.move_to_end(key)
+                self.hits += 1
+                return self._entries[key]
+
+        value = self._load(key)
+        with self._lock:
+            if value is None:
+                self.misses += 1
+                return None
+            self.hits += 1
+            self._remember(key, value)
+        return value
+
+    def put(self, key, value):
+        """Store value under key, evicting the least recently used entries"""
+        if not self.enabled:
+            return
+        with self._lock:
+            self._remember(key, value)
+        self._save(key, value)
+
+    def discard(self, key):
+        """Drop an entry whose artifacts are no longer valid"""
+        with self._lock:
+            self._entries.pop(key, None)
+        if self.persist_dir:
+            try:
+                os.remove(self._path(key))
+            except OSError:
+                pass
+
+    def _remember(self, key, value):
+        self._entries[key] = value
+        self._entries.move_to_end(key)
+        while len(self._entries) > self.max_entries:
+            self._entries.popitem(last=False)
+
+    def _load(self, key):
+        if not self.persist_dir:
+            return None
+        path = self._path(key)
+        try:
+            with open(path, 'r') as f:
+                value = json.load(f)
+            os.utime(path)  # Keep on-disk eviction least-recently-used as well
+            return value
+        except (OSError, ValueError):
+            return None
+
+    def _save(self, key, value):
+        if not self.persist_dir:
+            return
+        try:
+            # Write atomically so concurrent workers never read a partial file
+            tmp_path = f"{self._path(key)}.{os.getpid()}.tmp"
+            with open(tmp_path, 'w') as f:
+                json.dump(value, f)
+            os.replace(tmp_path, self._path(key))
+            self._prune_disk()
+        except (OSError, TypeError) as e:
+            print(f"⚠️ Could not persist cached result: {e}")
+
+    def _prune_disk(self):
+        files = [os.path.join(self.persist_dir, name) for name in os.listdir(self.persist_dir) if name.endswith('.json')]
+        if len(files) <= self.max_entries:
+            return
+        files.sort(key=lambda path: os.path.getmtime(path))
+        for path in files[:len(files) - self.max_entries]:
+            try:
+                os.remove(path)
+            except OSError:
+                pass
+
+    def stats(self):
+        total = self.hits + self.misses
+        return {
+            'enabled': self.enabled,
+            'entries': len(self._entries),
+            'max_entries': self.max_entries,
+            'persistent': bool(self.persist_dir),
+            'hits': self.hits,
+            'misses': self.misses,
+            'hit_ratio': round(self.hits / total, 3) if total else 0.0
+        }
@@ -0,0 +1,76 @@
+# Lazy annotated-image rendering
+# ==============================
+#
+# Detection no longer draws and encodes an annotated image on every request.
+# It stores a small render manifest instead - the upload's path and its boxes
+# in original image coordinates - under the result key. /results/<key>.jpg
+# (or .webp / .png, with ?size= for a thumbnail) draws the boxes on the upload
+# the first time that variant is requested. The encoded bytes are kept in the
+# result store and served with an ETag, so clients that only read the JSON
+# never pay for drawing or encoding.
+
+import json
+
+from image_decode import decode_image
+
+# URL extension -> (MIME type, OpenCV encode parameter name, quality cap)
+RENDER_FORMATS = {
+    '.jpg': ('image/jpeg', 'IMWRITE_JPEG_QUALITY', 100),
+    '.webp': ('image/webp', 'IMWRITE_WEBP_QUALITY', 100),
+    '.png': ('image/png', None, None)
+}
+
+
+def manifest_bytes(image_path, detections):
+    """Everything needed to draw the result later, as JSON"""
+    return json.dumps({
+        'image': image_path,
+        'detections': [[*detection['bbox'], detection['confidence'], detection['class_id'], detection['class_name']]
+                       for detection in detections]
+    }).encode()
+
+
+def parse_manifest(data):
+    return json.loads(data)
+
+
+def snap_size(size, sizes):
+    """Smallest allowed size at or above the requested one - the largest when none is requested"""
+    if not size:
+        return max(sizes)
+    return min((allowed for allowed in sizes if allowed >= size), default=max(sizes))
+
+
+def variant_suffix(size, extension):
+    """Storage suffix of one rendered variant, e.g. .s320.webp"""
+    return f'.s{size}{extension}'
+
+
+def render(image_data, manifest, size, extension='.jpg', quality=85):
+    """Draw the manifest's boxes on the upload, its longer side at most size pixels - encoded bytes"""
+    import cv2
+    import numpy as np
+    from onnx_backend import DetectionResult
+
+    decoded = decode_image(image_data, max_side=size)
+    image = decoded.image
+    height, width = image.shape[:2]
+    if max(width, height) > size:
+        factor = size / max(width, height)
+        width, height = max(round(width * factor), 1), max(round(height * factor), 1)
+        image = cv2.resize(image, (width, height), interpolation=cv2.INTER_AREA)
+
+    # Boxes are stored in original image coordinates
+    original_width, original_height = decoded.original_size
+    scale = np.array([width / original_width, height / original_height] * 2)
+    rows = np.array([row[:6] for row in manifest['detections']], dtype=np.float32).reshape(-1, 6)
+    rows[:, :4] *= scale
+    names = {int(row[5]): row[6] for row in manifest['detections']}
+    annotated = DetectionResult(image, rows, names).plot()
+
+    _, param, cap = RENDER_FORMATS[extension]
+    params = [getattr(cv2, param), min(quality, cap)] if param else []
+    encoded, buffer = cv2.imencode(extension, annotated, params)
+    if not encoded:
+        raise ValueError(f"could not encode {extension}")
+    return buffer.tobytes()
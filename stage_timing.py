@@ -0,0 +1,101 @@
+# Per-request stage timing
+# ========================
+#
+# A request starts a StageTimings; code anywhere below it wraps its work in
+# stage('name') (or decorates a function with @timed('name')) and the duration
+# lands in the current request's timings, ready for a Server-Timing header.
+# Without a started timer, stage() only looks up a context variable, so the
+# instrumentation costs next to nothing when timing is off.
+#
+# Work handed to thread pools does not inherit the request's context - wrap the
+# callable with bind() when submitting it so its stages are still recorded.
+
+import contextvars
+import functools
+import threading
+import time
+from contextlib import contextmanager
+
+_current = contextvars.ContextVar('stage_timings', default=None)
+
+
+class StageTimings:
+    """Milliseconds spent per stage - repeated stages (one provider call per class) add up"""
+
+    def __init__(self):
+        self._stages = {}
+        self._lock = threading.Lock()  # Providers record from pool threads
+
+    def add(self, name, duration_ms):
+        with self._lock:
+            self._stages[name] = self._stages.get(name, 0.0) + duration_ms
+
+    def as_dict(self):
+        with self._lock:
+            return {name: round(duration_ms, 2) for name, duration_ms in self._stages.items()}
+
+    def header(self, total_ms=None):
+        """Server-Timing header value, e.g. 'decode;dur=3.1, inference;dur=48.0'"""
+        stages = self.as_dict()
+        if total_ms is not None:
+            stages['total'] = round(total_ms, 2)
+        return ', '.join(f"{name};dur={duration_ms}" for name, duration_ms in stages.items())
+
+
+def start():
+    """Start timing stages for the current request (or thread) and return the timings"""
+    timings = StageTimings()
+    _current.set(timings)
+    return timings
+
+
+def stop():
+    _current.set(None)
+
+
+def current():
+    """Timings being recorded in this context, or None when timing is off"""
+    return _current.get()
+
+
+@contextmanager
+def stage(name):
+    """Record how long the block takes as stage name"""
+    timings = _current.get()
+    if timings is None:
+        yield
+        return
+    started = time.perf_counter()
+    try:
+        yield
+    finally:
+        timings.add(name, (time.perf_counter() - started) * 1000)
+
+
+def timed(name):
+    """Decorator form of stage()"""
+    def decorator(fn):
+        @functools.wraps(fn)
+        def wrapper(*args, **kwargs):
+            if _current.get() is None:
+                return fn(*args, **kwargs)
+            with stage(name):
+                return fn(*args, **kwargs)
+        return wrapper
+    return decorator
+
+
+def bind(fn):
+    """fn, recording its stages into the caller's timings when it runs on another thread"""
+    timings = _current.get()
+    if timings is None:
+        return fn
+
+    @functools.wraps(fn)
+    def run(*args, **kwargs):
+        token = _current.set(timings)
+        try:
+            return fn(*args, **kwargs)
+        finally:
+            _current.reset(token)
+    return run
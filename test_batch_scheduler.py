@@ -0,0 +1,67 @@
+#!/usr/bin/env python3
+"""
+Tests for the micro-batching inference scheduler
+"""
+import threading
+import time
+
+import pytest
+
+from batch_scheduler import MicroBatchScheduler
+
+
+def test_concurrent_requests_share_one_batch():
+    calls = []
+
+    def run_batch(items):
+        calls.append(list(items))
+        return [item * 2 for item in items]
+
+    scheduler = MicroBatchScheduler(run_batch, max_batch_size=8, max_wait_ms=200)
+    results = {}
+
+    def worker(value):
+        results[value] = scheduler.submit(value, timeout=5)
+
+    threads = [threading.Thread(target=worker, args=(i,)) for i in range(5)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+
+    assert results == {i: i * 2 for i in range(5)}
+    assert len(calls) == 1
+    assert scheduler.stats()['batch_size_histogram'] == {5: 1}
+
+
+def test_batches_are_capped_at_max_batch_size():
+    calls = []
+
+    def run_batch(items):
+        calls.append(len(items))
+        return items
+
+    scheduler = MicroBatchScheduler(run_batch, max_batch_size=3, max_wait_ms=50)
+    assert scheduler.map(list(range(7)), timeout=5) == list(range(7))
+    assert max(calls) <= 3
+    assert sum(calls) == 7
+    assert scheduler.stats()['items_processed'] == 7
+
+
+def test_single_request_waits_at_most_max_wait():
+    scheduler = MicroBatchScheduler(lambda items: items, max_batch_size=8, max_wait_ms=20)
+    start = time.monotonic()
+    assert scheduler.submit('leaf', timeout=5) == 'leaf'
+    assert time.monotonic() - start < 1
+
+
+def test_batch_errors_reach_every_caller():
+    def run_batch(items):
+        raise ValueError('model not loaded')
+
+    scheduler = MicroBatchScheduler(run_batch, max_batch_size=4, max_wait_ms=10)
+    with pytest.raises(ValueError):
+        scheduler.submit('leaf', timeout=5)
+    # The worker keeps serving after a failed batch
+    scheduler.run_batch = lambda items: items
+    assert scheduler.submit('leaf', timeout=5) == 'leaf'
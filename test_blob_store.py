@@ -0,0 +1,41 @@
+#!/usr/bin/env python3
+"""
+Tests for the in-memory upload/result blob store
+"""
+from blob_store import BlobStore
+
+
+def test_put_get_and_lru_eviction_by_bytes():
+    store = BlobStore(max_bytes=10)
+    store.put('uploads/a.jpg', b'aaaa')
+    store.put('uploads/b.jpg', b'bbbb')
+    assert store.get('uploads/a.jpg') == b'aaaa'  # a is now most recently used
+
+    store.put('results/annotated_c.jpg', b'cccc')
+    assert store.get('uploads/b.jpg') is None
+    assert store.exists('uploads/a.jpg') and store.exists('results/annotated_c.jpg')
+    assert store.bytes == 8
+    assert store.stats()['evictions'] == 1
+
+
+def test_replacing_a_blob_updates_the_size():
+    store = BlobStore(max_bytes=100)
+    store.put('uploads/a.jpg', b'x' * 40)
+    store.put('uploads/a.jpg', b'y' * 10)
+    assert store.bytes == 10
+    store.discard('uploads/a.jpg')
+    assert store.bytes == 0 and not store.exists('uploads/a.jpg')
+
+
+def test_background_persistence_writes_files(tmp_path):
+    store = BlobStore(max_bytes=4, persist=True)
+    small, large = tmp_path / 'results' / 'annotated_a.jpg', tmp_path / 'uploads' / 'big.jpg'
+    store.put(str(small), b'abc')
+    store.put(str(large), b'too large for memory')
+    store.flush()
+
+    assert small.read_bytes() == b'abc'
+    assert large.read_bytes() == b'too large for memory'  # Not kept in memory, but persisted
+    assert not store.exists(str(large))
+    assert store.stats()['writes'] == 2
+    assert not [name for name in (tmp_path / 'results').iterdir() if name.suffix == '.tmp']
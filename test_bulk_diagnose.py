@@ -0,0 +1,75 @@
+#!/usr/bin/env python3
+"""
+Tests for the bulk diagnosis CLI helpers (image discovery, decoding, writers, checkpoint)
+"""
+import csv
+import json
+
+import pytest
+
+np = pytest.importorskip('numpy')
+from PIL import Image
+
+from bulk_diagnose import CsvWriter, JsonlWriter, decoded_batches, find_images, make_row, open_writer, read_checkpoint
+
+
+def test_find_images_walks_directories_and_globs(tmp_path):
+    (tmp_path / 'field' / 'row1').mkdir(parents=True)
+    for name in ['field/a.JPG', 'field/row1/b.png', 'field/notes.txt', 'c.jpeg']:
+        (tmp_path / name).write_bytes(b'')
+    found = find_images([str(tmp_path / 'field'), str(tmp_path / '*.jpeg'), str(tmp_path / 'field' / 'a.JPG')])
+    assert [path[len(str(tmp_path)) + 1:] for path in found] == ['c.jpeg', 'field/a.JPG', 'field/row1/b.png']
+
+
+def test_inline_decoding_reports_bad_images(tmp_path):
+    Image.new('RGB', (64, 48)).save(tmp_path / 'leaf.jpg')
+    (tmp_path / 'broken.jpg').write_bytes(b'not an image')
+    timings = {'decode_wait': 0.0}
+    paths = [str(tmp_path / 'broken.jpg'), str(tmp_path / 'leaf.jpg')]
+    batches = list(decoded_batches(paths, None, batch_size=1, workers=0, timings=timings))
+
+    assert [len(batch) for batch in batches] == [1, 1]
+    (_, image, _, error, _), = batches[0]
+    assert image is None and error == 'Not a supported image file'
+    (_, image, scale, error, _), = batches[1]
+    assert image.shape == (48, 64, 3) and scale == (1.0, 1.0) and error is None
+
+
+def test_rows_are_written_as_jsonl_and_flat_csv(tmp_path):
+    detections = [{'class_name': 'Apple___healthy', 'confidence': 0.5, 'bbox': [0, 0, 8, 8]},
+                  {'class_name': 'Apple___Cedar_apple_rust', 'confidence': 0.875, 'bbox': [1.25, 2, 30, 40]}]
+    row = make_row('a.jpg', np.zeros((50, 100, 3), np.uint8), (2.0, 2.0), detections,
+                   is_healthy=lambda name: 'healthy' in name)
+    assert (row['width'], row['height'], row['count']) == (200, 100, 2)
+    assert row['top_disease'] == 'Apple___Cedar_apple_rust' and row['healthy'] is False
+    rows = [row, make_row('b.jpg', error='Not a supported image file')]
+
+    writer = JsonlWriter(str(tmp_path / 'out.jsonl'), append=False)
+    writer.write(rows)
+    writer.close()
+    assert [json.loads(line)['path'] for line in open(tmp_path / 'out.jsonl')] == ['a.jpg', 'b.jpg']
+
+    for append in (False, True):  # A resumed run appends without a second header
+        writer = CsvWriter(str(tmp_path / 'out.csv'), append=append)
+        writer.write(rows)
+        writer.close()
+    written = list(csv.DictReader(open(tmp_path / 'out.csv')))
+    assert len(written) == 4
+    assert written[0]['classes'] == 'Apple___healthy;Apple___Cedar_apple_rust'
+    assert json.loads(written[0]['detections'])[1]['bbox'] == [1.2, 2, 30, 40]
+    assert written[1]['status'] == 'error'
+
+
+def test_json_output_is_refused_in_favour_of_jsonl(tmp_path):
+    # One JSON object per line is not a valid .json document
+    with pytest.raises(SystemExit, match='use .jsonl'):
+        open_writer(str(tmp_path / 'out.json'), append=False)
+    assert not (tmp_path / 'out.json').exists()
+    open_writer(str(tmp_path / 'out.jsonl'), append=False).close()
+
+
+def test_checkpoint_lists_finished_paths(tmp_path):
+    checkpoint = tmp_path / 'out.jsonl.checkpoint'
+    assert read_checkpoint(str(checkpoint)) == set()
+    checkpoint.write_text('a.jpg\nb.jpg\n')
+    assert read_checkpoint(str(checkpoint)) == {'a.jpg', 'b.jpg'}
@@ -0,0 +1,66 @@
+#!/usr/bin/env python3
+"""
+Tests for content-addressed storage and its garbage collector
+"""
+import hashlib
+import os
+import time
+
+from content_store import ContentStore, extension_for, write_file_atomic
+
+DIGEST = hashlib.sha256(b'leaf').hexdigest()
+
+
+def add_file(store, data, age_seconds, now):
+    path = store.path_for(hashlib.sha256(data).hexdigest(), '.jpg')
+    write_file_atomic(path, data)
+    os.utime(path, (now - age_seconds, now - age_seconds))
+    return path
+
+
+def test_paths_are_sharded_and_names_are_validated(tmp_path):
+    store = ContentStore(str(tmp_path))
+    path = store.path_for(DIGEST, extension_for('jpeg'))
+    assert path == os.path.join(str(tmp_path), DIGEST[:2], DIGEST[2:4], DIGEST + '.jpg')
+    assert store.path(DIGEST + '.jpg') == path
+    assert store.path('IMG_0001.jpg') is None
+    assert store.path('../' + DIGEST + '.jpg') is None
+
+
+def test_collect_deletes_expired_files_but_keeps_recent_ones(tmp_path):
+    now = time.time()
+    store = ContentStore(str(tmp_path), max_age_seconds=3600, grace_seconds=60)
+    old = add_file(store, b'old', 7200, now)
+    new = add_file(store, b'new', 600, now)
+
+    summary = store.collect(now)
+    assert not os.path.exists(old) and os.path.exists(new)
+    assert summary['deleted'] == 1 and summary['files'] == 1
+
+
+def test_collect_evicts_least_recently_used_files_over_the_byte_budget(tmp_path):
+    now = time.time()
+    store = ContentStore(str(tmp_path), max_bytes=20, grace_seconds=60)
+    oldest = add_file(store, b'a' * 10, 3000, now)
+    middle = add_file(store, b'b' * 10, 2000, now)
+    recent = add_file(store, b'c' * 10, 10, now)  # Inside the grace period
+    os.utime(oldest, (now - 1000, now - 1000))  # Touched - now more recently used than middle
+
+    summary = store.collect(now)
+    assert os.path.exists(oldest) and os.path.exists(recent)
+    assert not os.path.exists(middle)
+    assert summary['bytes'] == 20 and summary['freed_bytes'] == 10
+
+
+def test_pinned_files_survive_collection(tmp_path):
+    now = time.time()
+    queued_upload = None
+    store = ContentStore(str(tmp_path), max_age_seconds=3600, max_bytes=20, grace_seconds=60,
+                         pinned=lambda: {queued_upload})
+    queued_upload = add_file(store, b'q' * 10, 7200, now)  # Oldest and expired, but a queued job needs it
+    older = add_file(store, b'o' * 10, 600, now)
+    newer = add_file(store, b'n' * 10, 300, now)
+    summary = store.collect(now)
+    assert os.path.exists(queued_upload) and os.path.exists(newer)
+    assert not os.path.exists(older)  # Evicted in place of the pinned file
+    assert summary['deleted'] == 1 and summary['bytes'] == 20
@@ -0,0 +1,102 @@
+#!/usr/bin/env python3
+"""
+Tests for per-class enrichment and the /upload summary (one provider lookup per distinct class)
+"""
+import os
+import tempfile
+import threading
+import time
+
+import pytest
+
+pytest.importorskip('flask')
+os.environ.setdefault('INFO_CACHE_PATH', '')  # Provider answers come from the stub below, never from disk
+os.environ.setdefault('JOB_DB_PATH', os.path.join(tempfile.mkdtemp(), 'jobs.sqlite3'))
+
+import app
+from provider_runtime import CircuitBreaker
+
+DETECTIONS = [
+    {'class_name': 'Tomato leaf late blight', 'class_id': 2, 'confidence': 0.4, 'bbox': [10, 20, 50, 60]},
+    {'class_name': 'Tomato leaf', 'class_id': 1, 'confidence': 0.9, 'bbox': [0, 0, 100, 100]},
+    {'class_name': 'Tomato leaf late blight', 'class_id': 2, 'confidence': 0.7, 'bbox': [40, 5, 80, 30]},
+    {'class_name': 'Tomato leaf late blight', 'class_id': 2, 'confidence': 0.55, 'bbox': [30, 50, 45, 90]},
+]
+
+
+@pytest.fixture
+def provider_calls(monkeypatch):
+    """Stub the online providers - records every class they are asked about"""
+    calls = []
+    lock = threading.Lock()
+
+    def lookup(disease_name):
+        with lock:
+            calls.append(disease_name)
+        return {'description': f'About {disease_name}', 'source': 'Stub'}
+
+    monkeypatch.setattr(app, 'get_disease_info_from_api', lookup)
+    monkeypatch.setattr(app, 'PLANTNET_API_KEY', '')
+    return calls
+
+
+def test_each_distinct_class_is_resolved_once(provider_calls):
+    class_info = app.enrich_detections(DETECTIONS)
+    assert sorted(provider_calls) == ['Tomato leaf', 'Tomato leaf late blight']
+    assert class_info['Tomato leaf late blight'] == {'description': 'About Tomato leaf late blight', 'source': 'Stub'}
+
+    assert app.enrich_detections(DETECTIONS[:1]) == {'Tomato leaf late blight': class_info['Tomato leaf late blight']}
+    assert app.enrich_detections([]) == {}
+
+
+def test_summary_counts_boxes_and_keeps_max_confidence_and_union_box():
+    summary = app.summarize_detections(DETECTIONS)
+    assert [entry['disease'] for entry in summary] == ['Tomato leaf', 'Tomato leaf late blight']  # By confidence
+    blight = summary[1]
+    assert blight['count'] == 3
+    assert blight['max_confidence'] == 0.7
+    assert blight['bbox'] == [10, 5, 80, 90]
+    assert blight['is_healthy'] is False
+    assert summary[0] == {'disease': 'Tomato leaf', 'count': 1, 'max_confidence': 0.9, 'bbox': [0, 0, 100, 100],
+                          'is_healthy': True}
+
+
+def test_class_info_is_shared_across_detections(provider_calls):
+    response = app.build_detection_response(DETECTIONS, None)
+    response = app.attach_disease_info(response, app.enrich_detections(DETECTIONS))
+    assert len(response['detections']) == 4
+    blight_infos = [detection['info'] for detection in response['detections']
+                    if detection['disease'] == 'Tomato leaf late blight']
+    assert len(blight_infos) == 3 and all(info is blight_infos[0] for info in blight_infos)
+    assert response['detections'][1]['info']['description'] == 'About Tomato leaf'
+    assert response['result_image'] is None
+
+
+def test_hanging_gemini_opens_its_circuit_and_requests_fall_back(monkeypatch):
+    release = threading.Event()
+    calls = []
+
+    class HangingGemini:
+        def generate_content(self, prompt):
+            calls.append(prompt)
+            release.wait(5)
+
+    breaker = CircuitBreaker('gemini', failure_threshold=2, reset_timeout=60)
+    monkeypatch.setitem(app.provider_breakers, 'gemini', breaker)
+    monkeypatch.setattr(app, 'get_gemini_model', HangingGemini)
+    monkeypatch.setattr(app, 'get_wikipedia_disease_info', lambda disease_name: None)
+    monkeypatch.setattr(app, 'GEMINI_API_KEY', 'key')
+    monkeypatch.setattr(app, 'GOOGLE_API_KEY', '')
+    monkeypatch.setattr(app, 'API_TIMEOUT', 0.1)
+    monkeypatch.setattr(app, 'provider_cache', None)
+    try:
+        for _ in range(2):
+            assert app.get_disease_info_from_api('Tomato leaf late blight') is None
+        assert breaker.state == CircuitBreaker.OPEN and len(calls) == 2
+
+        start = time.monotonic()
+        assert app.get_disease_info_from_api('Tomato leaf late blight') is None  # Local database takes over
+        assert time.monotonic() - start < 0.1
+        assert len(calls) == 2
+    finally:
+        release.set()
@@ -0,0 +1,64 @@
+#!/usr/bin/env python3
+"""
+Tests for the evaluation harness: file-name labels, scoring and config parsing
+"""
+import pytest
+
+from evaluate_model import (NO_DETECTION, build_label_map, label_prefix, match_class, parse_config, percentile,
+                            score_predictions)
+
+PLANTDOC = ['Apple Scab Leaf', 'Apple leaf', 'Apple rust leaf', 'Potato leaf', 'Potato leaf early blight',
+            'Tomato Early blight leaf', 'Tomato leaf', 'Tomato leaf yellow virus', 'Tomato leaf late blight']
+PLANTVILLAGE = ['Apple___Apple_scab', 'Apple___Cedar_apple_rust', 'Apple___healthy', 'Tomato___Early_blight',
+                'Tomato___Late_blight', 'Tomato___healthy', 'Tomato___Tomato_Yellow_Leaf_Curl_Virus']
+
+
+def test_file_names_map_to_model_classes():
+    assert label_prefix('test/TomatoYellowCurlVirus6.JPG') == 'TomatoYellowCurlVirus'
+    assert label_prefix('plant3.jpg') == 'plant'
+
+    prefixes = ['AppleCedarRust', 'AppleScab', 'TomatoEarlyBlight', 'TomatoHealthy', 'TomatoYellowCurlVirus']
+    assert build_label_map(prefixes, PLANTDOC) == {
+        'AppleCedarRust': 'Apple rust leaf',
+        'AppleScab': 'Apple Scab Leaf',
+        'TomatoEarlyBlight': 'Tomato Early blight leaf',
+        'TomatoHealthy': 'Tomato leaf',
+        'TomatoYellowCurlVirus': 'Tomato leaf yellow virus'
+    }
+    assert build_label_map(prefixes, PLANTVILLAGE) == {
+        'AppleCedarRust': 'Apple___Cedar_apple_rust',
+        'AppleScab': 'Apple___Apple_scab',
+        'TomatoEarlyBlight': 'Tomato___Early_blight',
+        'TomatoHealthy': 'Tomato___healthy',
+        'TomatoYellowCurlVirus': 'Tomato___Tomato_Yellow_Leaf_Curl_Virus'
+    }
+
+
+def test_unknown_or_ambiguous_prefixes_are_not_guessed():
+    assert match_class('plant', PLANTDOC) is None
+    assert match_class('CornCommonRust', PLANTDOC) is None  # No corn class
+    assert match_class('TomatoBlight', PLANTDOC) is None  # Early or late blight?
+    assert build_label_map(['TomatoBlight'], PLANTDOC, {'TomatoBlight': 'Tomato leaf late blight'}) == {
+        'TomatoBlight': 'Tomato leaf late blight'}
+
+
+def test_scoring_counts_missing_detections_as_wrong():
+    labels = {'a1.jpg': 'A', 'a2.jpg': 'A', 'b1.jpg': 'B', 'b2.jpg': 'B'}
+    predictions = {'a1.jpg': 'A', 'a2.jpg': 'B', 'b1.jpg': 'B', 'b2.jpg': NO_DETECTION, 'x.jpg': 'A'}
+    scores = score_predictions(predictions, labels)
+    assert scores['labelled_images'] == 4
+    assert scores['accuracy'] == 0.5
+    assert scores['per_class']['A'] == {'images': 2, 'accuracy': 0.5}
+    assert scores['confusion'] == {'A': {'A': 1, 'B': 1}, 'B': {'B': 1, NO_DETECTION: 1}}
+
+
+def test_percentiles_and_config_parsing():
+    latencies = list(range(1, 101))
+    assert (percentile(latencies, 50), percentile(latencies, 95), percentile(latencies, 99)) == (50, 95, 99)
+    assert percentile([], 50) is None
+
+    assert parse_config('backend=onnxruntime,batch=8,conf=0.25,TILED_INFERENCE=true') == (
+        {'INFERENCE_BACKEND': 'onnxruntime', 'INFERENCE_BATCH_SIZE': '8', 'TILED_INFERENCE': 'true'}, 0.25)
+    assert parse_config('') == ({}, None)
+    with pytest.raises(ValueError):
+        parse_config('bakend=onnxruntime')
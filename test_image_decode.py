@@ -0,0 +1,66 @@
+#!/usr/bin/env python3
+"""
+Tests for upload validation and the draft-mode decode path
+"""
+import io
+
+import numpy as np
+import pytest
+from PIL import Image
+
+from image_decode import InvalidImage, decode_image, sniff_image_type
+
+
+def encode(width, height, image_format='JPEG', orientation=None):
+    pixels = np.zeros((height, width, 3), dtype=np.uint8)
+    pixels[:height // 2, :width // 2] = (255, 0, 0)  # Red top-left quadrant
+    image = Image.fromarray(pixels)
+    buffer = io.BytesIO()
+    if orientation:
+        exif = Image.Exif()
+        exif[0x0112] = orientation
+        image.save(buffer, image_format, exif=exif.tobytes())
+    else:
+        image.save(buffer, image_format)
+    return buffer.getvalue()
+
+
+def test_sniffs_image_formats_and_rejects_everything_else():
+    assert sniff_image_type(encode(8, 8)) == 'jpeg'
+    assert sniff_image_type(encode(8, 8, 'PNG')) == 'png'
+    assert sniff_image_type(encode(8, 8, 'WEBP')) == 'webp'
+    assert sniff_image_type(b'<html>not an image</html>') is None
+    assert sniff_image_type(b'RIFF\x00\x00\x00\x00WAVEfmt ') is None
+    with pytest.raises(InvalidImage):
+        decode_image(b'%PDF-1.7')
+
+
+def test_jpeg_draft_decodes_close_to_the_target_size():
+    decoded = decode_image(encode(4032, 3024), max_side=1280)
+    assert decoded.image.shape == (1512, 2016, 3)
+    assert decoded.original_size == (4032, 3024)
+    assert decoded.scale == (2.0, 2.0)
+    assert decoded.image.flags['C_CONTIGUOUS']
+    assert tuple(decoded.image[10, 10]) == pytest.approx((0, 0, 254), abs=3)  # BGR order
+
+
+def test_small_images_are_decoded_at_full_size():
+    decoded = decode_image(encode(640, 480), max_side=1280)
+    assert decoded.image.shape == (480, 640, 3)
+    assert decoded.scale == (1.0, 1.0)
+
+
+def test_other_formats_are_reduced_after_decoding():
+    decoded = decode_image(encode(3000, 2700, 'PNG'), max_side=1280)
+    assert decoded.image.shape == (1350, 1500, 3)
+    assert decoded.scale == (2.0, 2.0)
+
+
+def test_exif_orientation_is_applied_and_scale_refers_to_the_oriented_image():
+    # Orientation 6: stored landscape, displayed rotated 90 degrees clockwise (portrait)
+    decoded = decode_image(encode(4000, 2600, orientation=6), max_side=1280)
+    assert decoded.original_size == (2600, 4000)
+    assert decoded.image.shape == (2000, 1300, 3)
+    assert decoded.scale == (2.0, 2.0)
+    # The red quadrant moves from top-left to top-right
+    assert decoded.image[10, -10, 2] > 200 and decoded.image[10, 10, 2] < 50
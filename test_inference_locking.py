@@ -0,0 +1,115 @@
+#!/usr/bin/env python3
+"""
+Tests that the shared in-process model is loaded once and runs one forward pass at a time
+"""
+import io
+import os
+import tempfile
+import threading
+import time
+
+import pytest
+
+np = pytest.importorskip('numpy')
+pytest.importorskip('flask')
+os.environ.setdefault('INFO_CACHE_PATH', '')
+os.environ.setdefault('JOB_DB_PATH', os.path.join(tempfile.mkdtemp(), 'jobs.sqlite3'))
+
+import app
+from live_session import LiveSession
+
+
+class FakeResult:
+    names = {0: 'Tomato leaf'}
+    boxes = None
+
+
+class UnsafeModel:
+    """Like the ultralytics predictor: overlapping calls would corrupt each other - records the overlap"""
+    names = FakeResult.names
+
+    def __init__(self):
+        self.active = 0
+        self.max_active = 0
+        self.calls = 0
+        self._lock = threading.Lock()
+
+    def __call__(self, images, conf=None):
+        with self._lock:
+            self.active += 1
+            self.max_active = max(self.max_active, self.active)
+        time.sleep(0.01)
+        with self._lock:
+            self.active -= 1
+            self.calls += 1
+        return [FakeResult() for _ in (images if isinstance(images, list) else [images])]
+
+
+@pytest.fixture
+def unsafe_model(monkeypatch):
+    fake = UnsafeModel()
+    monkeypatch.setattr(app, 'model', fake)
+    monkeypatch.setattr(app, 'inference_client', None)
+    monkeypatch.setattr(app, 'BATCH_SCHEDULER_ENABLED', False)
+    return fake
+
+
+def run_concurrently(fn, count):
+    errors = []
+    def target():
+        try:
+            fn()
+        except Exception as e:
+            errors.append(e)
+    threads = [threading.Thread(target=target) for _ in range(count)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    assert not errors
+
+
+def test_request_and_job_threads_take_turns_on_the_model(unsafe_model):
+    image = np.zeros((32, 32, 3), np.uint8)
+    run_concurrently(lambda: app.run_yolo_batch([image, image]), 6)
+    assert unsafe_model.calls == 6
+    assert unsafe_model.max_active == 1
+
+
+def test_live_sessions_take_turns_on_the_model(unsafe_model):
+    Image = pytest.importorskip('PIL.Image')
+    buffer = io.BytesIO()
+    Image.new('RGB', (32, 32)).save(buffer, format='JPEG')
+    frame = buffer.getvalue()
+    sessions = [LiveSession(app.detect_frame, lambda class_name: {}, window=3) for _ in range(2)]
+
+    def stream(session, frames=5):
+        state = session.snapshot()
+        while state['processed'] + state['errors'] < frames:
+            session.submit(frame)
+            state = session.wait(state['version'], timeout=5)
+
+    threads = [threading.Thread(target=stream, args=(session,)) for session in sessions]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    states = [session.snapshot() for session in sessions]
+    for session in sessions:
+        session.close()
+
+    assert [state['processed'] for state in states] == [5, 5]
+    assert [state['errors'] for state in states] == [0, 0]
+    assert unsafe_model.max_active == 1
+
+
+def test_model_is_loaded_once_by_concurrent_callers(monkeypatch):
+    loads = []
+    def slow_load():
+        loads.append(1)
+        time.sleep(0.05)
+        return UnsafeModel()
+    monkeypatch.setattr(app, 'model', None)
+    monkeypatch.setattr(app, 'load_yolo_model', slow_load)
+    run_concurrently(app.get_yolo_model, 4)
+    assert len(loads) == 1 and isinstance(app.model, UnsafeModel)
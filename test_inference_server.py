@@ -0,0 +1,94 @@
+#!/usr/bin/env python3
+"""
+Tests for the shared-memory inference server and its client
+"""
+import multiprocessing
+import os
+from multiprocessing import AuthenticationError
+from multiprocessing.connection import Client
+
+import pytest
+
+np = pytest.importorskip('numpy')
+pytest.importorskip('cv2')
+
+from inference_server import InferenceClient, serve
+from onnx_backend import DetectionResult
+
+AUTHKEY = b'test-key'
+NAMES = {0: 'Apple Scab Leaf', 1: 'Corn rust leaf'}
+
+
+class StubModel:
+    """Reports one box per image whose confidence and class come from the image's pixels"""
+    names = NAMES
+
+    def __call__(self, images, conf=0.25):
+        if any(image.shape[0] == 13 for image in images):
+            raise ValueError('unsupported image')
+        results = []
+        for image in images:
+            score, class_id = image[0, 0, 0] / 100, image[0, 0, 1]
+            rows = np.array([[1, 2, image.shape[1], image.shape[0], score, class_id]], dtype=np.float32)
+            results.append(DetectionResult(image, rows[rows[:, 4] > conf], NAMES))
+        return results
+
+
+@pytest.fixture
+def client(tmp_path):
+    address = str(tmp_path / 'inference.sock')
+    process = multiprocessing.get_context('fork').Process(target=serve, args=(address, StubModel, AUTHKEY), daemon=True)
+    process.start()
+    yield InferenceClient([address], AUTHKEY, timeout=10)
+    process.terminate()
+    process.join()
+
+
+def image(score, class_id, height=20, width=30):
+    pixels = np.zeros((height, width, 3), dtype=np.uint8)
+    pixels[0, 0] = (score, class_id, 0)
+    return pixels
+
+
+def test_round_trip_through_shared_memory(client):
+    results = client([image(90, 1), image(50, 0, height=40)], conf=0.25)
+    assert [result.names[int(result.boxes[0].cls[0])] for result in results] == ['Corn rust leaf', 'Apple Scab Leaf']
+    assert results[1].boxes[0].xyxy[0].tolist() == [1, 2, 30, 40]
+    assert float(results[0].boxes[0].conf[0]) == pytest.approx(0.9)
+    assert results[0].plot().shape == (20, 30, 3)  # Annotation is drawn client-side
+
+    info = client.info()
+    assert info['images'] == 2 and info['pid'] != os.getpid()
+    assert not [name for name in os.listdir('/dev/shm') if name.startswith('psm_')]
+
+
+def test_confidence_threshold_is_applied_per_request(client):
+    assert len(client([image(20, 0)], conf=0.1)[0].boxes) == 1
+    assert len(client([image(20, 0)], conf=0.5)[0].boxes) == 0
+
+
+def test_server_errors_are_raised_in_the_client(client):
+    with pytest.raises(RuntimeError, match='unsupported image'):
+        client([image(90, 0, height=13)], conf=0.25)
+    # The connection stays usable
+    assert len(client([image(90, 0)], conf=0.25)[0].boxes) == 1
+
+
+def test_socket_is_private_and_needs_the_key(client, tmp_path):
+    client.info()  # Server is up
+    address = str(tmp_path / 'inference.sock')
+    assert os.stat(address).st_mode & 0o777 == 0o600
+    with pytest.raises(AuthenticationError):
+        Client(address, family='AF_UNIX', authkey=b'wrong-key')
+
+
+def test_server_refuses_a_shared_directory_or_no_key(tmp_path):
+    shared = tmp_path / 'shared'
+    shared.mkdir(mode=0o777)
+    os.chmod(shared, 0o777)
+    with pytest.raises(RuntimeError, match='0700'):
+        serve(str(shared / 'inference.sock'), StubModel, AUTHKEY)
+    with pytest.raises(ValueError):
+        serve(str(tmp_path / 'inference.sock'), StubModel, b'')
+    with pytest.raises(ValueError):
+        InferenceClient([str(tmp_path / 'inference.sock')], b'')
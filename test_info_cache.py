@@ -0,0 +1,78 @@
+#!/usr/bin/env python3
+"""
+Tests for the persistent provider-response cache
+"""
+import threading
+import time
+
+from info_cache import ProviderCache
+
+
+def make_cache(tmp_path, **kwargs):
+    return ProviderCache(str(tmp_path / 'info.sqlite3'), **kwargs)
+
+
+def test_miss_then_hit_calls_provider_once(tmp_path):
+    cache = make_cache(tmp_path)
+    calls = []
+
+    def loader():
+        calls.append(1)
+        return {'description': 'Apple rust', 'source': 'Gemini AI'}
+
+    assert cache.fetch('gemini', 'Apple rust leaf', 'v1', loader)['source'] == 'Gemini AI'
+    assert cache.fetch('gemini', 'Apple rust leaf', 'v1', loader)['source'] == 'Gemini AI'
+    assert len(calls) == 1
+    # A new prompt version is a different entry
+    cache.fetch('gemini', 'Apple rust leaf', 'v2', loader)
+    assert len(calls) == 2
+
+
+def test_empty_answers_are_not_cached(tmp_path):
+    cache = make_cache(tmp_path)
+    calls = []
+
+    def loader():
+        calls.append(1)
+        return None
+
+    cache.fetch('wikipedia', 'Corn rust leaf', 'v1', loader)
+    cache.fetch('wikipedia', 'Corn rust leaf', 'v1', loader)
+    assert len(calls) == 2
+
+
+def test_stale_entries_are_served_and_refreshed(tmp_path):
+    cache = make_cache(tmp_path, ttl_seconds=0, stale_seconds=3600)
+    cache.put('gemini', 'Tomato leaf', 'v1', {'description': 'old'})
+    refreshed = threading.Event()
+
+    def loader():
+        refreshed.set()
+        return {'description': 'new'}
+
+    assert cache.fetch('gemini', 'Tomato leaf', 'v1', loader) == {'description': 'old'}
+    assert refreshed.wait(5)
+    deadline = time.time() + 5
+    while cache.get('gemini', 'Tomato leaf', 'v1')[0] != {'description': 'new'} and time.time() < deadline:
+        time.sleep(0.01)
+    assert cache.get('gemini', 'Tomato leaf', 'v1')[0] == {'description': 'new'}
+
+
+def test_expired_entries_are_reloaded(tmp_path):
+    cache = make_cache(tmp_path, ttl_seconds=0, stale_seconds=0)
+    cache.put('google', 'Corn leaf blight', 'v1', {'description': 'old'})
+    assert cache.fetch('google', 'Corn leaf blight', 'v1', lambda: {'description': 'new'}) == {'description': 'new'}
+
+
+def test_size_bound(tmp_path):
+    cache = make_cache(tmp_path, max_entries=3)
+    for i in range(6):
+        cache.put('gemini', f'disease {i}', 'v1', {'n': i})
+    assert cache.stats()['entries'] == 3
+    assert cache.get('gemini', 'disease 5', 'v1')[0] == {'n': 5}
+    assert cache.get('gemini', 'disease 0', 'v1')[0] is None
+
+
+def test_persists_across_instances(tmp_path):
+    make_cache(tmp_path).put('gemini', 'Apple Scab Leaf', 'v1', {'description': 'scab'})
+    assert make_cache(tmp_path).get('gemini', 'Apple Scab Leaf', 'v1')[0] == {'description': 'scab'}
@@ -0,0 +1,108 @@
+#!/usr/bin/env python3
+"""
+Tests for the persistent background job store
+"""
+import job_store
+from job_store import JobStore
+
+
+def make_store(tmp_path):
+    return JobStore(str(tmp_path / 'jobs.sqlite3'))
+
+
+def test_job_lifecycle(tmp_path):
+    store = make_store(tmp_path)
+    job_id = store.create('leaf.jpg', 'uploads/leaf.jpg', callback_url='http://example.com/hook')
+    assert store.get(job_id)['status'] == job_store.QUEUED
+
+    assert store.claim(job_id)
+    assert not store.claim(job_id)  # Only one worker can claim a job
+    assert store.get(job_id)['status'] == job_store.RUNNING
+
+    store.complete(job_id, {'detections': []})
+    job = store.get(job_id)
+    assert job['status'] == job_store.DONE
+    assert job['result'] == {'detections': []}
+    assert job['callback_url'] == 'http://example.com/hook'
+
+
+def test_failed_job_keeps_error(tmp_path):
+    store = make_store(tmp_path)
+    job_id = store.create('leaf.jpg', 'uploads/leaf.jpg')
+    store.claim(job_id)
+    store.fail(job_id, 'YOLO model not loaded properly')
+    job = store.get(job_id)
+    assert job['status'] == job_store.FAILED
+    assert job['error'] == 'YOLO model not loaded properly'
+
+
+def test_cached_results_create_finished_jobs(tmp_path):
+    store = make_store(tmp_path)
+    job_id = store.create('leaf.jpg', None, result={'detections': [], 'cached': True})
+    assert store.get(job_id)['status'] == job_store.DONE
+
+
+def test_recover_requeues_jobs_of_dead_workers(tmp_path):
+    store = make_store(tmp_path)
+    queued = store.create('a.jpg', 'uploads/a.jpg')
+    orphaned = store.create('b.jpg', 'uploads/b.jpg')
+    alive = store.create('c.jpg', 'uploads/c.jpg')
+    store.claim(orphaned, pid=111)
+    store.claim(alive, pid=222)
+
+    # Survives a "restart": a fresh store on the same database
+    recovered = make_store(tmp_path).recover(is_alive=lambda pid: pid == 222)
+    assert recovered == [queued, orphaned]
+    assert store.get(alive)['status'] == job_store.RUNNING
+
+
+def test_purge_only_removes_finished_jobs(tmp_path):
+    store = make_store(tmp_path)
+    done = store.create('a.jpg', None, result={})
+    pending = store.create('b.jpg', 'uploads/b.jpg')
+    assert store.purge(max_age_seconds=-1) == 1
+    assert store.get(done) is None
+    assert store.get(pending) is not None
+    assert store.counts() == {job_store.QUEUED: 1}
+
+
+def test_uploads_stay_pinned_until_their_jobs_are_purged(tmp_path):
+    store = make_store(tmp_path)
+    first = store.create('a.jpg', 'uploads/a.jpg')
+    second = store.create('b.jpg', 'uploads/b.jpg')
+    store.create('b.jpg', 'uploads/b.jpg')  # Same content uploaded again, still queued
+    assert store.active_image_paths() == {'uploads/a.jpg', 'uploads/b.jpg'}
+
+    store.claim(first)
+    assert store.active_image_paths() == {'uploads/a.jpg', 'uploads/b.jpg'}
+    store.complete(first, {})
+    store.claim(second)
+    store.fail(second, 'boom')
+    assert store.active_image_paths() == {'uploads/b.jpg'}
+
+    released = []
+    assert store.purge(max_age_seconds=-1, release=released.append) == 2
+    assert released == ['uploads/a.jpg']  # b.jpg is still needed by the queued job
+
+
+def test_callbacks_to_internal_addresses_are_refused():
+    hosts = {'hooks.example.com': ['93.184.216.34'], 'metadata.internal': ['169.254.169.254'],
+             'mixed.example.com': ['93.184.216.34', '10.0.0.5'], 'mapped.example.com': ['::ffff:127.0.0.1']}
+
+    def resolve(host, port, proto=0):
+        if host not in hosts and host.replace('.', '').isdigit():
+            return [(2, 1, 6, '', (host, port))]
+        if host not in hosts:
+            raise job_store.socket.gaierror('unknown host')
+        return [(2, 1, 6, '', (address, port)) for address in hosts[host]]
+
+    check = lambda url, allowed=None: job_store.check_callback_url(url, allowed, resolve=resolve)
+    assert check('https://hooks.example.com/done') is None
+    for url in ['http://127.0.0.1:8080/', 'http://192.168.1.10/hook', 'http://metadata.internal/latest',
+                'https://mixed.example.com/', 'http://mapped.example.com/']:
+        assert 'non-public' in check(url), url
+    assert 'http(s)' in check('file:///etc/passwd')
+    assert 'could not be resolved' in check('http://nowhere.invalid/')
+    # An allowlist replaces the address check - only listed hosts are accepted
+    assert check('http://127.0.0.1:9000/', {'127.0.0.1'}) is None
+    assert 'not allowed' in check('https://hooks.example.com/done', {'127.0.0.1'})
@@ -0,0 +1,76 @@
+#!/usr/bin/env python3
+"""
+Tests for live camera sessions: latest-frame slot, smoothing and info lookups
+"""
+import threading
+import time
+
+import pytest
+
+from live_session import LiveSession, SessionClosed, smooth_predictions
+
+
+def detection(class_name, confidence=0.9):
+    return {'class_name': class_name, 'confidence': confidence, 'bbox': [0, 0, 10, 10]}
+
+
+def test_smoothing_needs_a_majority():
+    assert smooth_predictions([('rust', 0.8), ('rust', 0.6), ('scab', 0.9)]) == ('rust', pytest.approx(0.7), 2)
+    assert smooth_predictions([('rust', 0.8), ('scab', 0.9)]) == (None, 0.0, 0)
+    assert smooth_predictions([(None, 0.0), (None, 0.0), ('rust', 0.9)]) == (None, 0.0, 2)
+
+
+def test_stale_frames_are_dropped_while_the_detector_is_busy():
+    release = threading.Event()
+    seen = []
+
+    def detect(frame):
+        seen.append(frame)
+        release.wait(5)
+        return [detection('rust')]
+
+    session = LiveSession(detect, lambda class_name: {'description': class_name}, window=3)
+    session.submit(b'frame1')
+    time.sleep(0.1)  # frame1 is being processed
+    for frame in (b'frame2', b'frame3', b'frame4'):
+        session.submit(frame)
+    release.set()
+    state = session.wait(-1, timeout=5)
+    while state['processed'] < 2:
+        state = session.wait(state['version'], timeout=5)
+    session.close()
+
+    assert seen == [b'frame1', b'frame4']
+    assert state['received'] == 4 and state['dropped'] == 2
+    with pytest.raises(SessionClosed):
+        session.submit(b'frame5')
+
+
+def test_info_is_looked_up_once_per_stable_class():
+    classes = iter(['rust', 'scab', 'rust', 'rust', 'scab'])
+    lookups = []
+
+    def lookup(class_name):
+        lookups.append(class_name)
+        return {'description': class_name}
+
+    session = LiveSession(lambda frame: [detection(next(classes))], lookup, window=3)
+    state = session.snapshot()
+    for _ in range(5):
+        session.submit(b'frame')
+        state = session.wait(state['version'], timeout=5)
+        while state['processed'] < session.received:
+            state = session.wait(state['version'], timeout=5)
+    time.sleep(0.1)
+    state = session.snapshot()
+    session.close()
+
+    # Windows: [rust] [rust scab] [rust scab rust] [scab rust rust] [rust rust scab] - rust throughout
+    assert lookups == ['rust']
+    assert state['stable']['disease'] == 'rust' and state['info'] == {'description': 'rust'}
+
+
+def test_idle_sessions_close_themselves():
+    session = LiveSession(lambda frame: [], lambda class_name: None, idle_timeout=0.1)
+    state = session.wait(0, timeout=2)
+    assert state['closed']
@@ -0,0 +1,54 @@
+#!/usr/bin/env python3
+"""
+Tests for the Prometheus metrics (provider counters, multiprocess merging)
+"""
+import os
+import subprocess
+import sys
+
+import pytest
+
+prometheus_client = pytest.importorskip('prometheus_client')
+
+import metrics
+from provider_runtime import ProviderUnavailable
+
+
+def sample(name, **labels):
+    return prometheus_client.REGISTRY.get_sample_value(name, labels) or 0
+
+
+def test_provider_calls_latency_and_errors_are_counted():
+    assert metrics.setup()
+    calls = sample('plant_disease_provider_calls_total', provider='wikipedia')
+    errors = sample('plant_disease_provider_errors_total', provider='wikipedia', error='ProviderUnavailable')
+    timed = sample('plant_disease_provider_duration_seconds_count', provider='wikipedia')
+
+    def fetch(disease_name):
+        if disease_name == 'down':
+            raise ProviderUnavailable('HTTP 503')
+        return {'description': disease_name}
+
+    call = metrics.observe_provider('wikipedia', fetch)
+    assert call('Apple Scab Leaf') == {'description': 'Apple Scab Leaf'}
+    with pytest.raises(ProviderUnavailable):
+        call('down')
+
+    assert sample('plant_disease_provider_calls_total', provider='wikipedia') == calls + 2
+    assert sample('plant_disease_provider_errors_total', provider='wikipedia', error='ProviderUnavailable') == errors + 1
+    assert sample('plant_disease_provider_duration_seconds_count', provider='wikipedia') == timed + 2
+
+
+def test_samples_of_all_worker_processes_are_merged(tmp_path):
+    env = dict(os.environ, PROMETHEUS_MULTIPROC_DIR=str(tmp_path / 'multiproc'))
+    worker = ("import metrics; metrics.setup(); metrics.count_cache('result', True); "
+              "metrics.observe_inference(4, 0.02); metrics.set_queue_depth('inference', 3)")
+    for _ in range(2):  # Two workers, both exited
+        subprocess.run([sys.executable, '-c', worker], env=env, check=True, cwd=os.path.dirname(metrics.__file__))
+
+    scrape = "import sys, metrics; metrics.setup(); sys.stdout.write(metrics.render()[0].decode())"
+    text = subprocess.run([sys.executable, '-c', scrape], env=env, check=True, capture_output=True, text=True,
+                          cwd=os.path.dirname(metrics.__file__)).stdout
+    assert 'plant_disease_cache_requests_total{cache="result",result="hit"} 2.0' in text
+    assert 'plant_disease_inference_duration_seconds_count{batch_size="4"} 2.0' in text
+    assert 'plant_disease_queue_depth{queue="inference"} 6.0' in text  # Not marked dead yet
@@ -0,0 +1,55 @@
+#!/usr/bin/env python3
+"""
+Tests that the result cache key names the precision the model really runs at
+"""
+import os
+import tempfile
+
+import pytest
+
+pytest.importorskip('flask')
+os.environ.setdefault('INFO_CACHE_PATH', '')
+os.environ.setdefault('JOB_DB_PATH', os.path.join(tempfile.mkdtemp(), 'jobs.sqlite3'))
+
+import app
+
+
+class FakeModel:
+    names = {0: 'Tomato leaf'}
+
+
+def load_as(precision):
+    def load():
+        app.model_precision = precision
+        return FakeModel()
+    return load
+
+
+@pytest.fixture
+def int8_requested(monkeypatch):
+    monkeypatch.setattr(app, 'INFERENCE_PRECISION', 'int8')
+    monkeypatch.setattr(app, 'inference_client', None)
+    monkeypatch.setattr(app, 'model', None)
+    monkeypatch.setattr(app, 'model_version', None)
+    monkeypatch.setattr(app, 'model_precision', None)
+
+
+def test_fp32_fallback_is_not_cached_as_int8(int8_requested, monkeypatch):
+    monkeypatch.setattr(app, 'load_yolo_model', load_as('fp32'))
+    assert '-int8' not in app.get_model_version()
+
+
+def test_int8_model_gets_its_own_cache_key(int8_requested, monkeypatch):
+    monkeypatch.setattr(app, 'load_yolo_model', load_as('int8'))
+    assert '-int8' in app.get_model_version()
+
+
+def test_version_is_recomputed_once_the_model_loads(int8_requested, monkeypatch):
+    monkeypatch.setattr(app, 'load_yolo_model', lambda: None)
+    unresolved = app.get_model_version()
+    assert app.model_version is None and '-int8' not in unresolved
+
+    monkeypatch.setattr(app, 'load_yolo_model', load_as('int8'))
+    resolved = app.get_model_version()
+    assert '-int8' in resolved and resolved.replace('-int8', '') == unresolved
+    assert app.model_version == resolved
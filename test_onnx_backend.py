@@ -0,0 +1,99 @@
+#!/usr/bin/env python3
+"""
+Tests for the ONNX inference backend: NumPy pre/post-processing and parity with ultralytics
+"""
+import glob
+import os
+
+import pytest
+
+np = pytest.importorskip('numpy')
+pytest.importorskip('cv2')
+
+import onnx_backend
+
+MODEL_PATH = 'model/best.pt'
+TEST_IMAGES = sorted(glob.glob('test/*.JPG'))
+
+
+def raw_prediction(boxes, num_classes=3):
+    """Build a raw (4 + num_classes, N) YOLOv8 output from (cx, cy, w, h, class, score) rows"""
+    prediction = np.zeros((4 + num_classes, len(boxes)), dtype=np.float32)
+    for i, (cx, cy, w, h, class_id, score) in enumerate(boxes):
+        prediction[:4, i] = (cx, cy, w, h)
+        prediction[4 + class_id, i] = score
+    return prediction
+
+
+def test_letterbox_keeps_aspect_ratio_and_pads():
+    image = np.zeros((200, 400, 3), dtype=np.uint8)
+    boxed = onnx_backend.letterbox(image, imgsz=640)
+    assert boxed.shape == (640, 640, 3)
+    assert (boxed[:160] == onnx_backend.PAD_VALUE).all()  # 320 rows of image centered vertically
+    assert (boxed[160:480] == 0).all()
+
+
+def test_preprocess_returns_rgb_nchw_batch():
+    image = np.zeros((64, 64, 3), dtype=np.uint8)
+    image[..., 0] = 255  # Blue in BGR
+    batch = onnx_backend.preprocess([image, image], imgsz=64)
+    assert batch.shape == (2, 3, 64, 64)
+    assert batch.dtype == np.float32
+    assert batch[0, 2].max() == 1.0 and batch[0, 0].max() == 0.0
+
+
+def test_nms_suppresses_overlapping_boxes():
+    boxes = np.array([[0, 0, 10, 10], [1, 1, 10, 10], [20, 20, 30, 30]], dtype=np.float32)
+    scores = np.array([0.9, 0.8, 0.7], dtype=np.float32)
+    assert onnx_backend.nms(boxes, scores, 0.5).tolist() == [0, 2]
+
+
+def test_postprocess_is_class_aware():
+    prediction = raw_prediction([
+        (50, 50, 20, 20, 0, 0.9),
+        (51, 51, 20, 20, 0, 0.6),  # Same class, overlapping - suppressed
+        (51, 51, 20, 20, 1, 0.5),  # Other class, overlapping - kept
+        (200, 200, 20, 20, 2, 0.05)  # Below threshold
+    ])
+    detections = onnx_backend.postprocess(prediction, conf=0.1, iou=0.7)
+    assert detections[:, 5].tolist() == [0, 1]
+    assert detections[0, :4].tolist() == [40, 40, 60, 60]
+
+
+def test_scale_boxes_maps_back_to_original_image():
+    boxes = np.array([[0, 160, 640, 480]], dtype=np.float32)  # The whole image inside the letterbox
+    assert onnx_backend.scale_boxes(boxes, (200, 400, 3), imgsz=640).tolist() == [[0, 0, 400, 200]]
+
+
+def test_results_match_the_ultralytics_api_used_by_the_app():
+    image = np.zeros((100, 100, 3), dtype=np.uint8)
+    detections = np.array([[10, 20, 30, 40, 0.75, 1]], dtype=np.float32)
+    result = onnx_backend.DetectionResult(image, detections, {0: 'Apple Scab Leaf', 1: 'Corn rust leaf'})
+
+    box = result.boxes[0]
+    assert result.names[int(box.cls[0])] == 'Corn rust leaf'
+    assert float(box.conf[0]) == pytest.approx(0.75)
+    assert box.xyxy[0].tolist() == [10, 20, 30, 40]
+    assert result.plot().shape == image.shape
+
+
+@pytest.mark.skipif(not os.path.exists(MODEL_PATH) or not TEST_IMAGES, reason='Model weights or test images missing')
+def test_parity_with_ultralytics():
+    pytest.importorskip('onnxruntime')
+    ultralytics = pytest.importorskip('ultralytics')
+
+    reference = ultralytics.YOLO(MODEL_PATH)
+    onnx_model = onnx_backend.load_onnx_model(MODEL_PATH, runtime='onnxruntime')
+
+    for image_path in TEST_IMAGES:
+        expected = reference(image_path, conf=0.25, verbose=False)[0]
+        actual = onnx_model(image_path, conf=0.25)[0]
+        expected_classes = sorted(int(box.cls[0]) for box in expected.boxes)
+        actual_classes = sorted(int(box.cls[0]) for box in actual.boxes)
+        assert actual_classes == expected_classes, image_path
+
+        if expected_classes:
+            top_expected = max(expected.boxes, key=lambda box: float(box.conf[0]))
+            top_actual = max(actual.boxes, key=lambda box: float(box.conf[0]))
+            assert float(top_actual.conf[0]) == pytest.approx(float(top_expected.conf[0]), abs=0.02)
+            assert np.allclose(top_actual.xyxy[0], top_expected.xyxy[0].cpu().numpy(), atol=3), image_path
@@ -0,0 +1,176 @@
+#!/usr/bin/env python3
+"""
+Tests for the knowledge-provider orchestration helpers
+"""
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+import pytest
+
+from provider_runtime import (CircuitBreaker, ProviderUnavailable, call_with_timeout, cancellable_sleep,
+                              first_good_result, observe_latency, provider_timeout)
+
+
+@pytest.fixture
+def executor():
+    pool = ThreadPoolExecutor(max_workers=8)
+    yield pool
+    pool.shutdown(wait=False)
+
+
+def slow(result, delay):
+    def provider():
+        time.sleep(delay)
+        return result
+    return provider
+
+
+def test_higher_ranked_provider_wins_even_if_slower(executor):
+    providers = [('Gemini AI', slow({'source': 'gemini'}, 0.2)), ('Wikipedia', slow({'source': 'wiki'}, 0.0))]
+    assert first_good_result(providers, 5, executor) == ('Gemini AI', {'source': 'gemini'})
+
+
+def test_falls_through_failed_providers(executor):
+    def broken():
+        raise RuntimeError('429')
+
+    providers = [('Gemini AI', broken), ('Google Search', slow(None, 0.0)), ('Wikipedia', slow({'source': 'wiki'}, 0.05))]
+    assert first_good_result(providers, 5, executor) == ('Wikipedia', {'source': 'wiki'})
+
+
+def test_latency_is_bounded_by_slowest_needed_provider(executor):
+    providers = [('Gemini AI', slow(None, 0.3)), ('Google Search', slow(None, 0.3)), ('Wikipedia', slow({'source': 'wiki'}, 0.3))]
+    start = time.monotonic()
+    assert first_good_result(providers, 5, executor)[0] == 'Wikipedia'
+    assert time.monotonic() - start < 0.8  # not the 0.9s sum
+
+
+def test_deadline_returns_best_answer_so_far(executor):
+    providers = [('Gemini AI', slow({'source': 'gemini'}, 2)), ('Wikipedia', slow({'source': 'wiki'}, 0.0))]
+    start = time.monotonic()
+    assert first_good_result(providers, 0.2, executor) == ('Wikipedia', {'source': 'wiki'})
+    assert time.monotonic() - start < 1
+
+
+def test_deadline_without_answers(executor):
+    assert first_good_result([('Gemini AI', slow({'source': 'gemini'}, 2))], 0.1, executor) == (None, None)
+
+
+def test_losers_are_cancelled(executor):
+    attempts = []
+
+    def looping_provider():
+        for _ in range(50):
+            attempts.append(1)
+            if cancellable_sleep(0.05):
+                break
+        return None
+
+    providers = [('Gemini AI', slow({'source': 'gemini'}, 0.1)), ('Wikipedia', looping_provider)]
+    first_good_result(providers, 5, executor)
+    time.sleep(0.2)
+    settled = len(attempts)
+    time.sleep(0.2)
+    assert len(attempts) == settled < 50
+
+
+def test_stagger_skips_lower_ranked_providers_on_fast_answers(executor):
+    calls = []
+
+    def wikipedia():
+        calls.append(1)
+        return {'source': 'wiki'}
+
+    providers = [('Gemini AI', slow({'source': 'gemini'}, 0.0)), ('Wikipedia', wikipedia)]
+    assert first_good_result(providers, 5, executor, stagger=0.5)[0] == 'Gemini AI'
+    assert calls == []
+
+
+def failing():
+    raise ProviderUnavailable('HTTP 503')
+
+
+def test_breaker_opens_after_repeated_failures():
+    breaker = CircuitBreaker('gemini', failure_threshold=2, reset_timeout=60)
+    calls = []
+
+    def provider():
+        calls.append(1)
+        failing()
+
+    assert breaker.call(provider) is None
+    assert breaker.call(provider) is None
+    assert breaker.state == CircuitBreaker.OPEN
+    # Open circuit skips the provider without calling it
+    assert breaker.call(provider) is None
+    assert len(calls) == 2
+    assert breaker.stats()['short_circuited'] == 1
+
+
+def test_half_open_probe_closes_or_reopens():
+    breaker = CircuitBreaker('wikipedia', failure_threshold=1, reset_timeout=0.05)
+    breaker.call(failing)
+    assert breaker.state == CircuitBreaker.OPEN
+    time.sleep(0.06)
+    breaker.call(failing)  # failed probe re-opens immediately
+    assert breaker.state == CircuitBreaker.OPEN
+    time.sleep(0.06)
+    assert breaker.call(lambda: {'source': 'wiki'}) == {'source': 'wiki'}
+    assert breaker.state == CircuitBreaker.CLOSED
+
+
+def test_only_one_half_open_probe_at_a_time():
+    breaker = CircuitBreaker('google', failure_threshold=1, reset_timeout=0)
+    breaker.call(failing)
+    assert breaker.allow() is True
+    assert breaker.allow() is False
+
+
+def test_empty_answers_are_not_failures():
+    breaker = CircuitBreaker('google', failure_threshold=1)
+    assert breaker.call(lambda: None) is None
+    assert breaker.state == CircuitBreaker.CLOSED
+
+
+def test_adaptive_timeout_follows_latency_percentile():
+    breaker = CircuitBreaker('wikipedia', min_timeout=0.5, max_timeout=10, multiplier=2, min_samples=5)
+    assert breaker.timeout(5) == 5  # not enough samples yet
+    for _ in range(20):
+        breaker.record_latency(0.4)
+    assert breaker.timeout(5) == pytest.approx(0.8)
+    for _ in range(20):
+        breaker.record_latency(30)
+    assert breaker.timeout(5) == 10
+
+
+def test_provider_timeout_uses_calling_breaker():
+    breaker = CircuitBreaker('plantnet', min_timeout=0.1, multiplier=1, min_samples=1)
+    breaker.record_latency(0.2)
+    assert provider_timeout(7) == 7
+    assert breaker.call(lambda: provider_timeout(7)) == pytest.approx(0.2)
+
+
+def test_http_latencies_are_recorded_per_request():
+    breaker = CircuitBreaker('wikipedia')
+
+    def provider():
+        observe_latency(0.1)
+        observe_latency(0.2)
+        return {'source': 'wiki'}
+
+    breaker.call(provider)
+    assert breaker.stats()['latency_samples'] == 2
+
+
+def test_sdk_calls_that_hang_count_as_failures(executor):
+    breaker = CircuitBreaker('gemini', failure_threshold=2)
+    hang = slow({'source': 'gemini'}, 1)
+    start = time.monotonic()
+    for _ in range(2):
+        assert breaker.call(lambda: call_with_timeout(executor, 0.05, hang)) is None
+    assert time.monotonic() - start < 0.5
+    assert breaker.state == CircuitBreaker.OPEN
+
+    fast = CircuitBreaker('gemini')
+    assert fast.call(lambda: call_with_timeout(executor, 1, slow({'source': 'gemini'}, 0))) == {'source': 'gemini'}
+    assert fast.stats()['latency_samples'] == 1
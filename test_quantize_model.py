@@ -0,0 +1,89 @@
+#!/usr/bin/env python3
+"""
+Tests for the INT8 accuracy comparison and activation guardrail
+"""
+import json
+import os
+import tempfile
+
+import pytest
+
+np = pytest.importorskip('numpy')
+pytest.importorskip('cv2')
+
+import quantize_model
+
+NAMES = {0: 'Apple Scab Leaf', 1: 'Corn rust leaf'}
+
+
+def detections(*rows):
+    return np.array(rows, dtype=np.float32).reshape(-1, 6)
+
+
+def test_average_precision():
+    assert quantize_model.average_precision(np.array([0.9, 0.8]), np.array([True, True]), 2) == pytest.approx(1.0)
+    assert quantize_model.average_precision(np.array([0.9, 0.8]), np.array([False, True]), 2) == pytest.approx(0.25)
+    assert quantize_model.average_precision(np.array([]), np.array([], dtype=bool), 1) == 0.0
+    assert quantize_model.average_precision(np.array([0.9]), np.array([False]), 0) is None
+
+
+def test_match_detections_requires_same_class_and_overlap():
+    reference = detections([0, 0, 10, 10, 0.9, 0])
+    candidate = detections([1, 1, 10, 10, 0.8, 0], [0, 0, 10, 10, 0.7, 1], [0, 0, 10, 10, 0.6, 0])
+    # Only the best same-class box matches - the duplicate is a false positive
+    assert quantize_model.match_detections(reference, candidate).tolist() == [True, False, False]
+
+
+def test_identical_detections_agree_fully():
+    reference = [detections([0, 0, 10, 10, 0.9, 0]), detections([5, 5, 50, 50, 0.8, 1]), detections()]
+    report = quantize_model.compare_detections(reference, [d.copy() for d in reference], NAMES)
+    assert report['map50'] == 1.0
+    assert report['top_class_agreement'] == 1.0
+    assert report['per_class']['Corn rust leaf']['agreement'] == 1.0
+
+
+def test_changed_top_class_is_reported():
+    reference = [detections([0, 0, 10, 10, 0.9, 0]), detections([5, 5, 50, 50, 0.8, 1])]
+    candidate = [detections([0, 0, 10, 10, 0.9, 0]), detections([5, 5, 50, 50, 0.8, 0])]
+    report = quantize_model.compare_detections(reference, candidate, NAMES)
+    assert report['top_class_agreement'] == 0.5
+    assert report['per_class']['Corn rust leaf'] == {
+        'fp32_detections': 1, 'int8_detections': 0, 'matched': 0, 'agreement': 0.0, 'ap50': 0.0
+    }
+    assert report['map50'] == pytest.approx(0.5)
+
+
+def test_guardrail_refuses_inaccurate_or_stale_models(tmp_path):
+    weights = tmp_path / 'best.pt'
+    weights.write_bytes(b'weights')
+    int8_path, report_path = quantize_model.quantized_paths(str(weights))
+    open(int8_path, 'wb').close()
+
+    report = {'names': {'0': 'Apple Scab Leaf'}, 'imgsz': 640, 'weights_hash': quantize_model.weights_hash(str(weights)),
+              'metrics': {'map50': 0.85, 'top_class_agreement': 0.97}}
+    with open(report_path, 'w') as f:
+        json.dump(report, f)
+    assert quantize_model.check_report(report, str(weights), min_map=0.8, min_agreement=0.95) == []
+    with pytest.raises(ValueError, match='mAP'):
+        quantize_model.load_quantized_model(str(weights), min_map=0.9, min_agreement=0.95)
+
+    weights.write_bytes(b'retrained weights')
+    problems = quantize_model.check_report(report, str(weights), min_map=0.8, min_agreement=0.95)
+    assert problems and 'different weights' in problems[0]
+
+
+def test_holdout_keeps_evaluation_images_out_of_calibration():
+    paths = [f'test/leaf_{i}.jpg' for i in range(200)]
+    calibration, evaluation = quantize_model.split_holdout(paths, 0.2)
+    assert not set(calibration) & set(evaluation)
+    assert sorted(calibration + evaluation) == sorted(paths)
+    assert 20 < len(evaluation) < 60
+    assert quantize_model.split_holdout(list(reversed(paths)), 0.2)[1] == list(reversed(evaluation))  # Stable
+
+
+def test_comparison_uses_the_serving_threshold():
+    pytest.importorskip('flask')
+    os.environ.setdefault('INFO_CACHE_PATH', '')
+    os.environ.setdefault('JOB_DB_PATH', os.path.join(tempfile.mkdtemp(), 'jobs.sqlite3'))
+    import app
+    assert quantize_model.SERVING_CONFIDENCE == app.CONFIDENCE_THRESHOLD
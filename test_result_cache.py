@@ -0,0 +1,45 @@
+#!/usr/bin/env python3
+"""
+Tests for the content-hash upload result cache
+"""
+from result_cache import ResultCache, make_result_key
+
+
+def test_key_depends_on_content_model_and_threshold():
+    key = make_result_key(b'leaf', 'v1', 0.1)
+    assert key == make_result_key(b'leaf', 'v1', 0.1)
+    assert key != make_result_key(b'leaf2', 'v1', 0.1)
+    assert key != make_result_key(b'leaf', 'v2', 0.1)
+    assert key != make_result_key(b'leaf', 'v1', 0.25)
+
+
+def test_lru_eviction():
+    cache = ResultCache(max_entries=2)
+    cache.put('a', {'n': 1})
+    cache.put('b', {'n': 2})
+    assert cache.get('a') == {'n': 1}  # 'a' is now most recently used
+    cache.put('c', {'n': 3})
+    assert cache.get('b') is None
+    assert cache.get('a') == {'n': 1}
+    assert cache.get('c') == {'n': 3}
+    assert cache.stats()['hits'] == 3
+    assert cache.stats()['misses'] == 1
+
+
+def test_disk_persistence_survives_new_instance(tmp_path):
+    ResultCache(max_entries=4, persist_dir=str(tmp_path)).put('key', {'detections': []})
+    restarted = ResultCache(max_entries=4, persist_dir=str(tmp_path))
+    assert restarted.get('key') == {'detections': []}
+
+
+def test_disk_is_bounded(tmp_path):
+    cache = ResultCache(max_entries=2, persist_dir=str(tmp_path))
+    for i in range(5):
+        cache.put(f'k{i}', {'n': i})
+    assert len(list(tmp_path.glob('*.json'))) == 2
+
+
+def test_disabled_cache_stores_nothing():
+    cache = ResultCache(max_entries=0)
+    cache.put('a', {'n': 1})
+    assert cache.get('a') is None
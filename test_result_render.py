@@ -0,0 +1,49 @@
+#!/usr/bin/env python3
+"""
+Tests for lazy annotated-image rendering
+"""
+import io
+
+import pytest
+
+np = pytest.importorskip('numpy')
+cv2 = pytest.importorskip('cv2')
+from PIL import Image
+
+from result_render import manifest_bytes, parse_manifest, render, snap_size, variant_suffix
+
+DETECTIONS = [{'class_name': 'Tomato___Late_blight', 'class_id': 3, 'confidence': 0.91, 'bbox': [400.0, 300.0, 1200.0, 900.0]}]
+
+
+def grey_jpeg(width, height):
+    buffer = io.BytesIO()
+    Image.new('RGB', (width, height), (128, 128, 128)).save(buffer, 'JPEG')
+    return buffer.getvalue()
+
+
+def test_sizes_snap_up_to_the_allowed_list():
+    sizes = [160, 320, 640, 1280]
+    assert snap_size(None, sizes) == 1280
+    assert snap_size(300, sizes) == 320
+    assert snap_size(320, sizes) == 320
+    assert snap_size(5000, sizes) == 1280
+    assert variant_suffix(320, '.webp') == '.s320.webp'
+
+
+def test_thumbnail_is_drawn_with_boxes_scaled_from_original_coordinates():
+    manifest = parse_manifest(manifest_bytes('uploads/ab/cd/leaf.jpg', DETECTIONS))
+    assert manifest['image'] == 'uploads/ab/cd/leaf.jpg'
+
+    data = render(grey_jpeg(1600, 1200), manifest, 320, '.webp')
+    assert data[8:12] == b'WEBP'
+    image = cv2.imdecode(np.frombuffer(data, np.uint8), cv2.IMREAD_COLOR)
+    assert image.shape == (240, 320, 3)
+    # The box edge lands at x = 400 / 5 = 80 and is drawn in a colour, unlike the grey background
+    assert np.ptp(image[120, 79:82].astype(int), axis=-1).max() > 60
+    assert np.ptp(image[120, 40].astype(int)) < 10
+
+
+def test_images_smaller_than_the_size_are_not_upscaled():
+    data = render(grey_jpeg(200, 100), {'detections': []}, 1280)
+    image = cv2.imdecode(np.frombuffer(data, np.uint8), cv2.IMREAD_COLOR)
+    assert image.shape == (100, 200, 3)
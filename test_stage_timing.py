@@ -0,0 +1,53 @@
+#!/usr/bin/env python3
+"""
+Tests for per-request stage timing (Server-Timing header values, thread propagation)
+"""
+import threading
+from concurrent.futures import ThreadPoolExecutor
+
+import stage_timing
+from stage_timing import bind, stage, timed
+
+
+def test_stages_are_not_recorded_without_a_timer():
+    stage_timing.stop()
+    with stage('decode'):
+        pass
+
+    @timed('save')
+    def save(data):
+        return len(data)
+
+    assert save(b'abc') == 3
+    assert stage_timing.current() is None
+
+
+def test_repeated_stages_add_up_in_the_header():
+    timings = stage_timing.start()
+    try:
+        for _ in range(2):
+            with stage('wikipedia'):
+                pass
+        timings.add('inference', 12.345)
+        assert list(timings.as_dict()) == ['wikipedia', 'inference']
+        assert timings.as_dict()['inference'] == 12.35
+        header = timings.header(total_ms=20)
+        assert header.startswith('wikipedia;dur=') and header.endswith('inference;dur=12.35, total;dur=20')
+    finally:
+        stage_timing.stop()
+
+
+def test_bound_callables_record_from_pool_threads():
+    timings = stage_timing.start()
+    try:
+        def call_provider(name):
+            with stage(name):
+                return threading.current_thread().name
+
+        with ThreadPoolExecutor(max_workers=2) as pool:
+            unbound = pool.submit(call_provider, 'gemini').result()
+            bound = pool.submit(bind(call_provider), 'plantnet').result()
+        assert unbound != threading.current_thread().name and bound != threading.current_thread().name
+        assert list(timings.as_dict()) == ['plantnet']
+    finally:
+        stage_timing.stop()
@@ -0,0 +1,59 @@
+#!/usr/bin/env python3
+"""
+Tests for sliced (tiled) inference
+"""
+import pytest
+
+np = pytest.importorskip('numpy')
+
+from tiled_inference import merge_detections, sliced_detections, tile_grid
+
+
+def test_tile_grid_covers_the_image_with_overlap():
+    tiles = tile_grid(3000, 2000, tile_size=1000, overlap=0.2)
+    assert tiles[0] == (0, 0, 1000, 1000)
+    assert tiles[-1] == (2000, 1000, 3000, 2000)  # Last tiles are flush with the edges
+    assert len({x1 for x1, _, _, _ in tiles}) == 4 and len({y1 for _, y1, _, _ in tiles}) == 3
+
+    covered = np.zeros((2000, 3000), dtype=bool)
+    for x1, y1, x2, y2 in tiles:
+        covered[y1:y2, x1:x2] = True
+    assert covered.all()
+
+
+def test_small_images_are_a_single_tile():
+    assert tile_grid(800, 600, tile_size=1280) == [(0, 0, 800, 600)]
+
+
+def test_merge_folds_cut_off_boxes_into_the_full_box():
+    rows = np.array([
+        [100, 100, 300, 300, 0.9, 0],
+        [100, 100, 180, 300, 0.7, 0],  # Same lesion cut at a tile edge
+        [100, 100, 180, 300, 0.6, 1],  # Other class - kept
+        [500, 500, 600, 600, 0.5, 0]
+    ], dtype=np.float32)
+    merged = merge_detections(rows, match_threshold=0.5)
+    assert merged[:, 4].tolist() == pytest.approx([0.9, 0.6, 0.5])
+
+
+def test_sliced_detections_maps_tile_boxes_to_image_coordinates():
+    image = np.zeros((2000, 3000, 3), dtype=np.uint8)
+    image[1500:1520, 2500:2520] = 255  # A small lesion in the bottom-right area
+    batches = []
+
+    def run_batch(crops):
+        batches.append(len(crops))
+        outputs = []
+        for crop in crops:
+            ys, xs = np.nonzero(crop[..., 0])
+            if len(xs) and crop.shape[:2] != image.shape[:2]:  # The downscaled full pass misses it
+                outputs.append(np.array([[xs.min(), ys.min(), xs.max() + 1, ys.max() + 1, 0.8, 2]], dtype=np.float32))
+            else:
+                outputs.append(np.zeros((0, 6), dtype=np.float32))
+        return outputs
+
+    detections, stats = sliced_detections(image, run_batch, tile_size=1000, overlap=0.2)
+    assert batches == [13]  # 12 tiles and the full image in one batch
+    assert detections.tolist() == [[2500, 1500, 2520, 1520, pytest.approx(0.8), 2]]
+    assert stats['tiles'] == 12
+    assert stats['raw_detections'] >= 1 and stats['merged_detections'] == 1